@@ -1,31 +1,67 @@
 import os
 from flask import Flask
 
+from .config import env, env_flag
+from .utils import db_accounting, logs, metrics
+from .utils.startup_profile import profiler
 from .routes.auth_route import AuthRoute
 from .routes.api_warrior import bp as api_warrior_bp
 from .routes.crypto_maze import bp as crypto_maze_bp
 from .routes.challenge import ChallengeRoute as challenge_bp
+from .routes.metrics import MetricsRoute
+from .routes.leaderboard import LeaderboardRoute
+from .routes.dashboard import DashboardRoute
 
 def create_app():
-    app = Flask(__name__)
+    logs.configure_logging()
+    with profiler.phase("create_app"):
+        app = Flask(__name__)
 
-    aws_access_key_id = os.environ.get("AWS_ACCESS_KEY_ID")
-    aws_secret_access_key = os.environ.get("AWS_SECRET_ACCESS_KEY")
-    dynamodb_table_name = os.environ.get("DYNAMODB_TABLE_NAME")
-    dynamodb_endpoint = os.environ.get("DYNAMODB_ENDPOINT")
-    jwt_secret = os.environ.get("JWT_SECRET")
+        # Register Blueprints
+        app.register_blueprint(AuthRoute)
+        app.register_blueprint(api_warrior_bp)
+        app.register_blueprint(crypto_maze_bp)
+        app.register_blueprint(challenge_bp)
+        app.register_blueprint(MetricsRoute)
+        app.register_blueprint(LeaderboardRoute)
+        app.register_blueprint(DashboardRoute)
 
+        logs.init_app(app)
+        metrics.init_app(app)
+        db_accounting.init_app(app)
 
-    # Register Blueprints
-    app.register_blueprint(AuthRoute)
-    app.register_blueprint(api_warrior_bp)
-    app.register_blueprint(crypto_maze_bp)
-    app.register_blueprint(challenge_bp)
-    
+    # Controllers and DynamoDB connections are built on first use by default.
+    # APP_EAGER_INIT pays that cost up front (e.g. provisioned concurrency).
+    if env_flag("APP_EAGER_INIT"):
+        warm_up()
+
+    # Deployed, stats_stream.py consumes the table stream; the in-process
+    # stand-in delivers its stream to the same consumer on a thread.
+    if env("DYNAMODB_BACKEND", "dynamodb").lower() == "memory":
+        attach_local_stats_stream()
 
     return app
 
 
+def warm_up():
+    """Build controllers, connect to DynamoDB and fill the challenge pools now."""
+    from .database.db_config import Database
+    from .routes import api_warrior, crypto_maze
+
+    with profiler.phase("warm_up"):
+        Database().connect()
+        for controller in (api_warrior.get_controller(), crypto_maze.get_controller()):
+            controller.pool.fill()
+
+
+def attach_local_stats_stream():
+    """Keep statistics and leaderboards current on the in-process stand-in."""
+    from .controllers.leaderboard_controller import LeaderboardController, RUN_PREFIXES
+
+    controller = LeaderboardController()
+    controller.table.attach_stream(controller.apply_stream, key_prefixes=tuple(RUN_PREFIXES))
+
+
 if __name__ == "__main__":
     app = create_app()
     app.run(debug=True)
@@ -0,0 +1,311 @@
+"""Async (ASGI) serving mode for the phase and catalog endpoints.
+
+``AsyncApp`` answers the Phase 1/2 endpoints and ``GET /challenges`` on the
+event loop and awaits DynamoDB work through ``run_io``, so a worker is not
+blocked on each round trip. Independent I/O is awaited together: the
+rate-limit write runs alongside the challenge or maze read it guards. Other
+routes, and bodies the fast handlers do not accept, are passed to the wrapped
+Flask app on the same I/O pool. Serve with any ASGI server, e.g.
+``uvicorn asgi:app``; ``DYNAMODB_ENDPOINT`` points it at a local DynamoDB.
+"""
+import asyncio
+import io
+import logging
+import re
+import sys
+from typing import List, Optional, Tuple
+from werkzeug.wrappers import Response
+from .database.aio import run_io, shutdown
+from .fast_path import FastRequest, dump_json
+from .routes import api_warrior, crypto_maze
+from .routes.challenge import catalog_entry
+from .utils import db_accounting, logs
+from .utils.metrics import registry, route_labels
+from .utils.auth import authenticate
+from .utils.catalog_cache import catalog_cache
+from .utils.rate_limit import RateLimit, rate_limit_headers
+
+# (status, headers, body)
+AsgiResponse = Tuple[int, List[Tuple[str, str]], bytes]
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncApp:
+    ROUTES = (
+        ("GET", re.compile(r"^/phase1/begin$"), "_phase1_begin"),
+        ("POST", re.compile(r"^/phase1/step/([^/]+)$"), "_phase1_step"),
+        ("POST", re.compile(r"^/phase1/complete/([^/]+)$"), "_phase1_complete"),
+        ("GET", re.compile(r"^/phase2/begin$"), "_phase2_begin"),
+        ("POST", re.compile(r"^/phase2/solve/([^/]+)$"), "_phase2_solve"),
+        ("GET", re.compile(r"^/challenges$"), "_challenges"),
+    )
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        body = await self._read_body(receive)
+        req = FastRequest.from_scope(scope, body)
+        # Set before any run_io so the pool threads (and the Flask fallback) share them.
+        request_id = logs.bind_request_id(req.headers.get("X-Request-ID"))
+        token = db_accounting.begin()
+        try:
+            response = await self._route(req)
+            if response is None:
+                response = await run_io(self._wsgi, scope, body)
+        except BaseException:
+            db_accounting.discard(token)
+            logs.reset_request_id(request_id)
+            raise
+
+        status, headers, payload = response
+        account = db_accounting.finish(token, method=req.method, path=req.path, status=status)
+        if account is not None:
+            headers = headers + [("Server-Timing", account.server_timing())]
+        if not any(key.lower() == "x-request-id" for key, _ in headers):
+            headers = headers + [("X-Request-ID", logs.current_request_id())]
+        logs.reset_request_id(request_id)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(key.encode("latin-1"), value.encode("latin-1")) for key, value in headers],
+        })
+        await send({"type": "http.response.body", "body": payload})
+
+    async def _route(self, req: FastRequest) -> Optional[AsgiResponse]:
+        for method, pattern, handler in self.ROUTES:
+            match = pattern.match(req.path)
+            if match and req.method == method:
+                labels = route_labels(self.flask_app, req.method, req.path)
+                started = registry.start(labels)
+                try:
+                    response = await getattr(self, handler)(req, *match.groups())
+                except BaseException:
+                    registry.observe(labels, 500, started)
+                    raise
+                if response is None:
+                    # Flask records it instead.
+                    registry.abandon(labels)
+                else:
+                    registry.observe(labels, response[0], started)
+                return response
+        return None
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive) -> bytes:
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        return b"".join(chunks)
+
+    def _wsgi(self, scope: dict, body: bytes) -> AsgiResponse:
+        """Run the request through the Flask app (blocking; called on the I/O pool)."""
+        server = scope.get("server") or ("localhost", 80)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", ""),
+            "PATH_INFO": scope["path"][len(scope.get("root_path", "")):],
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "REMOTE_ADDR": (scope.get("client") or ("", 0))[0],
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.version": (1, 0),
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for key, value in scope.get("headers", []):
+            name = key.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+                environ[name] = value
+            else:
+                environ[f"HTTP_{name}"] = value
+
+        response = Response.from_app(self.flask_app, environ)
+        return response.status_code, list(response.headers.items()), response.get_data()
+
+    def _json(self, status: int, payload, headers: dict = None) -> AsgiResponse:
+        headers = {**(headers or {}), "Content-Type": "application/json"}
+        return status, list(headers.items()), dump_json(self.flask_app, payload)
+
+    def _user(self, req: FastRequest):
+        try:
+            return authenticate(req.headers.get("Authorization")), None
+        except ValueError as e:
+            return None, self._json(401, {"error": str(e)})
+
+    async def _hit(self, user, limits: dict):
+        """Count the request; returns ``(rate-limit headers, 429 response or None)``."""
+        result = await run_io(RateLimit(**limits).hit, user.email)
+        headers = rate_limit_headers(result)
+        if not result["allowed"]:
+            return headers, self._json(429, {
+                "error": "Rate limit exceeded",
+                "remaining_requests": result["remaining"],
+                "reset_time": result["reset"]
+            }, headers)
+        return headers, None
+
+    async def _limited_read(self, user, limits: dict, read):
+        """Await the rate-limit write and an independent read together.
+
+        A failed read comes back as the exception for the caller to raise;
+        a failed rate-limit call is raised here.
+        """
+        limited, item = await asyncio.gather(self._hit(user, limits), read, return_exceptions=True)
+        if isinstance(limited, BaseException):
+            raise limited
+        headers, error = limited
+        return headers, error, item
+
+    async def _phase1_begin(self, req: FastRequest) -> AsgiResponse:
+        user, error = self._user(req)
+        if error:
+            return error
+        try:
+            result = await run_io(api_warrior.get_controller().create_challenge, user.email)
+            return self._json(200, result)
+        except Exception as e:
+            return self._json(400, {"error": str(e)})
+
+    async def _phase1_step(self, req: FastRequest, challenge_id: str) -> AsgiResponse:
+        user, error = self._user(req)
+        if error:
+            return error
+        controller = api_warrior.get_controller()
+        headers, error, challenge = await self._limited_read(
+            user, api_warrior.STEP_RATE_LIMIT,
+            run_io(controller.get_challenge_item, user.email, challenge_id)
+        )
+        if error:
+            return error
+        try:
+            if isinstance(challenge, Exception):
+                raise challenge
+            if challenge is None:
+                raise ValueError("Challenge not found")
+            result = await run_io(
+                controller.verify_request_header, user.email, challenge_id, req.headers, challenge
+            )
+            return self._json(200, result, headers)
+        except ValueError as e:
+            return self._json(400, {"error": str(e)}, headers)
+        except Exception:
+            return self._json(500, {"error": "Internal server error"}, headers)
+
+    async def _phase1_complete(self, req: FastRequest, challenge_id: str) -> Optional[AsgiResponse]:
+        data = req.json()
+        if data is None:
+            return None
+        user, error = self._user(req)
+        if error:
+            return error
+        try:
+            if not isinstance(data, dict) or "assembled_key" not in data:
+                return self._json(400, {"error": "Missing assembled_key in request"})
+            # Challenge and profile are already fetched in a single batch_get.
+            result = await run_io(
+                api_warrior.get_controller().complete_challenge,
+                user.email, challenge_id, data["assembled_key"]
+            )
+            return self._json(200, result)
+        except ValueError as e:
+            return self._json(400, {"error": str(e)})
+        except Exception:
+            logger.exception("Unhandled error in %s", req.path)
+            return self._json(500, {"error": "Internal server error"})
+
+    async def _phase2_begin(self, req: FastRequest) -> AsgiResponse:
+        user, error = self._user(req)
+        if error:
+            return error
+        try:
+            result = await run_io(crypto_maze.get_controller().initialize_maze, user.email)
+            return self._json(200, result)
+        except Exception as e:
+            return self._json(400, {"error": str(e)})
+
+    async def _phase2_solve(self, req: FastRequest, maze_id: str) -> Optional[AsgiResponse]:
+        data = req.json()
+        if data is None:
+            return None
+        user, error = self._user(req)
+        if error:
+            return error
+        controller = crypto_maze.get_controller()
+        stage = data.get("stage") if isinstance(data, dict) else None
+        if isinstance(stage, int) and stage >= 1:
+            # The staged path checks the answer inside its write; nothing to read first.
+            headers, error = await self._hit(user, crypto_maze.SOLVE_RATE_LIMIT)
+            maze = None
+        else:
+            headers, error, maze = await self._limited_read(
+                user, crypto_maze.SOLVE_RATE_LIMIT,
+                run_io(controller.repo.get, controller._maze_key(user.email, maze_id))
+            )
+        if error:
+            return error
+        try:
+            if not isinstance(data, dict) or "decoded_message" not in data:
+                return self._json(400, {"error": "Missing decoded_message in request"}, headers)
+            if stage is not None and not isinstance(stage, int):
+                return self._json(400, {"error": "stage must be an integer"}, headers)
+            if isinstance(maze, Exception):
+                raise maze
+            if maze is None and not (stage and stage >= 1):
+                raise ValueError("Maze not found")
+
+            result = await run_io(
+                controller.verify_solution, user.email, maze_id, data["decoded_message"], stage, maze
+            )
+            return self._json(200, result, headers)
+        except ValueError as e:
+            return self._json(400, {"error": str(e)}, headers)
+        except Exception:
+            logger.exception("Unhandled error in %s", req.path)
+            return self._json(500, {"error": "Internal server error"}, headers)
+
+    def _catalog_entry(self, args: dict):
+        # The catalog cache serializes with the app's JSON provider.
+        with self.flask_app.app_context():
+            return catalog_entry(args)
+
+    async def _challenges(self, req: FastRequest) -> AsgiResponse:
+        try:
+            entry = await run_io(self._catalog_entry, req.args)
+        except ValueError as e:
+            return self._json(400, {"error": str(e)})
+        status, body, headers = catalog_cache.negotiate(
+            entry,
+            req.headers.get("If-None-Match"),
+            req.headers.get("Accept-Encoding"),
+        )
+        return status, list(headers.items()), body
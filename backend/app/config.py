@@ -0,0 +1,21 @@
+import os
+
+# Lambda gets its settings from the function environment, so the .env file
+# (and python-dotenv) is only loaded for local runs. Importing this module
+# loads it once for the whole process.
+ON_LAMBDA = bool(os.getenv("AWS_LAMBDA_FUNCTION_NAME"))
+if not ON_LAMBDA:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+
+def env(name: str, default: str = None) -> str:
+    return os.getenv(name, default)
+
+
+def env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
@@ -1,21 +1,22 @@
 from ..database.db_config import Database
+from ..database.repository import Repository, Update, ConditionFailed
 from ..models.user import User 
 from ..utils.auth import AuthUtil
-from dotenv import load_dotenv
-import os
-
-load_dotenv()
+from ..utils.hashing import HasherBusy
+from ..config import env
 
 class AuthController: 
     def __init__(self):
         self.db = Database()
-        self.table = self.db.connect().Table(os.getenv("DYNAMODB_TABLE_NAME"))
+        self.table = self.db.get_table(env("DYNAMODB_TABLE_NAME"))
+        self.repo = Repository(self.table)
         
     def register_user(self, data):        
-        user = self.get_user(data["email"])
-        if user:
+        # Checked before hashing so duplicates never take a bcrypt slot;
+        # the conditional create still settles concurrent registrations.
+        if self.repo.get({"pk": f"USER#{data['email']}", "sk": "PROFILE"}, ["pk"]):
             return {"message": "User already exists."}
-        
+
         user = User(
             pk=f"USER#{data['email']}",
             sk="PROFILE",
@@ -23,7 +24,10 @@ class AuthController:
             password=data["password"],
         )
         
-        self.table.put_item(Item=user.to_dict())
+        try:
+            self.repo.create(user.to_dict())
+        except ConditionFailed:
+            return {"message": "User already exists."}
         return user.to_dict()
     
     def login_user(self, data):
@@ -44,11 +48,27 @@ class AuthController:
         if not user.verify_password(data["password"]):
             raise ValueError("Incorrect password")
 
+        if user.needs_rehash():
+            try:
+                self._rehash_password(user, data["password"])
+            except HasherBusy:
+                pass  # the login stands; the next one re-hashes
+
         return {
             **{key: value for key, value in user.to_dict().items() if key != "password"},
             "token": AuthUtil.generate_token(user)
         }
 
+    def _rehash_password(self, user, password):
+        """Re-hash with the configured work factor after a successful login"""
+        user.password = user.hash_password(password)
+        user.update_updated_at()
+        self.repo.update(
+            {"pk": user.pk, "sk": user.sk},
+            Update().set("password", user.password).set("updated_at", user.updated_at.isoformat()),
+            return_values="NONE",
+        )
+
     def get_user(self, user_email):
         response = self.table.get_item(Key={"pk": f"USER#{user_email}", "sk": "PROFILE"})
         
@@ -1,34 +1,206 @@
 from datetime import datetime, timezone
 from app.database.db_config import Database
-import os
-from dotenv import load_dotenv
-from typing import List
+from app.database.repository import Repository
+from ..config import env
+from typing import Dict, Iterator, List, Optional, Tuple
 from ..models.challenge import Challenge
+from .leaderboard_controller import CHALLENGES, LeaderboardController
+from ..utils.catalog_cache import catalog_cache
+from ..utils.cursors import decode_cursor, encode_cursor
 
-load_dotenv()
+CATEGORY_INDEX = env("CHALLENGE_CATEGORY_INDEX", "category-index")
+DIFFICULTY_INDEX = env("CHALLENGE_DIFFICULTY_INDEX", "difficulty-index")
+MAX_PAGE_SIZE = 100
+# Upper bound on DynamoDB round trips spent filling one filtered page.
+MAX_PAGE_QUERIES = 10
+# What a CHALLENGE#TAG#<tag> item holds besides its keys: just the fields the
+# tag query filters on. The listed entries are read from the catalog item.
+TAG_ITEM_ATTRIBUTES = ("category", "difficulty", "tags")
 
 class ChallengeController:
     def __init__(self, ):
         self.db = Database()
-        self.table = self.db.connect().Table(os.getenv("DYNAMODB_TABLE_NAME"))
-        
+        self.table = self.db.get_table(env("DYNAMODB_TABLE_NAME"))
+        self.repo = Repository(self.table)
+
     def get_challenge(self, challenge_id: str) -> Challenge:
-        response = self.table.get_item(Key={"pk": "CHALLENGE", "sk": challenge_id})
-        if "Item" not in response:
+        if challenge_id not in CHALLENGES:
+            response = self.table.get_item(Key={"pk": "CHALLENGE", "sk": challenge_id})
+            if "Item" not in response:
+                return None
+            return Challenge.from_db(response["Item"]).to_dict()
+
+        # Game challenges report their live completion rate instead of the stored one.
+        items = {
+            item["pk"]: item
+            for item in self.repo.batch_get([
+                {"pk": "CHALLENGE", "sk": challenge_id},
+                {"pk": "STATS", "sk": f"CHALLENGE#{challenge_id}"}
+            ])
+        }
+        if "CHALLENGE" not in items:
             return None
-        challenge_data = response["Item"]
-        return Challenge.from_db(challenge_data).to_dict()
-    
+        challenge = Challenge.from_db(items["CHALLENGE"]).to_dict()
+        stats = LeaderboardController.summarize(items.get("STATS"))
+        if "completion_rate" in stats:
+            challenge["completion_rate"] = stats["completion_rate"]
+        return challenge
+
     def get_all_challenges(self) -> List[Challenge]:
-        response = self.table.query(KeyConditionExpression="pk = :pk", ExpressionAttributeValues={":pk": "CHALLENGE"})
+        return [challenge.to_dict() for page in self.iter_pages() for challenge in page]
+
+    def iter_pages(self, category: str = None, difficulty: str = None,
+                   tags: List[str] = None) -> Iterator[List[Challenge]]:
+        """Yield the filtered catalog one DynamoDB page at a time"""
+        cursor = None
+        while True:
+            page, cursor = self.query_challenges(category, difficulty, tags, MAX_PAGE_SIZE, cursor)
+            if page:
+                yield page
+            if not cursor:
+                return
+
+    def query_challenges(self, category: str = None, difficulty: str = None, tags: List[str] = None,
+                         limit: int = 20, cursor: Optional[str] = None) -> Tuple[List[Challenge], Optional[str]]:
+        """Return one page of challenges and the cursor for the next page.
+
+        The most selective filter picks the key condition (tag item partition,
+        then category index, then difficulty index, then the catalog
+        partition); any remaining filters run server-side as a FilterExpression.
+        Tag items carry only keys and filter fields, so a tag page is read
+        from the catalog items with one BatchGetItem.
+        """
+        tags = [tag for tag in (tags or []) if tag]
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        params = self._build_query(category, difficulty, tags)
+        start_key = self._check_cursor(decode_cursor(cursor), params)
+
         challenges = []
-        for item in response["Items"]:
-            challenges.append(Challenge.from_db(item))
-        # Return the Challenges to_dict
-        return [challenge.to_dict() for challenge in challenges]
-    
+        for _ in range(MAX_PAGE_QUERIES):
+            if start_key:
+                params["ExclusiveStartKey"] = start_key
+            response = self.table.query(Limit=limit - len(challenges), **params)
+            items = response.get("Items", [])
+            if tags:
+                items = self._catalog_items(items)
+            challenges.extend(Challenge.from_db(item) for item in items)
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key or len(challenges) >= limit:
+                break
+
+        return challenges, encode_cursor(start_key)
+
+    @staticmethod
+    def _check_cursor(start_key: Optional[Dict], params: Dict) -> Optional[Dict]:
+        """Accept only a LastEvaluatedKey from the partition this query reads"""
+        if start_key is None:
+            return None
+        partition = params["ExpressionAttributeNames"]["#pk"]
+        if (set(start_key) != {"pk", "sk", partition}
+                or not all(isinstance(value, str) for value in start_key.values())
+                or start_key[partition] != params["ExpressionAttributeValues"][":pk"]):
+            raise ValueError("Invalid cursor")
+        return start_key
+
+    def _catalog_items(self, tag_items: List[Dict]) -> List[Dict]:
+        """The catalog items behind a page of tag items, in the page's order"""
+        if not tag_items:
+            return []
+        found = {
+            item["sk"]: item
+            for item in self.repo.batch_get([{"pk": "CHALLENGE", "sk": item["sk"]} for item in tag_items])
+        }
+        return [found[item["sk"]] for item in tag_items if item["sk"] in found]
+
+    def _build_query(self, category: Optional[str], difficulty: Optional[str], tags: List[str]) -> Dict:
+        names = {"#pk": "pk"}
+        values = {}
+        filters = []
+
+        if tags:
+            key_condition = "#pk = :pk"
+            values[":pk"] = f"CHALLENGE#TAG#{tags[0]}"
+            index = None
+        elif category:
+            names["#pk"] = "category_key"
+            key_condition = "#pk = :pk"
+            values[":pk"] = category
+            index = CATEGORY_INDEX
+            category = None
+        elif difficulty:
+            names["#pk"] = "difficulty_key"
+            key_condition = "#pk = :pk"
+            values[":pk"] = difficulty
+            index = DIFFICULTY_INDEX
+            difficulty = None
+        else:
+            key_condition = "#pk = :pk"
+            values[":pk"] = "CHALLENGE"
+            index = None
+
+        if category:
+            names["#category"] = "category"
+            values[":category"] = category
+            filters.append("#category = :category")
+        if difficulty:
+            names["#difficulty"] = "difficulty"
+            values[":difficulty"] = difficulty
+            filters.append("#difficulty = :difficulty")
+        for i, tag in enumerate(tags[1:]):
+            names["#tags"] = "tags"
+            values[f":tag{i}"] = tag
+            filters.append(f"contains(#tags, :tag{i})")
+
+        params = {
+            "KeyConditionExpression": key_condition,
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": values,
+        }
+        if index:
+            params["IndexName"] = index
+        if filters:
+            params["FilterExpression"] = " AND ".join(filters)
+        return params
+
+    def _index_items(self, challenge_item: Dict) -> List[Dict]:
+        """Items that make a catalog entry reachable through the filter indexes"""
+        filter_fields = {
+            attr: challenge_item[attr] for attr in TAG_ITEM_ATTRIBUTES if challenge_item.get(attr) is not None
+        }
+        tag_items = [
+            {"pk": f"CHALLENGE#TAG#{tag}", "sk": challenge_item["sk"], **filter_fields}
+            for tag in (challenge_item.get("tags") or [])
+        ]
+        # Only the primary item carries the sparse GSI keys.
+        primary = dict(challenge_item)
+        if challenge_item.get("category"):
+            primary["category_key"] = challenge_item["category"]
+        if challenge_item.get("difficulty"):
+            primary["difficulty_key"] = challenge_item["difficulty"]
+        return [primary] + tag_items
+
     def create_challenge(self, data: dict) -> Challenge:
         challenge = Challenge.from_dict(data)
         challenge_item = challenge.to_dict()
-        self.table.put_item(Item=challenge_item)
+        # Re-creating an entry with fewer tags must not leave it reachable by the old ones.
+        previous = self.repo.get({"pk": "CHALLENGE", "sk": challenge_item["sk"]}, ["tags"]) or {}
+        dropped = set(previous.get("tags") or []) - set(challenge_item.get("tags") or [])
+        with self.table.batch_writer() as batch:
+            for item in self._index_items(challenge_item):
+                batch.put_item(Item=item)
+            for tag in dropped:
+                batch.delete_item(Key={"pk": f"CHALLENGE#TAG#{tag}", "sk": challenge_item["sk"]})
+        catalog_cache.invalidate()
         return challenge.to_dict()
+
+    def backfill_indexes(self) -> int:
+        """Write GSI keys and tag items for every catalog entry (also slims older full-copy tag items)"""
+        count = 0
+        with self.table.batch_writer() as batch:
+            for page in self.iter_pages():
+                for challenge in page:
+                    for item in self._index_items(challenge.to_dict()):
+                        batch.put_item(Item=item)
+                    count += 1
+        catalog_cache.invalidate()
+        return count
@@ -0,0 +1,121 @@
+import time
+from decimal import Decimal
+from typing import Dict, List, Optional
+from app.database.db_config import Database
+from ..config import env
+from ..utils.cursors import decode_cursor, encode_cursor
+from ..utils.rate_limit import API_RATE_LIMIT
+from .leaderboard_controller import LeaderboardController
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+# Upper bound on DynamoDB round trips spent filling one page past expired items.
+MAX_PAGE_QUERIES = 10
+
+# Everything the dashboard shows, across the item types in a user partition.
+# Password hashes, maze coordinates/answers/messages and the Phase 1 riddle
+# answers (required_headers) are never projected, so they are never read.
+DASHBOARD_ATTRIBUTES = (
+    "pk", "sk", "email", "status", "created_at", "updated_at", "completed_at",
+    "challenge_id", "phase", "solved_headers", "attempts", "expiry_time", "expires_at",
+    "maze_id", "current_position", "total_stages", "collected_tokens",
+    "request_count", "window_seconds",
+    "completions", "total_ms", "best_ms", "last_completed_at",
+)
+
+
+def _plain(value):
+    """DynamoDB numbers as ints (or floats), recursively"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _plain(v) for k, v in value.items()}
+    return value
+
+
+class DashboardController:
+    """A player's whole state from one Query on their partition.
+
+    Items come in descending sort-key order (``ScanIndexForward=False``):
+    stats, the rate-limit window, the profile, mazes, Phase 1 challenges and
+    the active-challenge pointer. The first page therefore carries the summary,
+    and long run histories continue on later pages through ``cursor``.
+    Expired items (past ``expires_at``, which TTL has not deleted yet) are
+    filtered out. DynamoDB applies ``Limit`` before the filter, so a short
+    page is topped up with further ``limit``-sized reads, at most
+    ``MAX_PAGE_QUERIES`` in all; a page cut short returns ``next_cursor``.
+    """
+
+    def __init__(self):
+        self.db = Database()
+        self.table = self.db.get_table(env("DYNAMODB_TABLE_NAME"))
+
+    def get_dashboard(self, user_email: str, limit: int = DEFAULT_PAGE_SIZE,
+                      cursor: Optional[str] = None) -> Dict:
+        pk = f"USER#{user_email}"
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        start_key = decode_cursor(cursor)
+        if start_key is not None and (start_key.get("pk") != pk or not isinstance(start_key.get("sk"), str)):
+            raise ValueError("Invalid cursor")
+
+        names = {f"#{attr}": attr for attr in DASHBOARD_ATTRIBUTES}
+        params = {
+            "KeyConditionExpression": "#pk = :pk",
+            "FilterExpression": "attribute_not_exists(#expires_at) OR #expires_at > :now",
+            "ProjectionExpression": ", ".join(names),
+            "ExpressionAttributeNames": names,
+            "ExpressionAttributeValues": {":pk": pk, ":now": int(time.time())},
+            "ScanIndexForward": False,
+            "Limit": limit,
+        }
+        items = []
+        for _ in range(MAX_PAGE_QUERIES):
+            if start_key:
+                params["ExclusiveStartKey"] = start_key
+            response = self.table.query(**params)
+            items.extend(response.get("Items", []))
+            start_key = response.get("LastEvaluatedKey")
+            if not start_key or len(items) >= limit:
+                break
+
+        if len(items) > limit:
+            items = items[:limit]
+            start_key = {"pk": pk, "sk": items[-1]["sk"]}
+        dashboard = self._assemble(items)
+        dashboard["next_cursor"] = encode_cursor(start_key)
+        return dashboard
+
+    def _assemble(self, items: List[Dict]) -> Dict:
+        dashboard = {
+            'profile': None,
+            'phase1': {'active_challenge_id': None, 'challenges': []},
+            'phase2': {'mazes': []},
+            'rate_limit': None,
+            'stats': {}
+        }
+        for item in items:
+            item = _plain(item)
+            sk = item.pop('sk')
+            item.pop('pk', None)
+            if sk == "PROFILE":
+                dashboard['profile'] = item
+            elif sk == "ACTIVE#PHASE1":
+                dashboard['phase1']['active_challenge_id'] = item.get('challenge_id')
+            elif sk.startswith("CHALLENGE#PHASE1#"):
+                dashboard['phase1']['challenges'].append(item)
+            elif sk.startswith("MAZE#"):
+                dashboard['phase2']['mazes'].append(item)
+            elif sk == "RATELIMIT#API":
+                dashboard['rate_limit'] = {
+                    'used': item.get('request_count', 0),
+                    'limit': API_RATE_LIMIT['max_requests'],
+                    'window_seconds': item.get('window_seconds', API_RATE_LIMIT['window_seconds'])
+                }
+            elif sk.startswith("STATS#"):
+                dashboard['stats'][sk[len("STATS#"):]] = LeaderboardController.summarize(item)
+
+        for runs in (dashboard['phase1']['challenges'], dashboard['phase2']['mazes']):
+            runs.sort(key=lambda run: run.get('created_at') or "", reverse=True)
+        return dashboard
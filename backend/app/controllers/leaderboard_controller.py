@@ -0,0 +1,326 @@
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+from app.database.db_config import Database
+from app.database.repository import Repository, Update, ConditionFailed, from_wire
+from ..config import env
+from ..utils.catalog_cache import CatalogCache
+from ..utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Game challenges with live statistics; the ids are also catalog ids.
+CHALLENGES = ("phase1", "phase2")
+# Sort key prefixes of run items; the stream consumer only sees these.
+RUN_PREFIXES = {"CHALLENGE#PHASE1#": "phase1", "MAZE#": "phase2"}
+LEADERBOARD_SIZE = int(env("LEADERBOARD_SIZE", "100"))
+LEADERBOARD_CACHE_TTL = float(env("LEADERBOARD_CACHE_TTL", "10"))
+# Optimistic write attempts when several completions race for the board.
+MAX_BOARD_RETRIES = 5
+
+leaderboard_cache = CatalogCache(LEADERBOARD_CACHE_TTL, max_entries=32)
+registry.add_collector("leaderboard_cache", leaderboard_cache.stats)
+
+# challenge -> (entry time needed to make the board, or None while it has room; expiry)
+_thresholds = {}
+_thresholds_lock = threading.Lock()
+
+
+class BoardConflict(Exception):
+    """Too many concurrent writers kept changing a board; the run must be offered again"""
+
+
+def _run_change(record: Dict) -> Optional[Tuple[str, str, Optional[Dict]]]:
+    """(``"start"`` or ``"completion"``, challenge, new image) for a stream record about a run"""
+    change = record.get("dynamodb", {})
+    sort_key = change.get("Keys", {}).get("sk", {}).get("S", "")
+    challenge = next((name for prefix, name in RUN_PREFIXES.items() if sort_key.startswith(prefix)), None)
+    if challenge is None:
+        return None
+    if record.get("eventName") == "INSERT":
+        return "start", challenge, None
+    if record.get("eventName") == "MODIFY":
+        new = from_wire(change.get("NewImage")) or {}
+        old = from_wire(change.get("OldImage")) or {}
+        if new.get("status") == "completed" and old.get("status") != "completed":
+            return "completion", challenge, new
+    return None
+
+
+def _elapsed_ms(started_at: str, finished_at: str) -> int:
+    elapsed = datetime.fromisoformat(finished_at) - datetime.fromisoformat(started_at)
+    return max(0, int(elapsed.total_seconds() * 1000))
+
+
+def _display_name(email: str) -> str:
+    """Public name for a player: the first letters of the mailbox and the domain"""
+    local, _, domain = email.partition("@")
+    return f"{local[:2]}***@{domain}" if domain else f"{local[:2]}***"
+
+
+def _player_id(email: str) -> str:
+    return hashlib.sha256(email.lower().encode("utf-8")).hexdigest()[:16]
+
+
+class LeaderboardController:
+    """Completion statistics and top-K boards, maintained from the table stream.
+
+    Items:
+
+    - ``STATS`` / ``CHALLENGE#<id>``: runs started, completions, wrong
+      attempts, total and best time for one challenge.
+    - ``USER#<email>`` / ``STATS#<id>``: the same for one player.
+    - ``LEADERBOARD`` / ``<id>``: the fastest ``LEADERBOARD_SIZE`` players,
+      sorted, with the time needed to enter the board.
+
+    Counters change with ADD updates, so concurrent completions never lose
+    an increment, and a best time only moves down through a conditional
+    write. The board is rewritten under its version only when a run can
+    enter it. Times needed to enter only ever go down, so a cached one is
+    safe to use to skip runs that are too slow.
+
+    None of this runs on the request path: ``apply_stream`` reads the run
+    items' changes (``stats_stream.py`` on Lambda, a background thread on
+    the in-process stand-in) and counts new runs as starts and runs that
+    turn ``completed`` as completions.
+    """
+
+    def __init__(self):
+        self.db = Database()
+        self.table = self.db.get_table(env("DYNAMODB_TABLE_NAME"))
+        self.repo = Repository(self.table)
+
+    def _challenge_key(self, challenge: str) -> Dict:
+        return {'pk': "STATS", 'sk': f"CHALLENGE#{challenge}"}
+
+    def _user_key(self, user_email: str, challenge: str) -> Dict:
+        return {'pk': f"USER#{user_email}", 'sk': f"STATS#{challenge}"}
+
+    def _board_key(self, challenge: str) -> Dict:
+        return {'pk': "LEADERBOARD", 'sk': challenge}
+
+    def apply_stream(self, records: List[Dict]) -> Optional[str]:
+        """Fold a batch of stream records into the statistics, in order.
+
+        Starts are summed and written together before the next completion
+        and at the end of the batch. On the first failure the batch stops
+        and the sequence number to retry from is returned, so no run is
+        dropped. Every step is idempotent or all-or-nothing, so a retry
+        counts nothing twice; only a consumer that dies after a write but
+        before reporting repeats it.
+        """
+        starts = {}  # challenge -> runs started since the last write
+        first_start = None
+
+        for record in records:
+            change = _run_change(record)
+            if change is None:
+                continue
+            kind, challenge, run = change
+            sequence = record["dynamodb"]["SequenceNumber"]
+            if kind == "start":
+                starts[challenge] = starts.get(challenge, 0) + 1
+                first_start = first_start or sequence
+                continue
+            if starts:
+                if not self._try(self.record_starts, starts):
+                    return first_start
+                starts, first_start = {}, None
+            user_email = run['pk'][len("USER#"):]
+            if not self._try(self.record_completion, user_email, challenge, run['created_at'],
+                             run['completed_at'], run.get('attempts', 0)):
+                return sequence
+        if starts and not self._try(self.record_starts, starts):
+            return first_start
+        return None
+
+    @staticmethod
+    def _try(write: Callable, *args) -> bool:
+        try:
+            write(*args)
+        except Exception:
+            logger.exception("Stream update %s failed", write.__name__)
+            return False
+        return True
+
+    def record_starts(self, counts: Dict[str, int]) -> None:
+        """Count new runs per challenge, all or none; completion rates are completions over runs started"""
+        updates = [(self._challenge_key(challenge), Update().add('started', count))
+                   for challenge, count in counts.items()]
+        if len(updates) == 1:
+            self.repo.update(*updates[0], return_values='NONE')
+        else:
+            self.repo.transact([self.repo.update_op(key, update) for key, update in updates])
+
+    def record_completion(self, user_email: str, challenge: str, started_at: str,
+                          completed_at: str, attempts: int) -> None:
+        """Fold a finished run into the aggregates and offer it to the board.
+
+        The board and the best times go first: writing them again changes
+        nothing. The challenge and player counters then move together in
+        one transaction.
+        """
+        elapsed_ms = _elapsed_ms(started_at, completed_at)
+        keys = (self._challenge_key(challenge), self._user_key(user_email, challenge))
+        self._offer(challenge, user_email, elapsed_ms, completed_at, attempts)
+        for key in keys:
+            try:
+                self.repo.update(
+                    key, Update().set('best_ms', elapsed_ms).expect_above('best_ms', elapsed_ms),
+                    return_values='NONE'
+                )
+            except ConditionFailed:
+                pass  # already as fast or faster
+        self.repo.transact([
+            self.repo.update_op(
+                key,
+                Update()
+                    .add('completions', 1)
+                    .add('attempts', int(attempts))
+                    .add('total_ms', elapsed_ms)
+                    .set('last_completed_at', completed_at)
+            )
+            for key in keys
+        ])
+
+    def _offer(self, challenge: str, user_email: str, elapsed_ms: int,
+               completed_at: str, attempts: int) -> None:
+        """Put the run on the board if it is among the fastest.
+
+        Raises ``BoardConflict`` when every attempt lost a race.
+        """
+        cached = _thresholds.get(challenge)
+        if cached and cached[1] > time.monotonic() and cached[0] is not None and elapsed_ms >= cached[0]:
+            return
+
+        entry = self.board_entry(user_email, elapsed_ms, attempts, completed_at)
+        for _ in range(MAX_BOARD_RETRIES):
+            board = self.repo.get(self._board_key(challenge)) or {}
+            entries = self._merge(board.get('entries', []), entry)
+            if entries is None:
+                self._remember_threshold(challenge, board.get('threshold_ms'))
+                return
+            threshold = self.board_threshold(entries)
+            try:
+                self.repo.update(
+                    self._board_key(challenge),
+                    Update()
+                        .set('entries', entries)
+                        .set('threshold_ms', threshold)
+                        .set('updated_at', datetime.now(timezone.utc).isoformat())
+                        .expect_version(board.get('version')),
+                    return_values='NONE'
+                )
+            except ConditionFailed:
+                continue
+            self._remember_threshold(challenge, threshold)
+            leaderboard_cache.invalidate()
+            return
+        raise BoardConflict(f"{challenge} leaderboard changed {MAX_BOARD_RETRIES} times during one offer")
+
+    @staticmethod
+    def board_entry(user_email: str, elapsed_ms: int, attempts: int, completed_at: str) -> Dict:
+        return {
+            'player_id': _player_id(user_email),
+            'player': _display_name(user_email),
+            'time_ms': int(elapsed_ms),
+            'attempts': int(attempts),
+            'completed_at': completed_at
+        }
+
+    @staticmethod
+    def board_threshold(entries: List[Dict]) -> Optional[int]:
+        """Time a run must beat to enter a board, or None while the board has room"""
+        return entries[-1]['time_ms'] if len(entries) >= LEADERBOARD_SIZE else None
+
+    @staticmethod
+    def _merge(entries: List[Dict], entry: Dict) -> Optional[List[Dict]]:
+        """The board with ``entry`` in it, or None when the run does not change it"""
+        previous = next((e for e in entries if e['player_id'] == entry['player_id']), None)
+        if previous is not None and previous['time_ms'] <= entry['time_ms']:
+            return None
+        merged = [e for e in entries if e is not previous] + [entry]
+        merged.sort(key=lambda e: (e['time_ms'], e['completed_at']))
+        merged = merged[:LEADERBOARD_SIZE]
+        if entry not in merged:
+            return None
+        return merged
+
+    @staticmethod
+    def _remember_threshold(challenge: str, threshold) -> None:
+        with _thresholds_lock:
+            _thresholds[challenge] = (threshold, time.monotonic() + LEADERBOARD_CACHE_TTL)
+
+    def challenge_stats_item(self, challenge: str, stats: Dict) -> Dict:
+        return {**self._challenge_key(challenge), **stats}
+
+    def player_stats_item(self, user_email: str, challenge: str, stats: Dict) -> Dict:
+        return {**self._user_key(user_email, challenge), **stats}
+
+    def board_item(self, challenge: str, entries: List[Dict]) -> Dict:
+        """A whole board item, as rebuilt by the aggregation job"""
+        return {
+            **self._board_key(challenge),
+            'entries': entries,
+            'threshold_ms': self.board_threshold(entries),
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        }
+
+    def get_leaderboard(self, challenge: str, limit: int = LEADERBOARD_SIZE) -> Dict:
+        """Top ``limit`` players and the challenge statistics, in one read"""
+        if challenge not in CHALLENGES:
+            raise ValueError(f"Unknown challenge: {challenge}")
+        limit = max(1, min(int(limit), LEADERBOARD_SIZE))
+        items = {
+            item['pk']: item
+            for item in self.repo.batch_get([self._board_key(challenge), self._challenge_key(challenge)])
+        }
+        board = items.get("LEADERBOARD", {})
+        return {
+            'challenge': challenge,
+            'stats': self.summarize(items.get("STATS")),
+            'entries': [
+                {
+                    'rank': rank,
+                    'player': e['player'],
+                    'time_seconds': int(e['time_ms']) / 1000,
+                    'attempts': int(e['attempts']),
+                    'completed_at': e['completed_at']
+                }
+                for rank, e in enumerate(board.get('entries', [])[:limit], start=1)
+            ],
+            'updated_at': board.get('updated_at')
+        }
+
+    @staticmethod
+    def summarize(stats: Optional[Dict]) -> Dict:
+        """Rates and averages from a raw aggregate item (challenge or player)"""
+        stats = stats or {}
+        started = int(stats.get('started', 0))
+        completions = int(stats.get('completions', 0))
+        attempts = int(stats.get('attempts', 0))
+        best = stats.get('best_ms')
+        summary = {
+            'completions': completions,
+            'failed_attempts': attempts,
+            'average_attempts': round(attempts / completions, 2) if completions else None,
+            'average_seconds': round(int(stats.get('total_ms', 0)) / completions / 1000, 3) if completions else None,
+            'best_seconds': int(best) / 1000 if best is not None else None,
+            'last_completed_at': stats.get('last_completed_at')
+        }
+        if 'started' in stats:
+            summary['started'] = started
+            summary['completion_rate'] = round(completions / started, 4) if started else 0.0
+        # Only the offline aggregation job computes distributions.
+        if 'attempt_distribution' in stats:
+            summary['attempt_distribution'] = {
+                attempts: int(count) for attempts, count in stats['attempt_distribution'].items()
+            }
+        if 'time_percentiles_ms' in stats:
+            summary['time_percentiles_seconds'] = {
+                name: int(ms) / 1000 for name, ms in stats['time_percentiles_ms'].items()
+            }
+        return summary
@@ -2,20 +2,27 @@ from datetime import datetime, timezone
 import uuid
 import random
 import base64
-from typing import Dict, Optional, List, Tuple
-from app.utils.auth import AuthUtil
+from typing import Dict, Optional, Tuple
+from app.utils.auth import AuthUtil, Principal, TOKEN_CLAIMS_MODE
 from app.database.db_config import Database
-import os
-from dotenv import load_dotenv
+from app.database.repository import Repository, Update, ConditionFailed
+from app.utils.challenge_pool import ChallengePool
+from app.utils.db_accounting import timed
+from app.utils.expiry import TTL_ATTRIBUTE, expect_live, is_expired, retain
+from ..config import env
 from app.models.user import User
 from datetime import timedelta
 
-load_dotenv()
+# Minimum gap between two header attempts on the same challenge.
+STEP_COOLDOWN_SECONDS = int(env("PHASE1_STEP_COOLDOWN_SECONDS", "12"))
+CHALLENGE_EXPIRED = "Challenge has expired. Please start a new challenge."
 
 class Phase1Controller:
     def __init__(self):
         self.db = Database()
-        self.table = self.db.connect().Table(os.getenv("DYNAMODB_TABLE_NAME"))
+        self.table = self.db.get_table(env("DYNAMODB_TABLE_NAME"))
+        self.repo = Repository(self.table)
+        self.pool = ChallengePool.get("PHASE1", self._pregenerate)
         self.header_sequence = ['X-Quest-Key', 'X-Quest-Sequence', 'X-Quest-Token']
         
     def _generate_riddles_and_headers(self, existing_headers: Dict = None) -> Dict:
@@ -69,23 +76,22 @@ class Phase1Controller:
         if expected_header != expected_header_in_sequence:
             raise ValueError(f"Invalid header sequence. Expected {expected_header_in_sequence}, got {expected_header}")
 
+    def _active_pointer_key(self, user_email: str) -> Dict:
+        return {'pk': f"USER#{user_email}", 'sk': "ACTIVE#PHASE1"}
+
+    def _pregenerate(self) -> Dict:
+        """Riddle set and id for one challenge, built ahead of time by the pool"""
+        return {
+            'challenge_id': str(uuid.uuid4()),
+            **self._generate_riddles_and_headers()
+        }
+
     def create_challenge(self, user_email: str) -> Dict:
         """Initialize a new challenge for a user"""
-        # Check if user has any active challenges
-        existing_challenges = self.table.query(
-            KeyConditionExpression="pk = :pk AND begins_with(sk, :sk)",
-            ExpressionAttributeValues={
-                ":pk": f"USER#{user_email}",
-                ":sk": "CHALLENGE#PHASE1#"
-            }
-        ).get('Items', [])
-        
-        active_challenges = [c for c in existing_challenges if c['status'] == 'active']
-        if active_challenges:
-            raise ValueError("You already have an active Phase 1 challenge")
-
-        riddle_data = self._generate_riddles_and_headers()
-        challenge_id = str(uuid.uuid4())
+        riddle_data = self.pool.claim()
+        challenge_id = riddle_data['challenge_id']
+        now = datetime.now(timezone.utc)
+        expiry = now + timedelta(hours=24)
         
         challenge_item = {
             'pk': f"USER#{user_email}",
@@ -96,13 +102,27 @@ class Phase1Controller:
             'required_headers': riddle_data['required_headers'],
             'solved_headers': [],
             'attempts': 0,
-            'created_at': datetime.now(timezone.utc).isoformat(),
-            'updated_at': datetime.now(timezone.utc).isoformat(),
-            'last_request_time': datetime.now(timezone.utc).isoformat(),
-            'expiry_time': (datetime.now(timezone.utc) + timedelta(hours=24)).isoformat()
+            'created_at': now.isoformat(),
+            'updated_at': now.isoformat(),
+            'last_request_time': now.isoformat(),
+            'expiry_time': expiry.isoformat(),
+            TTL_ATTRIBUTE: int(expiry.timestamp())
         }
-        
-        self.table.put_item(Item=challenge_item)
+
+        # The pointer and the challenge are written together; the pointer's
+        # condition is what enforces "one active challenge per user".
+        pointer_item = {
+            **self._active_pointer_key(user_email),
+            'challenge_id': challenge_id,
+            TTL_ATTRIBUTE: int(expiry.timestamp())
+        }
+        try:
+            self.repo.transact([
+                self.repo.put_op(pointer_item, Update().expect_below(TTL_ATTRIBUTE, int(now.timestamp()))),
+                self.repo.put_op(challenge_item)
+            ])
+        except ConditionFailed:
+            raise ValueError("You already have an active Phase 1 challenge")
         
         first_riddle = riddle_data['riddles']['X-Quest-Key']
         return {
@@ -114,23 +134,26 @@ class Phase1Controller:
             'expires_in': '24 hours'
         }
 
-    def verify_request_header(self, user_email: str, challenge_id: str, headers: Dict) -> Dict:
-        """Verify a single request header and provide the next riddle"""
-        response = self.table.get_item(
-            Key={
-                'pk': f"USER#{user_email}",
-                'sk': f"CHALLENGE#PHASE1#{challenge_id}"
-            }
-        )
+    def get_challenge_item(self, user_email: str, challenge_id: str) -> Optional[Dict]:
+        return self.repo.get(self._challenge_key(user_email, challenge_id))
+
+    @timed("verify_request_header")
+    def verify_request_header(self, user_email: str, challenge_id: str, headers: Dict,
+                              challenge: Optional[Dict] = None) -> Dict:
+        """Verify a single request header and provide the next riddle
+
+        ``challenge`` may be passed when the caller has already read the item
+        (the async server reads it alongside the rate-limit write).
+        """
+        if challenge is None:
+            challenge = self.get_challenge_item(user_email, challenge_id)
         
-        if 'Item' not in response:
+        if challenge is None:
             raise ValueError("Challenge not found")
-            
-        challenge = response['Item']
         
         # Check challenge expiry
-        if datetime.fromisoformat(challenge['expiry_time']) < datetime.now(timezone.utc):
-            raise ValueError("Challenge has expired. Please start a new challenge.")
+        if is_expired(challenge):
+            raise ValueError(CHALLENGE_EXPIRED)
             
         if challenge['status'] != 'active':
             raise ValueError("Challenge is not active")
@@ -138,8 +161,8 @@ class Phase1Controller:
         # Check rate limiting
         last_request = datetime.fromisoformat(challenge['last_request_time'])
         current_time = datetime.now(timezone.utc)
-        if (current_time - last_request).seconds < 12:  
-            raise ValueError("Rate limit exceeded. Please wait 12 seconds between attempts.")
+        if (current_time - last_request).seconds < STEP_COOLDOWN_SECONDS:
+            raise ValueError(f"Rate limit exceeded. Please wait {STEP_COOLDOWN_SECONDS} seconds between attempts.")
         
         # Determine which header should be solved next
         solved_headers = challenge.get('solved_headers', [])
@@ -160,17 +183,28 @@ class Phase1Controller:
         if current_header == 'X-Quest-Sequence':
             expected_value = required_headers[current_header]
             if submitted_value != expected_value:
-                challenge['attempts'] = challenge.get('attempts', 0) + 1
-                self._update_challenge(challenge)
-                raise ValueError(f"Invalid sequence number. Expected the decoded value. Attempt {challenge['attempts']}")
+                attempts = self._record_failed_attempt(user_email, challenge_id)
+                raise ValueError(f"Invalid sequence number. Expected the decoded value. Attempt {attempts}")
         else:
             expected_value = required_headers[current_header]
             if submitted_value != expected_value:
-                challenge['attempts'] = challenge.get('attempts', 0) + 1
-                self._update_challenge(challenge)
-                raise ValueError(f"Invalid {current_header} value. Attempt {challenge['attempts']}")
+                attempts = self._record_failed_attempt(user_email, challenge_id)
+                raise ValueError(f"Invalid {current_header} value. Attempt {attempts}")
         
-        # Mark header as solved
+        # Mark header as solved; the size guard rejects a concurrent double-solve
+        try:
+            self.repo.update(
+                self._challenge_key(user_email, challenge_id),
+                self._touch(Update())
+                    .append('solved_headers', [current_header])
+                    .expect('status', 'active')
+                    .expect_size('solved_headers', len(solved_headers))
+                    .expect_version(challenge.get('version')),
+                return_values='NONE',
+                return_old_on_failure=True
+            )
+        except ConditionFailed as e:
+            raise self._write_refused(e.item)
         challenge['solved_headers'] = solved_headers + [current_header]
         
         # Get next riddle if available
@@ -189,39 +223,31 @@ class Phase1Controller:
                 'hint': next_riddle['hint']
             })
         else:
-            completion_key = self._generate_completion_key(challenge['required_headers'])
             response.update({
                 'message': 'All headers solved! Now assemble the completion key.',
                 'completion_hint': 'Combine the values in this order: key + sequence + token\nExample: abc123 + 4567 + def890 = abc1234567def890'
             })
         
-        self._update_challenge(challenge)
         return response
 
     def _generate_completion_key(self, headers: Dict) -> str:
         """Generate completion key using stored decoded sequence value"""
         return f"{headers['X-Quest-Key']}{headers['X-Quest-Sequence']}{headers['X-Quest-Token']}"
 
+    @timed("complete_challenge")
     def complete_challenge(self, user_email: str, challenge_id: str, completion_key: str) -> Dict:
         """Verify the completion key and complete the challenge"""
-        response = self.table.get_item(
-            Key={
-                'pk': f"USER#{user_email}",
-                'sk': f"CHALLENGE#PHASE1#{challenge_id}"
-            }
-        )
+        challenge, profile = self._load_completion_state(user_email, challenge_id)
         
-        if 'Item' not in response:
+        if challenge is None:
             raise ValueError("Challenge not found")
-            
-        challenge = response['Item']
         
         # Verify challenge state
         if challenge['status'] != 'active':
             raise ValueError("Challenge is not active")
             
-        if datetime.fromisoformat(challenge['expiry_time']) < datetime.now(timezone.utc):
-            raise ValueError("Challenge has expired. Please start a new challenge.")
+        if is_expired(challenge):
+            raise ValueError(CHALLENGE_EXPIRED)
             
         if len(challenge['solved_headers']) < 3:
             raise ValueError("Must solve all header riddles first")
@@ -229,17 +255,35 @@ class Phase1Controller:
         correct_key = self._generate_completion_key(challenge['required_headers'])
         
         if completion_key != correct_key:
-            challenge['attempts'] += 1
-            self._update_challenge(challenge)
-            raise ValueError(f"Invalid completion key. Attempt {challenge['attempts']}")
+            attempts = self._record_failed_attempt(user_email, challenge_id)
+            raise ValueError(f"Invalid completion key. Attempt {attempts}")
         
-        # Mark challenge as completed
+        # Mark challenge as completed and release the active pointer together
         challenge['status'] = 'completed'
         challenge['completed_at'] = datetime.now(timezone.utc).isoformat()
-        self._update_challenge(challenge)
-        
+        try:
+            self.repo.transact([
+                self.repo.update_op(
+                    self._challenge_key(user_email, challenge_id),
+                    retain(self._touch(Update()))
+                        .set('status', 'completed')
+                        .set('completed_at', challenge['completed_at'])
+                        .expect('status', 'active')
+                        .expect_size('solved_headers', len(self.header_sequence))
+                        .expect_version(challenge.get('version'))
+                ),
+                self.repo.delete_op(
+                    self._active_pointer_key(user_email),
+                    Update().expect_absent_or('challenge_id', challenge_id)
+                )
+            ])
+        except ConditionFailed:
+            # Transactions do not say which condition failed; the item now does.
+            raise self._write_refused(self.get_challenge_item(user_email, challenge_id))
+        # Statistics and the leaderboard follow from the table stream.
+
         # Generate Phase 2 access token
-        phase2_token = self._generate_phase2_token(user_email)
+        phase2_token = self._generate_phase2_token(user_email, profile)
         
         return {
             'success': True,
@@ -254,19 +298,58 @@ class Phase1Controller:
             'next_phase_url': '/phase2/begin'
         }
 
-    def _update_challenge(self, challenge: Dict) -> None:
-        """Update challenge in database with timestamps"""
-        challenge['updated_at'] = datetime.now(timezone.utc).isoformat()
-        challenge['last_request_time'] = datetime.now(timezone.utc).isoformat()
-        self.table.put_item(Item=challenge)
+    def _load_completion_state(self, user_email: str, challenge_id: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Read the challenge, plus the profile when the token format needs it, in one call"""
+        challenge_key = self._challenge_key(user_email, challenge_id)
+        if TOKEN_CLAIMS_MODE != "full":
+            # Compact tokens only carry the subject, so the profile is not needed.
+            return self.repo.get(challenge_key), None
 
-    def _generate_phase2_token(self, user_email: str) -> Dict:
-        """Generate access token for Phase 2"""
-        user = User.from_dict(self.table.get_item(
-            Key={"pk": f"USER#{user_email}", "sk": "PROFILE"})["Item"])
-        
-        if not user:
-            raise ValueError("User not found")
+        profile_key = {'pk': f"USER#{user_email}", 'sk': "PROFILE"}
+        items = {item['sk']: item for item in self.repo.batch_get([challenge_key, profile_key])}
+        return items.get(challenge_key['sk']), items.get("PROFILE")
+
+    def _challenge_key(self, user_email: str, challenge_id: str) -> Dict:
+        return {'pk': f"USER#{user_email}", 'sk': f"CHALLENGE#PHASE1#{challenge_id}"}
+
+    def _touch(self, update: Update) -> Update:
+        """Stamp the timestamps every challenge write refreshes and refuse expired challenges"""
+        now = datetime.now(timezone.utc)
+        stamp = now.isoformat()
+        return expect_live(update, now.timestamp()).set('updated_at', stamp).set('last_request_time', stamp)
+
+    def _record_failed_attempt(self, user_email: str, challenge_id: str) -> int:
+        """Count a wrong answer in one write and return the new attempt total"""
+        try:
+            attributes = self.repo.update(
+                self._challenge_key(user_email, challenge_id),
+                self._touch(Update()).add('attempts', 1).expect('status', 'active'),
+                return_values='UPDATED_NEW',
+                return_old_on_failure=True
+            )
+        except ConditionFailed as e:
+            raise self._write_refused(e.item)
+        return int(attributes.get('attempts', 0))
+
+    @staticmethod
+    def _write_refused(challenge: Optional[Dict]) -> ValueError:
+        """Why a conditional challenge write failed, judged from the item as it is now"""
+        if challenge is None:
+            return ValueError("Challenge not found")
+        if is_expired(challenge):
+            return ValueError(CHALLENGE_EXPIRED)
+        if challenge.get('status') != 'active':
+            return ValueError("Challenge is not active")
+        return ValueError("Challenge was updated by another request. Please retry.")
+
+    def _generate_phase2_token(self, user_email: str, profile: Optional[Dict] = None) -> Dict:
+        """Generate access token for Phase 2 without another profile read"""
+        if TOKEN_CLAIMS_MODE == "full":
+            if not profile:
+                raise ValueError("User not found")
+            user = User.from_dict(profile)
+        else:
+            user = Principal(user_email)
         
         return {           
             "message": "Welcome to Phase 2. Your access token is ready.",
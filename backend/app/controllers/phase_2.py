@@ -1,23 +1,23 @@
 from datetime import datetime, timezone
 import uuid
 import random
-import base64
 from typing import Dict, List, Optional, Tuple
 from app.utils.auth import AuthUtil
+from app.utils import ciphers
 from app.database.db_config import Database
-import os
-from dotenv import load_dotenv
+from app.database.repository import Repository, Update, ConditionFailed
+from app.utils.challenge_pool import ChallengePool
+from app.utils.db_accounting import timed
+from app.utils.expiry import MAZE_TTL_SECONDS, TTL_ATTRIBUTE, expect_live, expires_in, is_expired, retain
+from ..config import env
 
-load_dotenv()
-
-# Configure Logging
-import logging
-logging.basicConfig(level=logging.INFO)
+MAZE_EXPIRED = "Maze has expired. Please start a new maze."
+MAZE_STAGES = 4
 
 class Phase2Controller:
     ENCRYPTION_KEYS = {
-        'caesar': 3,  # Shift by 3 positions
-        'xor': 42,    # XOR with key 42
+        'caesar': ciphers.CAESAR_SHIFT,  # Shift by 3 positions
+        'xor': ciphers.XOR_KEY,          # XOR with key 42
     }
 
     ENCRYPTION_HINTS = {
@@ -29,18 +29,26 @@ class Phase2Controller:
 
     def __init__(self):
         self.db = Database()
-        self.table = self.db.connect().Table(os.getenv("DYNAMODB_TABLE_NAME"))
-        self.encoding_methods = {
-            'base64': self._encode_base64,
-            'caesar': self._encode_caesar,
-            'xor': self._encode_xor,
-            'custom': self._encode_custom
+        self.table = self.db.get_table(env("DYNAMODB_TABLE_NAME"))
+        self.repo = Repository(self.table)
+        self.encoding_methods = {name: codec.encode for name, codec in ciphers.CODECS.items()}
+        self.pool = ChallengePool.get("PHASE2", self._pregenerate)
+
+    def _pregenerate(self) -> Dict:
+        """Path, answers and encoded messages for one maze, built ahead of time by the pool"""
+        coordinates = self._generate_maze_path()
+        return {
+            'maze_id': str(uuid.uuid4()),
+            'coordinates': coordinates,
+            'answers': [f"Navigate to ({c['x']}, {c['y']})" for c in coordinates],
+            'encoded_messages': self._create_encoded_messages(coordinates)
         }
         
     def initialize_maze(self, user_email: str) -> Dict:
-        maze_id = str(uuid.uuid4())
-        coordinates = self._generate_maze_path()
-        encoded_messages = self._create_encoded_messages(coordinates)
+        maze = self.pool.claim()
+        maze_id = maze['maze_id']
+        coordinates = maze['coordinates']
+        encoded_messages = maze['encoded_messages']
         
         maze_item = {
             'pk': f"USER#{user_email}",
@@ -52,7 +60,11 @@ class Phase2Controller:
             'collected_tokens': [],
             'attempts': 0,
             'created_at': datetime.now(timezone.utc).isoformat(),
-            'total_stages': len(coordinates)
+            'total_stages': len(coordinates),
+            # Plain answers let verify_solution check a submission inside the write
+            'answers': maze['answers'],
+            'encoded_messages': encoded_messages,
+            TTL_ATTRIBUTE: expires_in(MAZE_TTL_SECONDS)
         }
         
         self.table.put_item(Item=maze_item)
@@ -66,50 +78,127 @@ class Phase2Controller:
             'current_stage': 1
         }
 
-    def verify_solution(self, user_email: str, maze_id: str, decoded_message: str) -> Dict:
-        maze = self._get_maze(user_email, maze_id)
+    @timed("verify_solution")
+    def verify_solution(self, user_email: str, maze_id: str, decoded_message: str,
+                        stage: Optional[int] = None, maze: Optional[Dict] = None) -> Dict:
+        """Check a decoded message and advance the maze.
+
+        When the client sends the stage it believes it is on, the answer is
+        checked inside a conditional write; a failed condition returns the
+        current item, so wrong answers are handled without reading first.
+        Without a stage, ``maze`` may carry an item the caller already read.
+        """
+        decoded_message = decoded_message.strip()
+        if stage is not None and int(stage) >= 1:
+            try:
+                maze, token = self._advance(user_email, maze_id, int(stage) - 1, decoded_message)
+                return self._solved_response(user_email, maze_id, maze, token)
+            except ConditionFailed as e:
+                if e.item is None:
+                    raise ValueError("Maze not found")
+                maze = e.item
+        elif maze is None:
+            maze = self._get_maze(user_email, maze_id)
+
+        if is_expired(maze):
+            raise ValueError(MAZE_EXPIRED)
+        if maze['status'] != 'active':
+            raise ValueError("Maze is not active")
+
         current_pos = int(maze['current_position'])
-        
         if not self._verify_coordinate(maze, current_pos, decoded_message):
-            maze['attempts'] += 1
-            self._update_maze(maze)
+            attempts = self._record_failed_attempt(user_email, maze_id)
             expected_format = "Navigate to (X, Y) - where X and Y are numbers"
             raise ValueError(
-                f"Invalid solution (Attempt {maze['attempts']}).\n"
+                f"Invalid solution (Attempt {attempts}).\n"
                 f"Expected format: {expected_format}\n"
                 f"Make sure your decoding is correct and the message matches exactly."
             )
-            
+
+        try:
+            maze, token = self._advance(
+                user_email, maze_id, current_pos, total_stages=int(maze['total_stages'])
+            )
+        except ConditionFailed as e:
+            raise self._write_refused(e.item)
+        return self._solved_response(user_email, maze_id, maze, token)
+
+    def _advance(self, user_email: str, maze_id: str, position: int, answer: Optional[str] = None,
+                 total_stages: int = MAZE_STAGES) -> Tuple[Dict, str]:
+        """Move from ``position`` to the next stage in one write guarded on the position.
+
+        Solving the last stage completes the maze in the same write. Both
+        variants also require ``total_stages`` to agree, so when the caller
+        has not read the maze (staged answers assume ``MAZE_STAGES``) a wrong
+        guess fails the condition instead of finishing early or late.
+        """
         token = self._generate_token()
-        maze['collected_tokens'].append(token)
-        maze['current_position'] += 1
-        
-        if maze['current_position'] >= len(maze['coordinates']):
-            maze['status'] = 'completed'
-            self._update_maze(maze)
+        update = (
+            self._touch(Update())
+                .add('current_position', 1)
+                .append('collected_tokens', [token])
+                .expect('status', 'active')
+                .expect('current_position', position)
+        )
+        if position + 1 == total_stages:
+            update = (
+                retain(update)
+                    .set('status', 'completed')
+                    .set('completed_at', datetime.now(timezone.utc).isoformat())
+                    .expect('total_stages', total_stages)
+            )
+        else:
+            update.expect_above('total_stages', position + 1)
+        if answer is not None:
+            update.expect_element('answers', position, answer)
+        maze = self.repo.update(self._maze_key(user_email, maze_id), update, return_old_on_failure=True)
+        return maze, token
+
+    def _record_failed_attempt(self, user_email: str, maze_id: str) -> int:
+        try:
+            attributes = self.repo.update(
+                self._maze_key(user_email, maze_id),
+                self._touch(Update()).add('attempts', 1),
+                return_values='UPDATED_NEW',
+                return_old_on_failure=True
+            )
+        except ConditionFailed as e:
+            raise self._write_refused(e.item)
+        return int(attributes['attempts'])
+
+    @staticmethod
+    def _write_refused(maze: Optional[Dict]) -> ValueError:
+        """Why a conditional maze write failed, judged from the item as it is now"""
+        if maze is None:
+            return ValueError("Maze not found")
+        if is_expired(maze):
+            return ValueError(MAZE_EXPIRED)
+        if maze.get('status') != 'active':
+            return ValueError("Maze is not active")
+        return ValueError("Maze was updated by another request. Please retry.")
+
+    def _solved_response(self, user_email: str, maze_id: str, maze: Dict, token: str) -> Dict:
+        current_position = int(maze['current_position'])
+        total_stages = len(maze['coordinates'])
+
+        if maze['status'] == 'completed':
             return {
                 'success': True,
                 'message': 'Congratulations! You\'ve completed the maze!',
                 'final_tokens': maze['collected_tokens'],
-                'total_stages': len(maze['coordinates']),
-                'current_stage': len(maze['coordinates'])
+                'total_stages': total_stages,
+                'current_stage': total_stages
             }
             
-        next_encoding_type = self._get_next_encoding_type(maze['current_position'])
-        coords = maze['coordinates'][int(maze['current_position'])]
-        message = f"Navigate to ({coords['x']}, {coords['y']})"
-        
-        # Apply correct encoding based on type
-        if next_encoding_type == 'caesar':
-            next_message = self._encode_caesar(message)
-        elif next_encoding_type == 'base64':
-            next_message = self._encode_base64(message)
-        elif next_encoding_type == 'xor':
-            next_message = self._encode_xor(message)
-        else:  # custom
-            next_message = self._encode_custom(message)
-        
-        self._update_maze(maze)
+        next_encoding_type = self._get_next_encoding_type(current_position)
+        encoded_messages = maze.get('encoded_messages')
+        if encoded_messages:
+            next_message = encoded_messages[current_position]
+        else:
+            # Mazes created before messages were stored
+            coords = maze['coordinates'][current_position]
+            message = f"Navigate to ({coords['x']}, {coords['y']})"
+            next_message = ciphers.encode(next_encoding_type, message)
         
         return {
             'success': True,
@@ -117,8 +206,8 @@ class Phase2Controller:
             'next_message': next_message,
             'encoding_type': next_encoding_type,
             'hint': self.ENCRYPTION_HINTS[next_encoding_type],
-            'current_stage': maze['current_position'] + 1,
-            'total_stages': len(maze['coordinates'])
+            'current_stage': current_position + 1,
+            'total_stages': total_stages
         }
 
     def _verify_coordinate(self, maze: Dict, position: int, decoded_message: str) -> bool:
@@ -130,50 +219,29 @@ class Phase2Controller:
     def _generate_maze_path(self) -> List[Dict]:
         coordinates = []
         x, y = 0, 0
-        for _ in range(4):  # 4 stages in total
+        for _ in range(MAZE_STAGES):
             x += random.randint(-2, 2)
             y += random.randint(-2, 2)
             coordinates.append({'x': int(x), 'y': int(y)})
         return coordinates
 
     def _create_encoded_messages(self, coordinates: List[Dict]) -> List[str]:
-        messages = []
-        for i, coord in enumerate(coordinates):
-            message = f"Navigate to ({coord['x']}, {coord['y']})"
-            encoding_type = self._get_next_encoding_type(i)
-            messages.append(self.encoding_methods[encoding_type](message))
-        return messages
+        return ciphers.encode_batch(
+            (self._get_next_encoding_type(i), f"Navigate to ({coord['x']}, {coord['y']})")
+            for i, coord in enumerate(coordinates)
+        )
 
     def _encode_base64(self, message: str) -> str:
-        return base64.b64encode(message.encode()).decode()
+        return ciphers.encode('base64', message)
 
     def _encode_caesar(self, message: str) -> str:
-        shift = self.ENCRYPTION_KEYS['caesar']
-        result = ""
-        for char in message:
-            if char.isalpha():
-                is_upper = char.isupper()
-                char_code = ord(char.lower()) - ord('a')
-                shifted_code = (char_code + shift) % 26
-                shifted_char = chr(shifted_code + ord('a'))
-                result += shifted_char.upper() if is_upper else shifted_char
-            elif char.isdigit():
-                # Shift numbers by 3 positions (0-9)
-                digit = int(char)
-                shifted_digit = (digit + shift) % 10
-                result += str(shifted_digit)
-            else:
-                result += char
-        return result
+        return ciphers.encode('caesar', message)
 
     def _encode_xor(self, message: str) -> str:
-        # XOR with key 42
-        key = self.ENCRYPTION_KEYS['xor']
-        return ''.join([chr(ord(c) ^ key) for c in message])
+        return ciphers.encode('xor', message)
 
     def _encode_custom(self, message: str) -> str:
-        # Reverse the message and encode in Base64
-        return base64.b64encode(message[::-1].encode()).decode()
+        return ciphers.encode('custom', message)
 
     def _get_next_encoding_type(self, position: int) -> str:
         # Cycle through the encoding types
@@ -184,22 +252,22 @@ class Phase2Controller:
         # Generate a random 8-character token
         return str(uuid.uuid4())[:8]
 
+    def _maze_key(self, user_email: str, maze_id: str) -> Dict:
+        return {'pk': f"USER#{user_email}", 'sk': f"MAZE#{maze_id}"}
+
     def _get_maze(self, user_email: str, maze_id: str) -> Dict:
         # Retrieve maze from database
-        response = self.table.get_item(
-            Key={
-                'pk': f"USER#{user_email}",
-                'sk': f"MAZE#{maze_id}"
-            }
-        )
-        if 'Item' not in response:
+        maze = self.repo.get(self._maze_key(user_email, maze_id))
+        if maze is None:
             raise ValueError("Maze not found")
-        return response['Item']
+        if is_expired(maze):
+            raise ValueError(MAZE_EXPIRED)
+        return maze
 
-    def _update_maze(self, maze: Dict) -> None:
-        """Update maze state in database."""
-        maze['updated_at'] = datetime.now(timezone.utc).isoformat()
-        self.table.put_item(Item=maze)
+    def _touch(self, update: Update) -> Update:
+        """Stamp updated_at on a maze write and require the maze to exist and be live"""
+        now = datetime.now(timezone.utc)
+        return expect_live(update.set('updated_at', now.isoformat()).expect_exists(), now.timestamp())
         
     def get_progress(self, user_email: str, maze_id: str) -> Dict:
         maze = self._get_maze(user_email, maze_id)
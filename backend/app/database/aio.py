@@ -0,0 +1,47 @@
+"""Awaitable DynamoDB access for the async serving mode.
+
+boto3 has no asyncio support, so blocking calls run on a dedicated, bounded
+thread pool and the event loop only awaits them. Pool threads get their own
+resources through ``Database``/``TableHandle`` like any request thread, and
+independent calls can be awaited together with ``asyncio.gather``.
+"""
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable
+from ..config import env
+
+_executor = None
+_lock = threading.Lock()
+
+
+def io_executor() -> ThreadPoolExecutor:
+    """The shared I/O pool, sized to the DynamoDB connection pool by default."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                workers = int(env("DYNAMODB_IO_THREADS", env("DYNAMODB_MAX_POOL_CONNECTIONS", "50")))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dynamodb-io")
+    return _executor
+
+
+async def run_io(fn: Callable, *args, **kwargs):
+    """Run a blocking call (table, repository or controller method) off the event loop.
+
+    The caller's context variables travel with the call, so per-request state
+    set in the handler is visible inside it.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(io_executor(), partial(context.run, fn, *args, **kwargs))
+
+
+def shutdown() -> None:
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
@@ -1,33 +1,160 @@
-import boto3
-import os
-from botocore.exceptions import NoCredentialsError, PartialCredentialsError
-from dotenv import load_dotenv
+from ..config import env
+import logging
+import threading
+from ..utils import db_accounting
+from ..utils.metrics import registry
+from ..utils.startup_profile import profiler
+
+# boto3/botocore are the heaviest imports in the app, so they are only loaded
+# when the first thread actually connects.
+
+logger = logging.getLogger(__name__)
+
+
+def client_error():
+    """botocore's ClientError, imported on demand (use as ``except client_error()``)."""
+    from botocore.exceptions import ClientError
+    return ClientError
 
-load_dotenv()
 
 class Database:
+    """Process-wide DynamoDB access shared by every controller.
+
+    boto3 resources are not thread-safe, so each worker thread gets its own
+    resource, but all of them come from one session and share the same
+    pool-sized, keep-alive connection config. Constructing a ``Database`` is
+    cheap: it never opens a connection on its own.
+    """
+
+    _lock = threading.Lock()
+    _local = threading.local()
+    _session = None
+    _stats = {
+        "resources_created": 0,
+        "tables_created": 0,
+        "connect_errors": 0,
+    }
+
     def __init__(self):
-        self.dynamodb = None
-        self.aws_access_key = os.getenv("AWS_ACCESS_KEY_ID")
-        self.aws_secret_key = os.getenv("AWS_SECRET_ACCESS_KEY")
-        self.aws_region = os.getenv("AWS_REGION")
-        self.dynamodb_endpoint = os.getenv("DYNAMODB_ENDPOINT")
+        self.aws_access_key = env("AWS_ACCESS_KEY_ID")
+        self.aws_secret_key = env("AWS_SECRET_ACCESS_KEY")
+        self.aws_region = env("AWS_REGION")
+        self.dynamodb_endpoint = env("DYNAMODB_ENDPOINT")
+        self.max_pool_connections = int(env("DYNAMODB_MAX_POOL_CONNECTIONS", "50"))
+        # "memory" swaps in the in-process stand-in (local dev, tests, benchmarks).
+        self.backend = env("DYNAMODB_BACKEND", "dynamodb").lower()
+
+    @property
+    def dynamodb(self):
+        return getattr(self._local, "resource", None)
+
+    def _client_config(self):
+        from botocore.config import Config
+        return Config(
+            max_pool_connections=self.max_pool_connections,
+            tcp_keepalive=True,
+            retries={"max_attempts": 3, "mode": "standard"},
+        )
 
     def connect(self):
+        """Return the calling thread's shared DynamoDB resource, creating it once."""
+        resource = self._local.__dict__.get("resource")
+        if resource is not None:
+            return resource
+
+        if self.backend == "memory":
+            from .memory import shared
+            resource = shared()
+            with self._lock:
+                self._stats["resources_created"] += 1
+            self._local.resource = resource
+            self._local.tables = {}
+            return resource
+
+        import boto3
+        from botocore.exceptions import NoCredentialsError, PartialCredentialsError
+
         try:
-            self.dynamodb = boto3.resource(
-                'dynamodb',
-                endpoint_url=self.dynamodb_endpoint,
-                region_name=self.aws_region,
-                aws_access_key_id= self.aws_access_key,
-                aws_secret_access_key= self.aws_secret_key
-            )
-            print("Connected to DynamoDB Local successfully!")
+            with self._lock, profiler.phase("dynamodb.connect", once=True):
+                if Database._session is None:
+                    Database._session = boto3.session.Session()
+                # Session.resource() is not safe to call concurrently.
+                resource = Database._session.resource(
+                    'dynamodb',
+                    endpoint_url=self.dynamodb_endpoint,
+                    region_name=self.aws_region,
+                    aws_access_key_id=self.aws_access_key,
+                    aws_secret_access_key=self.aws_secret_key,
+                    config=self._client_config()
+                )
+                self._stats["resources_created"] += 1
         except (NoCredentialsError, PartialCredentialsError) as e:
-            print(f"Failed to connect to DynamoDB: {str(e)}")
-        return self.dynamodb
+            with self._lock:
+                self._stats["connect_errors"] += 1
+            logger.error("Failed to connect to DynamoDB: %s", e)
+            return None
+
+        self._local.resource = resource
+        self._local.tables = {}
+        return resource
+
+    def get_table(self, table_name: str = None):
+        """Return a handle to ``table_name`` (defaults to ``DYNAMODB_TABLE_NAME``).
+
+        The handle is safe to keep on long-lived objects such as module-level
+        controllers: every call is dispatched to the current thread's table.
+        """
+        return TableHandle(self, table_name or env("DYNAMODB_TABLE_NAME"))
+
+    def _thread_table(self, table_name: str):
+        # Hot path: every table call lands here, so reuse takes no lock.
+        tables = self._local.__dict__.get("tables")
+        if tables is not None and table_name in tables:
+            return tables[table_name]
+
+        resource = self.connect()
+        if resource is None:
+            raise Exception("Database connection is not established.")
+        table = resource.Table(table_name)
+        self._local.tables[table_name] = table
+        with self._lock:
+            self._stats["tables_created"] += 1
+        return table
+
+    @classmethod
+    def pool_stats(cls) -> dict:
+        """Resources and tables created so far, across all threads."""
+        with cls._lock:
+            stats = dict(cls._stats)
+        stats["backend"] = env("DYNAMODB_BACKEND", "dynamodb").lower()
+        stats["max_pool_connections"] = int(env("DYNAMODB_MAX_POOL_CONNECTIONS", "50"))
+        stats["active_threads"] = threading.active_count()
+        return stats
+
+    @classmethod
+    def reset(cls) -> None:
+        """Drop the shared session and the calling thread's cached resource."""
+        with cls._lock:
+            cls._session = None
+            for key in cls._stats:
+                cls._stats[key] = 0
+        cls._local.__dict__.pop("resource", None)
+        cls._local.__dict__.pop("tables", None)
+
+
+registry.add_collector("dynamodb", Database.pool_stats)
+
+
+class TableHandle:
+    """Thread-aware proxy for a DynamoDB ``Table``."""
+
+    def __init__(self, db: Database, table_name: str):
+        self._db = db
+        self.name = table_name
+
+    def __getattr__(self, attr):
+        # Calls made while a request is tracked are counted and timed.
+        return db_accounting.instrument(attr, getattr(self._db._thread_table(self.name), attr))
 
-    def get_table(self, table_name):
-        if not self.dynamodb:
-            raise Exception("Database connection is not established. Call 'connect()' first.")
-        return self.dynamodb.Table(table_name)
\ No newline at end of file
+    def __repr__(self) -> str:
+        return f"TableHandle(name={self.name})"
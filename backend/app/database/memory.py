@@ -0,0 +1,1537 @@
+"""In-process DynamoDB stand-in for local dev, tests and benchmarks.
+
+With ``DYNAMODB_BACKEND=memory``, ``Database.connect`` hands out the shared
+``MemoryDynamoDB`` instead of a boto3 resource, so every controller runs
+unchanged against process memory. Tables default to the single-table layout
+(``pk``/``sk`` plus the catalog GSIs in ``terraform/dynamodb.tf``) and follow
+the service's semantics for the calls the app makes:
+
+- condition, key-condition, filter, projection and update expressions, with
+  their name/value placeholders (unused placeholders are rejected too)
+- ``Limit``/``ExclusiveStartKey`` pagination, including the 1 MB page cap,
+  and segmented scans
+- ``ReturnValues``, ``ReturnValuesOnConditionCheckFailure`` and
+  ``ReturnConsumedCapacity``
+- batch get/write and all-or-nothing transactions through ``meta.client``
+- the TTL setting (expired items are not deleted by the stand-in)
+- a table stream (``MemoryTable.attach_stream``) with new and old images,
+  delivered in batches on a background thread as a Lambda event source
+  mapping would
+
+Failures raise botocore's ``ClientError`` with the service's error codes.
+One re-entrant lock guards all tables, so each call (and each transaction) is
+atomic across threads. Stored items are never mutated in place; writes
+replace them, so reads copy outside the lock.
+"""
+import bisect
+import math
+import re
+import threading
+import time
+import zlib
+from collections import Counter, deque
+from decimal import Decimal
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..config import env
+
+MAX_PAGE_BYTES = 1024 * 1024
+MAX_TRANSACT_ITEMS = 100
+
+# Mirrors terraform/dynamodb.tf: index name -> (hash key, range key).
+DEFAULT_INDEXES = {
+    env("CHALLENGE_CATEGORY_INDEX", "category-index"): ("category_key", "sk"),
+    env("CHALLENGE_DIFFICULTY_INDEX", "difficulty-index"): ("difficulty_key", "sk"),
+}
+
+_MISSING = object()
+
+
+class _Invalid(Exception):
+    """ValidationException raised by the service."""
+
+
+class _ConditionFailed(Exception):
+    def __init__(self, item: Optional[Dict] = None):
+        super().__init__("The conditional request failed")
+        self.item = item
+
+
+class _Cancelled(Exception):
+    def __init__(self, reasons: List[Dict]):
+        codes = ", ".join(reason["Code"] for reason in reasons)
+        super().__init__(f"Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]")
+        self.reasons = reasons
+
+
+class _NotFound(Exception):
+    pass
+
+
+class _InUse(Exception):
+    pass
+
+
+def _client_error(code: str, message: str, operation: str, **extra):
+    from botocore.exceptions import ClientError
+
+    response = {
+        "Error": {"Code": code, "Message": message},
+        "ResponseMetadata": {"HTTPStatusCode": 400},
+    }
+    response.update(extra)
+    return ClientError(response, operation)
+
+
+def _serialize_item(item: Dict) -> Dict:
+    """Low-level (``{"S": ...}``) form, as the service returns items in errors."""
+    from boto3.dynamodb.types import TypeSerializer
+
+    serializer = TypeSerializer()
+    return {name: serializer.serialize(value) for name, value in item.items()}
+
+
+def _operation(name: str):
+    """Count the call and translate internal failures into ``ClientError``."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if args:
+                raise TypeError(f"{name} only accepts keyword arguments.")
+            self._backend._record(name)
+            try:
+                return method(self, **kwargs)
+            except _Invalid as e:
+                raise _client_error("ValidationException", str(e), name) from None
+            except _ConditionFailed as e:
+                extra = {"Item": _serialize_item(e.item)} if e.item else {}
+                raise _client_error("ConditionalCheckFailedException", str(e), name, **extra) from None
+            except _Cancelled as e:
+                raise _client_error("TransactionCanceledException", str(e), name,
+                                    CancellationReasons=e.reasons)
+            except _NotFound as e:
+                raise _client_error("ResourceNotFoundException", str(e), name) from None
+            except _InUse as e:
+                raise _client_error("ResourceInUseException", str(e), name) from None
+        return wrapper
+    return decorator
+
+
+# -- values ------------------------------------------------------------------
+
+def _normalize(value):
+    """Validate and store a value the way boto3 serializes it (ints become Decimal)."""
+    if value is None or isinstance(value, (str, bool, Decimal)):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    if isinstance(value, float):
+        raise TypeError("Float types are not supported. Use Decimal types instead.")
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value)
+    if isinstance(getattr(value, "value", None), bytes):  # boto3 Binary
+        return value.value
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        if not value:
+            raise _Invalid("One or more parameter values were invalid: An number set  may not be empty")
+        return {_normalize(item) for item in value}
+    raise TypeError(f'Unsupported type "{type(value)}" for value "{value}"')
+
+
+def _clone(value):
+    if isinstance(value, dict):
+        return {key: _clone(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_clone(item) for item in value]
+    if isinstance(value, set):
+        return set(value)
+    return value
+
+
+def _type_of(value) -> Optional[str]:
+    if isinstance(value, bool):
+        return "BOOL"
+    if value is None:
+        return "NULL"
+    if isinstance(value, str):
+        return "S"
+    if isinstance(value, Decimal):
+        return "N"
+    if isinstance(value, bytes):
+        return "B"
+    if isinstance(value, dict):
+        return "M"
+    if isinstance(value, list):
+        return "L"
+    if isinstance(value, set):
+        member = _type_of(next(iter(value)))
+        return f"{member}S" if member in ("S", "N", "B") else None
+    return None
+
+
+def _size(value) -> int:
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, Decimal):
+        return len(value.as_tuple().digits) // 2 + 2
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return 3 + sum(len(key.encode("utf-8")) + 1 + _size(item) for key, item in value.items())
+    if isinstance(value, list):
+        return 3 + sum(1 + _size(item) for item in value)
+    if isinstance(value, set):
+        return sum(_size(item) for item in value)
+    return 0
+
+
+def _item_size(item: Optional[Dict]) -> int:
+    if not item:
+        return 0
+    return sum(len(name.encode("utf-8")) + _size(value) for name, value in item.items())
+
+
+def _equal(a, b) -> bool:
+    if isinstance(a, bool) != isinstance(b, bool):
+        return False
+    return a == b
+
+
+def _orderable(a, b) -> bool:
+    if isinstance(a, bool) or isinstance(b, bool):
+        return False
+    return (
+        (isinstance(a, str) and isinstance(b, str))
+        or (isinstance(a, Decimal) and isinstance(b, Decimal))
+        or (isinstance(a, bytes) and isinstance(b, bytes))
+    )
+
+
+def _compare(op: str, a, b) -> bool:
+    if a is _MISSING or b is _MISSING:
+        return op == "<>"
+    if op == "=":
+        return _equal(a, b)
+    if op == "<>":
+        return not _equal(a, b)
+    if not _orderable(a, b):
+        return False
+    if op == "<":
+        return a < b
+    if op == "<=":
+        return a <= b
+    if op == ">":
+        return a > b
+    return a >= b
+
+
+# -- document paths ----------------------------------------------------------
+
+def _resolve(item: Dict, path: Tuple) -> Any:
+    value = item
+    for step in path:
+        if isinstance(step, int):
+            if not isinstance(value, list) or step >= len(value):
+                return _MISSING
+        elif not isinstance(value, dict) or step not in value:
+            return _MISSING
+        value = value[step]
+    return value
+
+
+def _parent(item: Dict, path: Tuple):
+    container = _resolve(item, path[:-1])
+    step = path[-1]
+    if isinstance(step, int) and isinstance(container, list):
+        return container
+    if not isinstance(step, int) and isinstance(container, dict):
+        return container
+    raise _Invalid("The document path provided in the update expression is invalid for update")
+
+
+def _set_path(item: Dict, path: Tuple, value) -> None:
+    container = _parent(item, path)
+    step = path[-1]
+    if isinstance(container, list) and step >= len(container):
+        container.append(value)
+    else:
+        container[step] = value
+
+
+def _remove_path(item: Dict, path: Tuple) -> None:
+    container = _resolve(item, path[:-1])
+    step = path[-1]
+    if isinstance(container, dict) and not isinstance(step, int):
+        container.pop(step, None)
+    elif isinstance(container, list) and isinstance(step, int) and step < len(container):
+        del container[step]
+
+
+def _project(item: Dict, paths: List[Tuple]) -> Dict:
+    result = {}
+    for path in paths:
+        value = _resolve(item, path)
+        if value is _MISSING:
+            continue
+        target = result
+        for step, following in zip(path, path[1:]):
+            default = [] if isinstance(following, int) else {}
+            if isinstance(target, list):
+                target.append(default)
+                target = target[-1]
+            else:
+                target = target.setdefault(step, default)
+        if isinstance(target, list):
+            target.append(_clone(value))
+        else:
+            target[path[-1]] = _clone(value)
+    return result
+
+
+# -- expressions -------------------------------------------------------------
+
+_TOKEN = re.compile(r"""\s*(?:
+    (?P<number>\d+)
+  | (?P<name>\#[A-Za-z0-9_]+)
+  | (?P<value>:[A-Za-z0-9_]+)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_\-]*)
+  | (?P<op><>|<=|>=|[=<>(),.\[\]+\-])
+)""", re.X)
+
+_COMPARATORS = ("=", "<>", "<", "<=", ">", ">=")
+_CONDITION_FUNCTIONS = ("attribute_exists", "attribute_not_exists", "attribute_type", "begins_with", "contains")
+
+
+class _Parser:
+    """Recursive-descent parser compiling expressions into closures.
+
+    Conditions compile to ``fn(item, values) -> bool`` and operands to
+    ``fn(item, values) -> value`` (``_MISSING`` when absent).
+    """
+
+    def __init__(self, expression: str, names: Dict[str, str]):
+        self.expression = expression
+        self.names = names
+        self.used_names = set()
+        self.used_values = set()
+        self.tokens = []
+        text = expression.rstrip()
+        pos = 0
+        while pos < len(text):
+            match = _TOKEN.match(text, pos)
+            if not match:
+                raise _Invalid(f'Invalid expression: Syntax error; token: "{text[pos:].split()[0]}", near: "{text}"')
+            self.tokens.append((match.lastgroup, match.group(match.lastgroup)))
+            pos = match.end()
+        self.pos = 0
+
+    # token helpers
+    def peek(self, offset: int = 0) -> Tuple[Optional[str], Optional[str]]:
+        index = self.pos + offset
+        return self.tokens[index] if index < len(self.tokens) else (None, None)
+
+    def next(self) -> Tuple[str, str]:
+        if self.pos >= len(self.tokens):
+            raise _Invalid(f'Invalid expression: Syntax error; token: "<EOF>", near: "{self.expression}"')
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def accept_op(self, op: str) -> bool:
+        if self.peek() == ("op", op):
+            self.pos += 1
+            return True
+        return False
+
+    def expect_op(self, op: str) -> None:
+        if not self.accept_op(op):
+            kind, text = self.peek()
+            raise _Invalid(f'Invalid expression: Syntax error; token: "{text or "<EOF>"}", near: "{self.expression}"')
+
+    def accept_word(self, word: str) -> bool:
+        kind, text = self.peek()
+        if kind == "word" and text.upper() == word:
+            self.pos += 1
+            return True
+        return False
+
+    def is_call(self, *functions: str) -> bool:
+        kind, text = self.peek()
+        return kind == "word" and text.lower() in functions and self.peek(1) == ("op", "(")
+
+    def finish(self) -> None:
+        if self.pos != len(self.tokens):
+            kind, text = self.peek()
+            raise _Invalid(f'Invalid expression: Syntax error; token: "{text}", near: "{self.expression}"')
+
+    # operands
+    def path(self) -> Tuple:
+        steps = [self._path_name()]
+        while True:
+            if self.accept_op("."):
+                steps.append(self._path_name())
+            elif self.accept_op("["):
+                kind, text = self.next()
+                if kind != "number":
+                    raise _Invalid("Invalid expression: list index must be a number")
+                steps.append(int(text))
+                self.expect_op("]")
+            else:
+                return tuple(steps)
+
+    def _path_name(self) -> str:
+        kind, text = self.next()
+        if kind == "name":
+            if text not in self.names:
+                raise _Invalid(
+                    f"Invalid expression: An expression attribute name used in the document path "
+                    f"is not defined; attribute name: {text}"
+                )
+            self.used_names.add(text)
+            return self.names[text]
+        if kind == "word":
+            return text
+        raise _Invalid(f'Invalid expression: Syntax error; token: "{text}", near: "{self.expression}"')
+
+    def _value_ref(self) -> Callable:
+        kind, text = self.next()
+        if kind != "value":
+            raise _Invalid(f'Invalid expression: Syntax error; token: "{text}", near: "{self.expression}"')
+        self.used_values.add(text)
+        get = lambda item, values: values[text]
+        get.placeholder = text
+        return get
+
+    def operand(self) -> Callable:
+        kind, text = self.peek()
+        if kind == "value":
+            return self._value_ref()
+        if self.is_call("size"):
+            self.pos += 2
+            path = self.path()
+            self.expect_op(")")
+
+            def size(item, values):
+                value = _resolve(item, path)
+                if isinstance(value, (str, bytes, list, dict, set)):
+                    return Decimal(len(value))
+                return _MISSING
+            return size
+        path = self.path()
+        get = lambda item, values: _resolve(item, path)
+        get.path = path
+        return get
+
+    # conditions
+    def condition(self) -> Callable:
+        left = self._conjunction()
+        while self.accept_word("OR"):
+            right = self._conjunction()
+            left = (lambda a, b: lambda item, values: a(item, values) or b(item, values))(left, right)
+        return left
+
+    def _conjunction(self) -> Callable:
+        left = self._negation()
+        while self.accept_word("AND"):
+            right = self._negation()
+            left = (lambda a, b: lambda item, values: a(item, values) and b(item, values))(left, right)
+        return left
+
+    def _negation(self) -> Callable:
+        if self.accept_word("NOT"):
+            inner = self._negation()
+            return lambda item, values: not inner(item, values)
+        return self._primary()
+
+    def _primary(self) -> Callable:
+        if self.accept_op("("):
+            inner = self.condition()
+            self.expect_op(")")
+            return inner
+        if self.is_call(*_CONDITION_FUNCTIONS):
+            return self._function()
+
+        left = self.operand()
+        if self.accept_word("BETWEEN"):
+            low = self.operand()
+            if not self.accept_word("AND"):
+                raise _Invalid("Invalid expression: BETWEEN requires AND")
+            high = self.operand()
+
+            def between(item, values):
+                value, lo, hi = left(item, values), low(item, values), high(item, values)
+                if _MISSING in (value, lo, hi) or not (_orderable(value, lo) and _orderable(value, hi)):
+                    return False
+                return lo <= value <= hi
+            return between
+        if self.accept_word("IN"):
+            self.expect_op("(")
+            options = [self.operand()]
+            while self.accept_op(","):
+                options.append(self.operand())
+            self.expect_op(")")
+            return lambda item, values: any(_compare("=", left(item, values), option(item, values)) for option in options)
+
+        kind, op = self.next()
+        if kind != "op" or op not in _COMPARATORS:
+            raise _Invalid(f'Invalid expression: Syntax error; token: "{op}", near: "{self.expression}"')
+        right = self.operand()
+        compare = lambda item, values: _compare(op, left(item, values), right(item, values))
+        if op == "=":
+            compare.equality = (left, right)
+        return compare
+
+    def _function(self) -> Callable:
+        kind, name = self.next()
+        name = name.lower()
+        self.expect_op("(")
+        path = self.path()
+        if name in ("attribute_exists", "attribute_not_exists"):
+            self.expect_op(")")
+            exists = name == "attribute_exists"
+            return lambda item, values: (_resolve(item, path) is not _MISSING) == exists
+
+        self.expect_op(",")
+        argument = self.operand()
+        self.expect_op(")")
+        if name == "attribute_type":
+            return lambda item, values: _type_of(_resolve(item, path)) == argument(item, values)
+        if name == "begins_with":
+            def begins_with(item, values):
+                value, prefix = _resolve(item, path), argument(item, values)
+                if isinstance(value, str) and isinstance(prefix, str):
+                    return value.startswith(prefix)
+                if isinstance(value, bytes) and isinstance(prefix, bytes):
+                    return value.startswith(prefix)
+                return False
+            begins_with.begins_with = path
+            return begins_with
+
+        def contains(item, values):
+            value, member = _resolve(item, path), argument(item, values)
+            if isinstance(value, str) and isinstance(member, str):
+                return member in value
+            if isinstance(value, (set, list)):
+                return any(_equal(element, member) for element in value)
+            return False
+        return contains
+
+    def key_condition(self, hash_key: str, range_key: Optional[str]) -> Tuple[str, Optional[Callable]]:
+        """Split a key condition into the hash key's value placeholder and a range condition."""
+        terms = [self._negation()]
+        while self.accept_word("AND"):
+            terms.append(self._negation())
+
+        placeholder = None
+        range_conditions = []
+        for term in terms:
+            left, right = getattr(term, "equality", (None, None))
+            if getattr(left, "path", None) == (hash_key,) and hasattr(right, "placeholder"):
+                placeholder = right.placeholder
+            elif getattr(right, "path", None) == (hash_key,) and hasattr(left, "placeholder"):
+                placeholder = left.placeholder
+            else:
+                range_conditions.append(term)
+        if placeholder is None:
+            raise _Invalid("Query condition missed key schema element: " + hash_key)
+        if len(range_conditions) > 1 or (range_conditions and range_key is None):
+            raise _Invalid("Query key condition not supported")
+        return placeholder, range_conditions[0] if range_conditions else None
+
+    # updates
+    def update(self) -> List[Tuple]:
+        actions = []
+        clauses = set()
+        while self.pos < len(self.tokens):
+            kind, word = self.next()
+            clause = word.upper() if kind == "word" else None
+            if clause not in ("SET", "REMOVE", "ADD", "DELETE") or clause in clauses:
+                raise _Invalid(f'Invalid UpdateExpression: Syntax error; token: "{word}", near: "{self.expression}"')
+            clauses.add(clause)
+            while True:
+                path = self.path()
+                if clause == "SET":
+                    self.expect_op("=")
+                    actions.append((clause, path, self._set_value()))
+                elif clause == "REMOVE":
+                    actions.append((clause, path, None))
+                else:
+                    actions.append((clause, path, self._value_ref()))
+                if not self.accept_op(","):
+                    break
+        return actions
+
+    def _set_value(self) -> Callable:
+        left = self._set_operand()
+        for op in ("+", "-"):
+            if self.accept_op(op):
+                right = self._set_operand()
+
+                def arithmetic(item, values, op=op):
+                    a, b = left(item, values), right(item, values)
+                    if a is _MISSING or b is _MISSING:
+                        raise _Invalid(
+                            "The provided expression refers to an attribute that does not exist in the item"
+                        )
+                    if not (isinstance(a, Decimal) and isinstance(b, Decimal)) or isinstance(a, bool) or isinstance(b, bool):
+                        raise _Invalid("An operand in the update expression has an incorrect data type")
+                    return a + b if op == "+" else a - b
+                return arithmetic
+        return left
+
+    def _set_operand(self) -> Callable:
+        if self.is_call("if_not_exists"):
+            self.pos += 2
+            path = self.path()
+            self.expect_op(",")
+            default = self._set_value()
+            self.expect_op(")")
+
+            def if_not_exists(item, values):
+                value = _resolve(item, path)
+                return default(item, values) if value is _MISSING else value
+            return if_not_exists
+        if self.is_call("list_append"):
+            self.pos += 2
+            first = self._set_value()
+            self.expect_op(",")
+            second = self._set_value()
+            self.expect_op(")")
+
+            def list_append(item, values):
+                a, b = first(item, values), second(item, values)
+                if not (isinstance(a, list) and isinstance(b, list)):
+                    raise _Invalid("An operand in the update expression has an incorrect data type")
+                return a + b
+            return list_append
+        get = self.operand()
+
+        def required(item, values):
+            value = get(item, values)
+            if value is _MISSING:
+                raise _Invalid("The provided expression refers to an attribute that does not exist in the item")
+            return value
+        return required
+
+    def projection(self) -> List[Tuple]:
+        paths = [self.path()]
+        while self.accept_op(","):
+            paths.append(self.path())
+        return paths
+
+
+@lru_cache(maxsize=2048)
+def _compile(kind: str, expression: str, names: Tuple, hash_key: str = None, range_key: str = None):
+    parser = _Parser(expression, dict(names))
+    if kind == "condition":
+        compiled = parser.condition()
+    elif kind == "update":
+        compiled = parser.update()
+    elif kind == "projection":
+        compiled = parser.projection()
+    else:
+        compiled = parser.key_condition(hash_key, range_key)
+    parser.finish()
+    return compiled, frozenset(parser.used_names), frozenset(parser.used_values)
+
+
+class _Expressions:
+    """The expressions of one request, sharing its name and value maps."""
+
+    def __init__(self, names: Optional[Dict] = None, values: Optional[Dict] = None):
+        self.names = dict(names or {})
+        self.values = {placeholder: _normalize(value) for placeholder, value in (values or {}).items()}
+        self.used_names = set()
+        self.used_values = set()
+        self._builder = None
+
+    def _text(self, expression, is_key_condition: bool = False) -> str:
+        if isinstance(expression, str):
+            return expression
+        # boto3.dynamodb.conditions objects (Key/Attr), built the way boto3 does.
+        if self._builder is None:
+            from boto3.dynamodb.conditions import ConditionExpressionBuilder
+            self._builder = ConditionExpressionBuilder()
+        built = self._builder.build_expression(expression, is_key_condition=is_key_condition)
+        self.names.update(built.attribute_name_placeholders)
+        self.values.update({key: _normalize(value) for key, value in built.attribute_value_placeholders.items()})
+        return built.condition_expression
+
+    def _compile(self, kind: str, expression: str, *keys):
+        compiled, names, values = _compile(kind, expression, tuple(sorted(self.names.items())), *keys)
+        self.used_names |= names
+        self.used_values |= values
+        return compiled
+
+    def condition(self, expression) -> Optional[Callable]:
+        if expression is None:
+            return None
+        return self._compile("condition", self._text(expression))
+
+    def update(self, expression: Optional[str]) -> List[Tuple]:
+        return self._compile("update", expression) if expression else []
+
+    def projection(self, expression: Optional[str]) -> Optional[List[Tuple]]:
+        return self._compile("projection", expression) if expression else None
+
+    def key_condition(self, expression, hash_key: str, range_key: Optional[str]):
+        return self._compile("key", self._text(expression, is_key_condition=True), hash_key, range_key)
+
+    def check(self) -> None:
+        unused = set(self.names) - self.used_names
+        if unused:
+            raise _Invalid(f"Value provided in ExpressionAttributeNames unused in expressions: keys: {{{', '.join(sorted(unused))}}}")
+        unused = set(self.values) - self.used_values
+        if unused:
+            raise _Invalid(f"Value provided in ExpressionAttributeValues unused in expressions: keys: {{{', '.join(sorted(unused))}}}")
+        missing = self.used_values - set(self.values)
+        if missing:
+            raise _Invalid(
+                "Invalid expression: An expression attribute value used in expression is not defined; "
+                f"attribute value: {sorted(missing)[0]}"
+            )
+
+
+def _check_condition(condition: Optional[Callable], item: Optional[Dict], values: Dict,
+                     return_on_failure: str) -> None:
+    if condition is not None and not condition(item or {}, values):
+        raise _ConditionFailed(_clone(item) if item and return_on_failure == "ALL_OLD" else None)
+
+
+# -- tables ------------------------------------------------------------------
+
+class _BatchWriter:
+    """``Table.batch_writer()``: buffers puts/deletes into BatchWriteItem calls."""
+
+    def __init__(self, table: "MemoryTable", flush_amount: int = 25):
+        self._table = table
+        self._flush_amount = flush_amount
+        self._requests = []
+
+    def put_item(self, Item: Dict) -> None:
+        self._requests.append({"PutRequest": {"Item": Item}})
+        if len(self._requests) >= self._flush_amount:
+            self._flush()
+
+    def delete_item(self, Key: Dict) -> None:
+        self._requests.append({"DeleteRequest": {"Key": Key}})
+        if len(self._requests) >= self._flush_amount:
+            self._flush()
+
+    def _flush(self) -> None:
+        requests, self._requests = self._requests, []
+        if requests:
+            self._table.meta.client.batch_write_item(RequestItems={self._table.name: requests})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._flush()
+
+
+class MemoryTable:
+    """One table: items by partition, sort keys kept ordered, GSI membership maintained on write."""
+
+    def __init__(self, backend: "MemoryDynamoDB", name: str, hash_key: str = "pk", range_key: Optional[str] = "sk",
+                 indexes: Optional[Dict[str, Tuple[str, Optional[str]]]] = None,
+                 attribute_types: Optional[Dict[str, str]] = None):
+        self._backend = backend
+        self.name = name
+        self.hash_key = hash_key
+        self.range_key = range_key
+        self.indexes = dict(DEFAULT_INDEXES if indexes is None else indexes)
+        self.attribute_types = attribute_types or {
+            attr: "S" for attr in [hash_key, range_key] + [a for keys in self.indexes.values() for a in keys] if attr
+        }
+        self.meta = backend.meta
+        self._partitions = {}
+        self._sort_keys = {}
+        self._hash_keys = []
+        self._index_members = {index: {} for index in self.indexes}
+        self.ttl_attribute = None
+        self._stream = None
+
+    @property
+    def table_name(self) -> str:
+        return self.name
+
+    @property
+    def key_schema(self) -> List[Dict]:
+        schema = [{"AttributeName": self.hash_key, "KeyType": "HASH"}]
+        if self.range_key:
+            schema.append({"AttributeName": self.range_key, "KeyType": "RANGE"})
+        return schema
+
+    @property
+    def item_count(self) -> int:
+        with self._backend._lock:
+            return sum(len(partition) for partition in self._partitions.values())
+
+    def __repr__(self) -> str:
+        return f"MemoryTable(name={self.name!r})"
+
+    # keys and storage (callers hold the backend lock)
+    def _key_value(self, attr: str, value, where: str = "key"):
+        expected = self.attribute_types.get(attr, "S")
+        if _type_of(value) != expected:
+            raise _Invalid(f"One or more parameter values were invalid: Type mismatch for {where} {attr} expected: {expected}")
+        return value
+
+    def _key(self, key: Dict) -> Tuple:
+        key = _normalize(key)
+        expected = {self.hash_key, self.range_key} - {None}
+        if set(key) != expected:
+            raise _Invalid("The provided key element does not match the schema")
+        return (
+            self._key_value(self.hash_key, key[self.hash_key]),
+            self._key_value(self.range_key, key[self.range_key]) if self.range_key else None,
+        )
+
+    def _item_key(self, item: Dict) -> Tuple:
+        for attr in (self.hash_key, self.range_key):
+            if attr and attr not in item:
+                raise _Invalid(f"One or more parameter values were invalid: Missing the key {attr} in the item")
+        return self._key({attr: item[attr] for attr in (self.hash_key, self.range_key) if attr})
+
+    def _key_dict(self, key: Tuple) -> Dict:
+        result = {self.hash_key: key[0]}
+        if self.range_key:
+            result[self.range_key] = key[1]
+        return result
+
+    def _index_key(self, index: str, item: Optional[Dict]) -> Optional[Tuple]:
+        if not item:
+            return None
+        hash_attr, range_attr = self.indexes[index]
+        if hash_attr not in item or (range_attr and range_attr not in item):
+            return None
+        return (item[hash_attr], item[range_attr] if range_attr else None)
+
+    def _validate_item(self, item: Dict) -> None:
+        for index, (hash_attr, range_attr) in self.indexes.items():
+            for attr in (hash_attr, range_attr):
+                if attr and attr in item:
+                    self._key_value(attr, item[attr], "Index Key")
+
+    def _get(self, key: Tuple) -> Optional[Dict]:
+        partition = self._partitions.get(key[0])
+        return partition.get(key[1]) if partition else None
+
+    def _commit(self, key: Tuple, old: Optional[Dict], new: Optional[Dict]) -> None:
+        if self._stream is not None:
+            self._stream.append(key, old, new)
+        for index, members in self._index_members.items():
+            old_key, new_key = self._index_key(index, old), self._index_key(index, new)
+            if old_key == new_key:
+                continue
+            if old_key is not None:
+                bucket = members.get(old_key[0])
+                if bucket is not None:
+                    bucket.discard(key)
+                    if not bucket:
+                        del members[old_key[0]]
+            if new_key is not None:
+                members.setdefault(new_key[0], set()).add(key)
+
+        hash_value, range_value = key
+        partition = self._partitions.get(hash_value)
+        if new is not None:
+            if partition is None:
+                partition = self._partitions[hash_value] = {}
+                self._sort_keys[hash_value] = []
+                bisect.insort(self._hash_keys, hash_value)
+            if range_value not in partition:
+                bisect.insort(self._sort_keys[hash_value], range_value)
+            partition[range_value] = new
+        elif partition is not None and range_value in partition:
+            del partition[range_value]
+            sort_keys = self._sort_keys[hash_value]
+            del sort_keys[bisect.bisect_left(sort_keys, range_value)]
+            if not partition:
+                del self._partitions[hash_value]
+                del self._sort_keys[hash_value]
+                del self._hash_keys[bisect.bisect_left(self._hash_keys, hash_value)]
+
+    # capacity
+    def _capacity(self, response: Dict, mode: str, read: float = 0.0, write: float = 0.0,
+                  indexes: Optional[Dict[str, float]] = None) -> None:
+        indexes = indexes or {}
+        total = read + write + sum(indexes.values())
+        self._backend._consume(read=read, write=write + sum(indexes.values()))
+        if mode in ("TOTAL", "INDEXES"):
+            consumed = {"TableName": self.name, "CapacityUnits": total}
+            if read:
+                consumed["ReadCapacityUnits"] = read
+            if write or indexes:
+                consumed["WriteCapacityUnits"] = write + sum(indexes.values())
+            if mode == "INDEXES":
+                consumed["Table"] = {"CapacityUnits": read + write}
+                if indexes:
+                    consumed["GlobalSecondaryIndexes"] = {name: {"CapacityUnits": units} for name, units in indexes.items()}
+            response["ConsumedCapacity"] = consumed
+
+    @staticmethod
+    def _read_units(size: int, consistent: bool) -> float:
+        units = max(1, math.ceil(size / 4096))
+        return float(units) if consistent else units / 2
+
+    def _write_units(self, old: Optional[Dict], new: Optional[Dict]) -> Tuple[float, Dict[str, float]]:
+        units = float(max(1, math.ceil(max(_item_size(old), _item_size(new)) / 1024)))
+        indexes = {
+            index: units for index in self.indexes
+            if self._index_key(index, old) is not None or self._index_key(index, new) is not None
+        }
+        return units, indexes
+
+    # write preparation (callers hold the backend lock)
+    def _prepare_put(self, Item: Dict, ConditionExpression=None, ExpressionAttributeNames=None,
+                     ExpressionAttributeValues=None, ReturnValuesOnConditionCheckFailure: str = "NONE", **_):
+        expressions = _Expressions(ExpressionAttributeNames, ExpressionAttributeValues)
+        condition = expressions.condition(ConditionExpression)
+        expressions.check()
+        new = _normalize(Item)
+        key = self._item_key(new)
+        self._validate_item(new)
+        old = self._get(key)
+        _check_condition(condition, old, expressions.values, ReturnValuesOnConditionCheckFailure)
+        return key, old, new
+
+    def _prepare_update(self, Key: Dict, UpdateExpression: Optional[str] = None, ConditionExpression=None,
+                        ExpressionAttributeNames=None, ExpressionAttributeValues=None,
+                        ReturnValuesOnConditionCheckFailure: str = "NONE", **_):
+        expressions = _Expressions(ExpressionAttributeNames, ExpressionAttributeValues)
+        actions = expressions.update(UpdateExpression)
+        condition = expressions.condition(ConditionExpression)
+        expressions.check()
+        key = self._key(Key)
+        old = self._get(key)
+        _check_condition(condition, old, expressions.values, ReturnValuesOnConditionCheckFailure)
+
+        current = old or self._key_dict(key)
+        values = expressions.values
+        # Every operand sees the item as it was before this update.
+        evaluated = [(clause, path, get(current, values) if get else None) for clause, path, get in actions]
+        new = _clone(current)
+        for clause, path, value in evaluated:
+            if path[0] in (self.hash_key, self.range_key):
+                raise _Invalid(f"One or more parameter values were invalid: Cannot update attribute {path[0]}. "
+                               "This attribute is part of the key")
+            if clause == "SET":
+                _set_path(new, path, _clone(value))
+            elif clause == "REMOVE":
+                _remove_path(new, path)
+            elif clause == "ADD":
+                existing = _resolve(new, path)
+                if existing is _MISSING:
+                    _set_path(new, path, _clone(value))
+                elif isinstance(existing, Decimal) and isinstance(value, Decimal) and not isinstance(existing, bool):
+                    _set_path(new, path, existing + value)
+                elif isinstance(existing, set) and isinstance(value, set):
+                    _set_path(new, path, existing | value)
+                else:
+                    raise _Invalid("An operand in the update expression has an incorrect data type")
+            else:  # DELETE
+                existing = _resolve(new, path)
+                if existing is _MISSING:
+                    continue
+                if not (isinstance(existing, set) and isinstance(value, set)):
+                    raise _Invalid("An operand in the update expression has an incorrect data type")
+                remaining = existing - value
+                if remaining:
+                    _set_path(new, path, remaining)
+                else:
+                    _remove_path(new, path)
+        self._validate_item(new)
+        touched = {path[0] for clause, path, value in evaluated}
+        return key, old, new, touched
+
+    def _prepare_delete(self, Key: Dict, ConditionExpression=None, ExpressionAttributeNames=None,
+                        ExpressionAttributeValues=None, ReturnValuesOnConditionCheckFailure: str = "NONE", **_):
+        expressions = _Expressions(ExpressionAttributeNames, ExpressionAttributeValues)
+        condition = expressions.condition(ConditionExpression)
+        expressions.check()
+        key = self._key(Key)
+        old = self._get(key)
+        _check_condition(condition, old, expressions.values, ReturnValuesOnConditionCheckFailure)
+        return key, old
+
+    def _prepare_check(self, Key: Dict, ConditionExpression, ExpressionAttributeNames=None,
+                       ExpressionAttributeValues=None, ReturnValuesOnConditionCheckFailure: str = "NONE", **_):
+        key, old = self._prepare_delete(Key, ConditionExpression, ExpressionAttributeNames,
+                                        ExpressionAttributeValues, ReturnValuesOnConditionCheckFailure)
+        return key, old
+
+    # item API
+    @_operation("GetItem")
+    def get_item(self, *, Key: Dict, ProjectionExpression: Optional[str] = None,
+                 ExpressionAttributeNames: Optional[Dict] = None, ConsistentRead: bool = False,
+                 ReturnConsumedCapacity: str = "NONE") -> Dict:
+        expressions = _Expressions(ExpressionAttributeNames)
+        projection = expressions.projection(ProjectionExpression)
+        expressions.check()
+        with self._backend._lock:
+            item = self._get(self._key(Key))
+        response = {}
+        if item is not None:
+            response["Item"] = _project(item, projection) if projection else _clone(item)
+        self._capacity(response, ReturnConsumedCapacity, read=self._read_units(_item_size(item), ConsistentRead))
+        return response
+
+    @_operation("PutItem")
+    def put_item(self, *, Item: Dict, ConditionExpression=None, ExpressionAttributeNames: Optional[Dict] = None,
+                 ExpressionAttributeValues: Optional[Dict] = None, ReturnValues: str = "NONE",
+                 ReturnValuesOnConditionCheckFailure: str = "NONE", ReturnConsumedCapacity: str = "NONE") -> Dict:
+        if ReturnValues not in ("NONE", "ALL_OLD"):
+            raise _Invalid("Return values set to invalid value")
+        with self._backend._lock:
+            key, old, new = self._prepare_put(
+                Item, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues,
+                ReturnValuesOnConditionCheckFailure,
+            )
+            self._commit(key, old, new)
+        response = {}
+        if ReturnValues == "ALL_OLD" and old:
+            response["Attributes"] = _clone(old)
+        units, indexes = self._write_units(old, new)
+        self._capacity(response, ReturnConsumedCapacity, write=units, indexes=indexes)
+        return response
+
+    @_operation("UpdateItem")
+    def update_item(self, *, Key: Dict, UpdateExpression: Optional[str] = None, ConditionExpression=None,
+                    ExpressionAttributeNames: Optional[Dict] = None, ExpressionAttributeValues: Optional[Dict] = None,
+                    ReturnValues: str = "NONE", ReturnValuesOnConditionCheckFailure: str = "NONE",
+                    ReturnConsumedCapacity: str = "NONE") -> Dict:
+        if ReturnValues not in ("NONE", "ALL_OLD", "UPDATED_OLD", "ALL_NEW", "UPDATED_NEW"):
+            raise _Invalid("Return values set to invalid value")
+        with self._backend._lock:
+            key, old, new, touched = self._prepare_update(
+                Key, UpdateExpression, ConditionExpression, ExpressionAttributeNames,
+                ExpressionAttributeValues, ReturnValuesOnConditionCheckFailure,
+            )
+            self._commit(key, old, new)
+
+        if ReturnValues == "ALL_OLD":
+            attributes = old or {}
+        elif ReturnValues == "ALL_NEW":
+            attributes = new
+        elif ReturnValues == "UPDATED_OLD":
+            attributes = {name: value for name, value in (old or {}).items() if name in touched}
+        elif ReturnValues == "UPDATED_NEW":
+            attributes = {name: value for name, value in new.items() if name in touched}
+        else:
+            attributes = None
+        response = {"Attributes": _clone(attributes)} if attributes else {}
+        units, indexes = self._write_units(old, new)
+        self._capacity(response, ReturnConsumedCapacity, write=units, indexes=indexes)
+        return response
+
+    @_operation("DeleteItem")
+    def delete_item(self, *, Key: Dict, ConditionExpression=None, ExpressionAttributeNames: Optional[Dict] = None,
+                    ExpressionAttributeValues: Optional[Dict] = None, ReturnValues: str = "NONE",
+                    ReturnValuesOnConditionCheckFailure: str = "NONE", ReturnConsumedCapacity: str = "NONE") -> Dict:
+        if ReturnValues not in ("NONE", "ALL_OLD"):
+            raise _Invalid("Return values set to invalid value")
+        with self._backend._lock:
+            key, old = self._prepare_delete(
+                Key, ConditionExpression, ExpressionAttributeNames, ExpressionAttributeValues,
+                ReturnValuesOnConditionCheckFailure,
+            )
+            self._commit(key, old, None)
+        response = {}
+        if ReturnValues == "ALL_OLD" and old:
+            response["Attributes"] = _clone(old)
+        units, indexes = self._write_units(old, None)
+        self._capacity(response, ReturnConsumedCapacity, write=units, indexes=indexes)
+        return response
+
+    def attach_stream(self, consumer: Callable[[List[Dict]], Optional[str]],
+                      key_prefixes: Optional[Tuple[str, ...]] = None, batch_size: int = 100) -> "_Stream":
+        """Deliver this table's changes to ``consumer`` from now on.
+
+        ``key_prefixes`` keeps only items whose sort key starts with one of
+        them, like an event filter on the mapping. A table has one stream;
+        attaching again replaces its consumer.
+        """
+        with self._backend._lock:
+            if self._stream is None:
+                self._stream = _Stream(self, consumer, key_prefixes, batch_size)
+            else:
+                self._stream.consumer = consumer
+            return self._stream
+
+    def drain_stream(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the stream consumer has taken every change so far."""
+        return self._stream is None or self._stream.drain(timeout)
+
+    def batch_writer(self, overwrite_by_pkeys: Optional[List[str]] = None) -> _BatchWriter:
+        return _BatchWriter(self)
+
+    # reads over ranges
+    def _page(self, entries: List[Tuple], start: int, stop: int, step: int, range_condition, filter_condition,
+              values: Dict, limit: Optional[int], last_key: Callable[[Dict], Dict]) -> Tuple[List[Dict], int, int, Optional[Dict]]:
+        items, scanned, size = [], 0, 0
+        for position in range(start, stop, step):
+            item = entries[position][1]
+            if range_condition is not None and not range_condition(item, values):
+                continue
+            scanned += 1
+            size += _item_size(item)
+            if filter_condition is None or filter_condition(item, values):
+                items.append(item)
+            if (limit and scanned >= limit) or size >= MAX_PAGE_BYTES:
+                return items, scanned, size, last_key(item)
+        return items, scanned, size, None
+
+    def _finish_read(self, items: List[Dict], scanned: int, size: int, last_evaluated: Optional[Dict],
+                     projection, select: Optional[str], consistent: bool, capacity_mode: str) -> Dict:
+        response = {"Count": len(items), "ScannedCount": scanned}
+        if select != "COUNT":
+            response["Items"] = [_project(item, projection) if projection else _clone(item) for item in items]
+        if last_evaluated:
+            response["LastEvaluatedKey"] = _clone(last_evaluated)
+        self._capacity(response, capacity_mode, read=self._read_units(size, consistent))
+        return response
+
+    @_operation("Query")
+    def query(self, *, KeyConditionExpression, IndexName: Optional[str] = None, FilterExpression=None,
+              ProjectionExpression: Optional[str] = None, ExpressionAttributeNames: Optional[Dict] = None,
+              ExpressionAttributeValues: Optional[Dict] = None, Limit: Optional[int] = None,
+              ExclusiveStartKey: Optional[Dict] = None, ScanIndexForward: bool = True, Select: Optional[str] = None,
+              ConsistentRead: bool = False, ReturnConsumedCapacity: str = "NONE") -> Dict:
+        if IndexName is not None:
+            if IndexName not in self.indexes:
+                raise _Invalid(f"The table does not have the specified index: {IndexName}")
+            if ConsistentRead:
+                raise _Invalid("Consistent reads are not supported on global secondary indexes")
+            hash_attr, range_attr = self.indexes[IndexName]
+        else:
+            hash_attr, range_attr = self.hash_key, self.range_key
+        if Limit is not None and Limit < 1:
+            raise _Invalid("1 validation error detected: Value at 'limit' failed to satisfy constraint: "
+                           "Member must have value greater than or equal to 1")
+
+        expressions = _Expressions(ExpressionAttributeNames, ExpressionAttributeValues)
+        placeholder, range_condition = expressions.key_condition(KeyConditionExpression, hash_attr, range_attr)
+        filter_condition = expressions.condition(FilterExpression)
+        projection = expressions.projection(ProjectionExpression)
+        expressions.check()
+        values = expressions.values
+        hash_value = values[placeholder]
+
+        with self._backend._lock:
+            if IndexName is None:
+                partition = self._partitions.get(hash_value, {})
+                entries = [((sort_key,), partition[sort_key]) for sort_key in self._sort_keys.get(hash_value, [])]
+            else:
+                entries = []
+                for key in self._index_members[IndexName].get(hash_value, ()):
+                    item = self._get(key)
+                    entries.append(((item.get(range_attr), key[0], key[1]), item))
+                entries.sort(key=lambda entry: entry[0])
+
+        if IndexName is None:
+            def last_key(item):
+                return self._key_dict(self._item_key(item))
+            start_key = (ExclusiveStartKey or {}).get(self.range_key)
+            start_order = (_normalize(start_key),) if ExclusiveStartKey else None
+        else:
+            def last_key(item):
+                key = self._key_dict(self._item_key(item))
+                key[hash_attr] = item[hash_attr]
+                if range_attr:
+                    key[range_attr] = item[range_attr]
+                return key
+            start = _normalize(ExclusiveStartKey or {})
+            start_order = (start.get(range_attr), start.get(self.hash_key), start.get(self.range_key)) \
+                if ExclusiveStartKey else None
+
+        orders = [entry[0] for entry in entries]
+        if ScanIndexForward:
+            first = bisect.bisect_right(orders, start_order) if start_order else 0
+            bounds = (first, len(entries), 1)
+        else:
+            last = bisect.bisect_left(orders, start_order) if start_order else len(entries)
+            bounds = (last - 1, -1, -1)
+
+        items, scanned, size, last_evaluated = self._page(
+            entries, *bounds, range_condition, filter_condition, values, Limit, last_key
+        )
+        return self._finish_read(items, scanned, size, last_evaluated, projection, Select,
+                                 ConsistentRead, ReturnConsumedCapacity)
+
+    @_operation("Scan")
+    def scan(self, *, FilterExpression=None, ProjectionExpression: Optional[str] = None,
+             ExpressionAttributeNames: Optional[Dict] = None, ExpressionAttributeValues: Optional[Dict] = None,
+             Limit: Optional[int] = None, ExclusiveStartKey: Optional[Dict] = None, Segment: Optional[int] = None,
+             TotalSegments: Optional[int] = None, Select: Optional[str] = None, ConsistentRead: bool = False,
+             ReturnConsumedCapacity: str = "NONE") -> Dict:
+        if (Segment is None) != (TotalSegments is None):
+            raise _Invalid("The TotalSegments parameter is required but was not present in the request when Segment parameter is present")
+        if TotalSegments is not None and not (0 <= Segment < TotalSegments <= 1000000):
+            raise _Invalid("The Segment parameter is out of range for the given TotalSegments")
+        if Limit is not None and Limit < 1:
+            raise _Invalid("1 validation error detected: Value at 'limit' failed to satisfy constraint: "
+                           "Member must have value greater than or equal to 1")
+
+        expressions = _Expressions(ExpressionAttributeNames, ExpressionAttributeValues)
+        filter_condition = expressions.condition(FilterExpression)
+        projection = expressions.projection(ProjectionExpression)
+        expressions.check()
+        values = expressions.values
+
+        start = self._key(ExclusiveStartKey) if ExclusiveStartKey else None
+        items, scanned, size, last_evaluated = [], 0, 0, None
+        with self._backend._lock:
+            position = bisect.bisect_left(self._hash_keys, start[0]) if start else 0
+            for hash_value in self._hash_keys[position:]:
+                if TotalSegments and zlib.crc32(str(hash_value).encode("utf-8")) % TotalSegments != Segment:
+                    continue
+                sort_keys = self._sort_keys[hash_value]
+                first = bisect.bisect_right(sort_keys, start[1]) if start and hash_value == start[0] else 0
+                partition = self._partitions[hash_value]
+                for sort_key in sort_keys[first:]:
+                    item = partition[sort_key]
+                    scanned += 1
+                    size += _item_size(item)
+                    if filter_condition is None or filter_condition(item, values):
+                        items.append(item)
+                    if (Limit and scanned >= Limit) or size >= MAX_PAGE_BYTES:
+                        last_evaluated = self._key_dict((hash_value, sort_key))
+                        break
+                if last_evaluated:
+                    break
+        return self._finish_read(items, scanned, size, last_evaluated, projection, Select,
+                                 ConsistentRead, ReturnConsumedCapacity)
+
+
+class _Stream:
+    """Change records of one table, handed to a consumer on a background thread.
+
+    Records keep commit order. The consumer gets a batch of Lambda-style
+    stream records and returns None, or the sequence number to retry from;
+    that record and the ones after it are delivered again after
+    ``RETRY_DELAY`` seconds. A consumer that raises has the batch retried.
+    """
+
+    RETRY_DELAY = 0.5
+
+    def __init__(self, table: MemoryTable, consumer: Callable[[List[Dict]], Optional[str]],
+                 key_prefixes: Optional[Tuple[str, ...]], batch_size: int):
+        self.table = table
+        self.consumer = consumer
+        self.key_prefixes = key_prefixes
+        self.batch_size = batch_size
+        self._records = deque()
+        self._sequence = 0
+        self._busy = False
+        self._changed = threading.Condition()
+        threading.Thread(target=self._deliver, name=f"stream-{table.name}", daemon=True).start()
+
+    def append(self, key: Tuple, old: Optional[Dict], new: Optional[Dict]) -> None:
+        # Called under the backend lock, so records are in commit order.
+        if self.key_prefixes and not (isinstance(key[1], str) and key[1].startswith(self.key_prefixes)):
+            return
+        name = "INSERT" if old is None else "REMOVE" if new is None else "MODIFY"
+        with self._changed:
+            self._sequence += 1
+            self._records.append((str(self._sequence).zfill(21), name, key, old, new))
+            self._changed.notify_all()
+
+    def _event_record(self, sequence: str, name: str, key: Tuple, old: Optional[Dict],
+                      new: Optional[Dict]) -> Dict:
+        change = {
+            "Keys": _serialize_item(self.table._key_dict(key)),
+            "SequenceNumber": sequence,
+            "StreamViewType": "NEW_AND_OLD_IMAGES",
+        }
+        if new is not None:
+            change["NewImage"] = _serialize_item(new)
+        if old is not None:
+            change["OldImage"] = _serialize_item(old)
+        return {"eventID": sequence, "eventName": name, "eventSource": "aws:dynamodb", "dynamodb": change}
+
+    def _deliver(self) -> None:
+        while True:
+            with self._changed:
+                while not self._records:
+                    self._changed.wait()
+                batch = [self._records.popleft() for _ in range(min(self.batch_size, len(self._records)))]
+                self._busy = True
+            try:
+                retry_from = self.consumer([self._event_record(*entry) for entry in batch])
+            except Exception:
+                retry_from = batch[0][0]
+            with self._changed:
+                if retry_from is not None:
+                    self._records.extendleft(reversed([entry for entry in batch if entry[0] >= retry_from]))
+                self._busy = False
+                self._changed.notify_all()
+            if retry_from is not None:
+                time.sleep(self.RETRY_DELAY)
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        with self._changed:
+            return self._changed.wait_for(lambda: not self._records and not self._busy, timeout)
+
+
+class MemoryClient:
+    """The ``meta.client`` calls the app makes: batches, transactions and table admin."""
+
+    def __init__(self, backend: "MemoryDynamoDB"):
+        self._backend = backend
+
+    @_operation("BatchGetItem")
+    def batch_get_item(self, *, RequestItems: Dict, ReturnConsumedCapacity: str = "NONE") -> Dict:
+        if sum(len(request["Keys"]) for request in RequestItems.values()) > 100:
+            raise _Invalid("Too many items requested for the BatchGetItem call")
+        responses, consumed = {}, []
+        for name, request in RequestItems.items():
+            table = self._backend._table(name)
+            expressions = _Expressions(request.get("ExpressionAttributeNames"))
+            projection = expressions.projection(request.get("ProjectionExpression"))
+            expressions.check()
+            keys = [table._key(key) for key in request["Keys"]]
+            if len(set(keys)) != len(keys):
+                raise _Invalid("Provided list of item keys contains duplicates")
+            with self._backend._lock:
+                found = [item for item in (table._get(key) for key in keys) if item is not None]
+            responses[name] = [_project(item, projection) if projection else _clone(item) for item in found]
+            read = sum(table._read_units(_item_size(item), request.get("ConsistentRead", False)) for item in found)
+            capacity = {}
+            table._capacity(capacity, ReturnConsumedCapacity, read=read or 0.5)
+            if capacity:
+                consumed.append(capacity["ConsumedCapacity"])
+        response = {"Responses": responses, "UnprocessedKeys": {}}
+        if consumed:
+            response["ConsumedCapacity"] = consumed
+        return response
+
+    @_operation("BatchWriteItem")
+    def batch_write_item(self, *, RequestItems: Dict, ReturnConsumedCapacity: str = "NONE") -> Dict:
+        if sum(len(requests) for requests in RequestItems.values()) > 25:
+            raise _Invalid("Too many items requested for the BatchWriteItem call")
+        consumed = []
+        with self._backend._lock:
+            prepared = []
+            for name, requests in RequestItems.items():
+                table = self._backend._table(name)
+                for request in requests:
+                    if "PutRequest" in request:
+                        key, old, new = table._prepare_put(request["PutRequest"]["Item"])
+                    else:
+                        key, old = table._prepare_delete(request["DeleteRequest"]["Key"])
+                        new = None
+                    prepared.append((table, key, old, new))
+            for table, key, old, new in prepared:
+                table._commit(key, old, new)
+        for table, key, old, new in prepared:
+            capacity = {}
+            units, indexes = table._write_units(old, new)
+            table._capacity(capacity, ReturnConsumedCapacity, write=units, indexes=indexes)
+            if capacity:
+                consumed.append(capacity["ConsumedCapacity"])
+        response = {"UnprocessedItems": {}}
+        if consumed:
+            response["ConsumedCapacity"] = consumed
+        return response
+
+    @_operation("TransactWriteItems")
+    def transact_write_items(self, *, TransactItems: List[Dict], ReturnConsumedCapacity: str = "NONE",
+                             ClientRequestToken: Optional[str] = None) -> Dict:
+        if not 0 < len(TransactItems) <= MAX_TRANSACT_ITEMS:
+            raise _Invalid(f"Member must have length less than or equal to {MAX_TRANSACT_ITEMS}")
+        with self._backend._lock:
+            prepared, reasons, seen = [], [], set()
+            for operation in TransactItems:
+                (kind, params), = operation.items()
+                table = self._backend._table(params["TableName"])
+                try:
+                    if kind == "Put":
+                        key, old, new = table._prepare_put(**params)
+                    elif kind == "Update":
+                        key, old, new, _ = table._prepare_update(**params)
+                    elif kind == "Delete":
+                        key, old = table._prepare_delete(**params)
+                        new = None
+                    elif kind == "ConditionCheck":
+                        key, old = table._prepare_check(**params)
+                        new = old
+                    else:
+                        raise _Invalid(f"Unsupported transaction operation: {kind}")
+                    reasons.append({"Code": "None"})
+                except _ConditionFailed as e:
+                    key = table._key(params["Key"]) if "Key" in params else table._item_key(_normalize(params["Item"]))
+                    reason = {"Code": "ConditionalCheckFailed", "Message": "The conditional request failed"}
+                    if e.item:
+                        reason["Item"] = _serialize_item(e.item)
+                    reasons.append(reason)
+                    prepared.append(None)
+                    old = new = None
+                    kind = "Failed"
+                if (table.name, key) in seen:
+                    raise _Invalid("Transaction request cannot include multiple operations on one item")
+                seen.add((table.name, key))
+                if kind != "Failed":
+                    prepared.append((kind, table, key, old, new))
+
+            if any(reason["Code"] != "None" for reason in reasons):
+                raise _Cancelled(reasons)
+            for kind, table, key, old, new in prepared:
+                if kind != "ConditionCheck":
+                    table._commit(key, old, new)
+
+        consumed = []
+        for kind, table, key, old, new in prepared:
+            capacity = {}
+            units, indexes = table._write_units(old, new)
+            table._capacity(capacity, ReturnConsumedCapacity, write=units * 2,
+                            indexes={name: value * 2 for name, value in indexes.items()})
+            if capacity:
+                consumed.append(capacity["ConsumedCapacity"])
+        return {"ConsumedCapacity": consumed} if consumed else {}
+
+    @_operation("ListTables")
+    def list_tables(self, **_) -> Dict:
+        with self._backend._lock:
+            return {"TableNames": sorted(self._backend._tables)}
+
+    @_operation("CreateTable")
+    def create_table(self, *, TableName: str, KeySchema: List[Dict], AttributeDefinitions: List[Dict],
+                     GlobalSecondaryIndexes: Optional[List[Dict]] = None, **_) -> Dict:
+        def keys(schema: List[Dict]) -> Tuple[str, Optional[str]]:
+            by_type = {element["KeyType"]: element["AttributeName"] for element in schema}
+            return by_type["HASH"], by_type.get("RANGE")
+
+        hash_key, range_key = keys(KeySchema)
+        indexes = {index["IndexName"]: keys(index["KeySchema"]) for index in GlobalSecondaryIndexes or []}
+        types = {definition["AttributeName"]: definition["AttributeType"] for definition in AttributeDefinitions}
+        with self._backend._lock:
+            if TableName in self._backend._tables:
+                raise _InUse(f"Table already exists: {TableName}")
+            self._backend._tables[TableName] = MemoryTable(
+                self._backend, TableName, hash_key, range_key, indexes, types
+            )
+        return {"TableDescription": {"TableName": TableName, "TableStatus": "ACTIVE", "KeySchema": KeySchema}}
+
+    @_operation("DeleteTable")
+    def delete_table(self, *, TableName: str) -> Dict:
+        with self._backend._lock:
+            if self._backend._tables.pop(TableName, None) is None:
+                raise _NotFound(f"Requested resource not found: Table: {TableName} not found")
+        return {"TableDescription": {"TableName": TableName, "TableStatus": "DELETING"}}
+
+    @_operation("UpdateTimeToLive")
+    def update_time_to_live(self, *, TableName: str, TimeToLiveSpecification: Dict) -> Dict:
+        # Only the setting is kept; expired items stay until deleted, as they
+        # may on the service (``jobs.sweep_expired`` deletes them).
+        table = self._backend._existing_table(TableName)
+        enabled = TimeToLiveSpecification["Enabled"]
+        table.ttl_attribute = TimeToLiveSpecification["AttributeName"] if enabled else None
+        return {"TimeToLiveSpecification": dict(TimeToLiveSpecification)}
+
+    @_operation("DescribeTimeToLive")
+    def describe_time_to_live(self, *, TableName: str) -> Dict:
+        table = self._backend._existing_table(TableName)
+        if table.ttl_attribute is None:
+            return {"TimeToLiveDescription": {"TimeToLiveStatus": "DISABLED"}}
+        return {"TimeToLiveDescription": {"TimeToLiveStatus": "ENABLED", "AttributeName": table.ttl_attribute}}
+
+    def get_waiter(self, name: str):
+        # Tables are usable as soon as they are created.
+        class _Waiter:
+            def wait(self, **_):
+                return None
+        return _Waiter()
+
+
+class _Meta:
+    def __init__(self, client: MemoryClient):
+        self.client = client
+
+
+class MemoryDynamoDB:
+    """Stands in for ``boto3.resource("dynamodb")``; tables are created on first use."""
+
+    def __init__(self, indexes: Optional[Dict[str, Tuple[str, Optional[str]]]] = None):
+        self._lock = threading.RLock()
+        self._tables = {}
+        self._indexes = indexes
+        self._listeners = []
+        self._stats_lock = threading.Lock()
+        self._calls = Counter()
+        self._consumed = {"read": 0.0, "write": 0.0}
+        self.meta = _Meta(MemoryClient(self))
+
+    def Table(self, name: str) -> MemoryTable:
+        return self._table(name)
+
+    def _table(self, name: str) -> MemoryTable:
+        table = self._tables.get(name)
+        if table is None:
+            with self._lock:
+                table = self._tables.get(name)
+                if table is None:
+                    table = self._tables[name] = MemoryTable(self, name, indexes=self._indexes)
+        return table
+
+    def _existing_table(self, name: str) -> MemoryTable:
+        with self._lock:
+            table = self._tables.get(name)
+        if table is None:
+            raise _NotFound(f"Requested resource not found: Table: {name} not found")
+        return table
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Call ``listener(operation)`` for every API call, on the calling thread."""
+        self._listeners.append(listener)
+
+    def _record(self, operation: str) -> None:
+        with self._stats_lock:
+            self._calls[operation] += 1
+        for listener in self._listeners:
+            listener(operation)
+
+    def _consume(self, read: float = 0.0, write: float = 0.0) -> None:
+        with self._stats_lock:
+            self._consumed["read"] += read
+            self._consumed["write"] += write
+
+    def stats(self) -> Dict:
+        with self._stats_lock:
+            stats = {
+                "calls": dict(self._calls),
+                "consumed_read_units": self._consumed["read"],
+                "consumed_write_units": self._consumed["write"],
+            }
+        with self._lock:
+            stats["items"] = {name: table.item_count for name, table in self._tables.items()}
+        return stats
+
+    def reset(self) -> None:
+        """Drop every table and counter (listeners stay registered)."""
+        with self._lock:
+            self._tables.clear()
+        with self._stats_lock:
+            self._calls.clear()
+            self._consumed = {"read": 0.0, "write": 0.0}
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared() -> MemoryDynamoDB:
+    """The process-wide in-memory backend used by ``Database`` when selected."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = MemoryDynamoDB()
+    return _shared
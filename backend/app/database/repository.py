@@ -0,0 +1,244 @@
+from typing import Any, Dict, List, Optional
+from .db_config import client_error
+
+
+_WIRE_TYPES = {"S", "N", "B", "BOOL", "NULL", "M", "L", "SS", "NS", "BS"}
+
+
+def from_wire(item: Optional[Dict]) -> Optional[Dict]:
+    """Decode an item the service returned in low-level form (in a ClientError or a stream record)."""
+    if not item or not all(
+        isinstance(value, dict) and len(value) == 1 and next(iter(value)) in _WIRE_TYPES
+        for value in item.values()
+    ):
+        return item
+    from boto3.dynamodb.types import TypeDeserializer
+    deserializer = TypeDeserializer()
+    return {name: deserializer.deserialize(value) for name, value in item.items()}
+
+
+class ConditionFailed(Exception):
+    """The item was not in the state a conditional write expected."""
+
+    def __init__(self, message: str = "Conditional check failed", item: Optional[Dict] = None):
+        super().__init__(message)
+        self.item = item
+
+
+class Update:
+    """Builder for a partial, optionally conditional, UpdateItem.
+
+    Every method returns ``self`` so transitions read as one expression::
+
+        Update().add("attempts", 1).set("updated_at", now).expect("status", "active")
+    """
+
+    def __init__(self):
+        self._names = {}
+        self._values = {}
+        self._set = []
+        self._add = []
+        self._remove = []
+        self._conditions = []
+
+    def _name(self, attr: str) -> str:
+        placeholder = f"#{attr}"
+        self._names[placeholder] = attr
+        return placeholder
+
+    def _value(self, value: Any) -> str:
+        placeholder = f":v{len(self._values)}"
+        self._values[placeholder] = value
+        return placeholder
+
+    def set(self, attr: str, value: Any) -> "Update":
+        self._set.append(f"{self._name(attr)} = {self._value(value)}")
+        return self
+
+    def set_if_not_exists(self, attr: str, value: Any) -> "Update":
+        name = self._name(attr)
+        self._set.append(f"{name} = if_not_exists({name}, {self._value(value)})")
+        return self
+
+    def add(self, attr: str, amount: int = 1) -> "Update":
+        self._add.append(f"{self._name(attr)} {self._value(amount)}")
+        return self
+
+    def append(self, attr: str, values: List[Any]) -> "Update":
+        name = self._name(attr)
+        self._set.append(
+            f"{name} = list_append(if_not_exists({name}, {self._value([])}), {self._value(list(values))})"
+        )
+        return self
+
+    def remove(self, attr: str) -> "Update":
+        self._remove.append(self._name(attr))
+        return self
+
+    def expect(self, attr: str, value: Any) -> "Update":
+        self._conditions.append(f"{self._name(attr)} = {self._value(value)}")
+        return self
+
+    def expect_element(self, attr: str, index: int, value: Any) -> "Update":
+        """Require list element ``attr[index]`` to equal ``value``."""
+        self._conditions.append(f"{self._name(attr)}[{int(index)}] = {self._value(value)}")
+        return self
+
+    def expect_size(self, attr: str, size: int) -> "Update":
+        name = self._name(attr)
+        if size == 0:
+            self._conditions.append(f"(attribute_not_exists({name}) OR size({name}) = {self._value(0)})")
+        else:
+            self._conditions.append(f"size({name}) = {self._value(size)}")
+        return self
+
+    def expect_absent_or(self, attr: str, value: Any) -> "Update":
+        """Require ``attr`` to be missing or equal to ``value``."""
+        name = self._name(attr)
+        self._conditions.append(f"(attribute_not_exists({name}) OR {name} = {self._value(value)})")
+        return self
+
+    def expect_below(self, attr: str, value: Any) -> "Update":
+        """Require ``attr`` to be missing or strictly less than ``value``."""
+        name = self._name(attr)
+        self._conditions.append(f"(attribute_not_exists({name}) OR {name} < {self._value(value)})")
+        return self
+
+    def expect_above(self, attr: str, value: Any) -> "Update":
+        """Require ``attr`` to be missing or strictly greater than ``value``."""
+        name = self._name(attr)
+        self._conditions.append(f"(attribute_not_exists({name}) OR {name} > {self._value(value)})")
+        return self
+
+    def expect_exists(self, attr: str = "pk") -> "Update":
+        self._conditions.append(f"attribute_exists({self._name(attr)})")
+        return self
+
+    def expect_version(self, version: Optional[int]) -> "Update":
+        """Optimistic lock: require ``version`` to match and bump it."""
+        name = self._name("version")
+        if version is None:
+            self._conditions.append(f"attribute_not_exists({name})")
+        else:
+            self._conditions.append(f"{name} = {self._value(version)}")
+        return self.add("version", 1)
+
+    def condition_params(self) -> Dict:
+        """Only the condition part, for Put/Delete/ConditionCheck operations."""
+        params = {}
+        if self._conditions:
+            params["ConditionExpression"] = " AND ".join(self._conditions)
+            params["ExpressionAttributeNames"] = dict(self._names)
+            if self._values:
+                params["ExpressionAttributeValues"] = dict(self._values)
+        return params
+
+    def to_params(self) -> Dict:
+        clauses = []
+        if self._set:
+            clauses.append("SET " + ", ".join(self._set))
+        if self._add:
+            clauses.append("ADD " + ", ".join(self._add))
+        if self._remove:
+            clauses.append("REMOVE " + ", ".join(self._remove))
+        params = {"UpdateExpression": " ".join(clauses)}
+        if self._names:
+            params["ExpressionAttributeNames"] = dict(self._names)
+        if self._values:
+            params["ExpressionAttributeValues"] = dict(self._values)
+        if self._conditions:
+            params["ConditionExpression"] = " AND ".join(self._conditions)
+        return params
+
+
+class Repository:
+    """Single-round-trip item operations on top of a table handle."""
+
+    def __init__(self, table):
+        self.table = table
+
+    @staticmethod
+    def _is_condition_failure(error: Exception) -> bool:
+        return error.response["Error"]["Code"] == "ConditionalCheckFailedException"
+
+    def get(self, key: Dict, attributes: Optional[List[str]] = None) -> Optional[Dict]:
+        params = {"Key": key}
+        if attributes:
+            params["ProjectionExpression"] = ", ".join(f"#p{i}" for i in range(len(attributes)))
+            params["ExpressionAttributeNames"] = {f"#p{i}": attr for i, attr in enumerate(attributes)}
+        return self.table.get_item(**params).get("Item")
+
+    def create(self, item: Dict) -> Dict:
+        """Put ``item`` only if its key does not exist yet."""
+        try:
+            self.table.put_item(Item=item, ConditionExpression="attribute_not_exists(pk)")
+        except client_error() as e:
+            if self._is_condition_failure(e):
+                raise ConditionFailed("Item already exists")
+            raise
+        return item
+
+    def update(self, key: Dict, update: Update, return_values: str = "ALL_NEW",
+               return_old_on_failure: bool = False) -> Dict:
+        """Apply ``update`` in one write and return the requested attributes.
+
+        Raises ``ConditionFailed`` when any ``expect*`` condition does not hold.
+        With ``return_old_on_failure`` the exception carries the current item,
+        so callers can inspect the state without a follow-up read.
+        """
+        params = update.to_params()
+        if return_old_on_failure:
+            params["ReturnValuesOnConditionCheckFailure"] = "ALL_OLD"
+        try:
+            response = self.table.update_item(Key=key, ReturnValues=return_values, **params)
+        except client_error() as e:
+            if self._is_condition_failure(e):
+                # Error responses bypass boto3's resource-level deserialization.
+                raise ConditionFailed(item=from_wire(e.response.get("Item")))
+            raise
+        return response.get("Attributes", {})
+
+    def batch_get(self, keys: List[Dict], attributes: Optional[List[str]] = None) -> List[Dict]:
+        """Fetch several items in one BatchGetItem, retrying unprocessed keys."""
+        request = {"Keys": keys}
+        if attributes:
+            request["ProjectionExpression"] = ", ".join(f"#p{i}" for i in range(len(attributes)))
+            request["ExpressionAttributeNames"] = {f"#p{i}": attr for i, attr in enumerate(attributes)}
+
+        items = []
+        pending = {self.table.name: request}
+        while pending:
+            response = self.table.meta.client.batch_get_item(RequestItems=pending)
+            items.extend(response.get("Responses", {}).get(self.table.name, []))
+            pending = response.get("UnprocessedKeys") or {}
+        return items
+
+    def put_op(self, item: Dict, condition: Optional[Update] = None) -> Dict:
+        op = {"TableName": self.table.name, "Item": item}
+        if condition is not None:
+            op.update(condition.condition_params())
+        return {"Put": op}
+
+    def update_op(self, key: Dict, update: Update) -> Dict:
+        return {"Update": {"TableName": self.table.name, "Key": key, **update.to_params()}}
+
+    def delete_op(self, key: Dict, condition: Optional[Update] = None) -> Dict:
+        op = {"TableName": self.table.name, "Key": key}
+        if condition is not None:
+            op.update(condition.condition_params())
+        return {"Delete": op}
+
+    def transact(self, operations: List[Dict]) -> None:
+        """Apply ``operations`` all-or-nothing in one TransactWriteItems call.
+
+        Raises ``ConditionFailed`` if any operation's condition does not hold.
+        """
+        try:
+            self.table.meta.client.transact_write_items(TransactItems=operations)
+        except client_error() as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                raise
+            reasons = e.response.get("CancellationReasons", [])
+            if reasons and not any(r.get("Code") == "ConditionalCheckFailed" for r in reasons):
+                raise
+            raise ConditionFailed("Transaction condition failed")
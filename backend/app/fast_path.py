@@ -0,0 +1,260 @@
+"""Native API Gateway handling for the hottest routes.
+
+``FastPathRouter.dispatch`` serves ``POST /phase1/step/<id>``,
+``POST /phase2/solve/<id>`` and ``GET /challenges`` straight from the proxy
+event, skipping the WSGI environ and response translation. Auth, rate
+limiting, the controllers and the catalog cache are the same objects the
+blueprints use. Anything the router does not fully understand (other routes,
+non-JSON bodies, ALB or custom integrations) returns ``None`` so the caller
+can hand the event to Flask unchanged.
+"""
+import base64
+import json
+import logging
+import re
+from typing import Optional
+from urllib.parse import parse_qsl, unquote
+from werkzeug.datastructures import Headers
+from .config import env
+from .routes import api_warrior, crypto_maze
+from .routes.challenge import catalog_entry
+from .utils import db_accounting, logs
+from .utils.metrics import registry, route_labels
+from .utils.auth import authenticate
+from .utils.catalog_cache import catalog_cache
+from .utils.rate_limit import RateLimit, rate_limit_headers
+
+logger = logging.getLogger(__name__)
+
+WARMUP_SOURCES = ("aws.events", "serverless-plugin-warmup")
+
+
+def is_warmup_event(event: dict) -> bool:
+    """Scheduled keep-warm invocations (EventBridge rule or ``{"warmer": true}`` pings)."""
+    return event.get("source") in WARMUP_SOURCES or bool(event.get("warmer"))
+
+
+def dump_json(app, payload) -> bytes:
+    """Serialize ``payload`` exactly as ``flask.jsonify`` would for ``app``."""
+    provider = app.json
+    if (provider.compact is None and app.debug) or provider.compact is False:
+        dumped = provider.dumps(payload, indent=2, separators=(", ", ": "))
+    else:
+        dumped = provider.dumps(payload, separators=(",", ":"))
+    return f"{dumped}\n".encode("utf-8")
+
+
+class FastRequest:
+    """The parts of an API Gateway proxy event (payload v1 or v2) the hot routes need."""
+
+    __slots__ = ("method", "path", "headers", "args", "body", "multi_value")
+
+    def __init__(self, method, path, headers, args, body, multi_value=False):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.args = args
+        self.body = body
+        self.multi_value = multi_value
+
+    @classmethod
+    def from_event(cls, event: dict, base_path: str = None) -> Optional["FastRequest"]:
+        if event.get("version") == "2.0":
+            method = event.get("requestContext", {}).get("http", {}).get("method", "")
+            path = event.get("rawPath", "")
+            headers = Headers(event.get("headers") or {})
+            args = {}
+            for key, value in parse_qsl(event.get("rawQueryString", ""), keep_blank_values=True):
+                args.setdefault(key, value)
+            multi_value = False
+        elif "httpMethod" in event and "path" in event:
+            method = event["httpMethod"]
+            path = event["path"]
+            multi_value = bool(event.get("multiValueHeaders"))
+            headers = Headers(event["multiValueHeaders"] if multi_value else event.get("headers") or {})
+            multi_args = event.get("multiValueQueryStringParameters")
+            if multi_args:
+                args = {key: values[0] for key, values in multi_args.items() if values}
+            else:
+                args = dict(event.get("queryStringParameters") or {})
+        else:
+            return None
+
+        if "?" in path:
+            path = path.split("?")[0]
+        if base_path:
+            prefix = "/" + base_path
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+
+        body = event.get("body") or ""
+        if event.get("isBase64Encoded"):
+            body = base64.b64decode(body)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        return cls(method, unquote(path), headers, args, body, multi_value)
+
+    @classmethod
+    def from_scope(cls, scope: dict, body: bytes) -> "FastRequest":
+        """Build the request from an ASGI HTTP scope and its full body."""
+        headers = Headers([
+            (key.decode("latin-1"), value.decode("latin-1")) for key, value in scope.get("headers", [])
+        ])
+        args = {}
+        for key, value in parse_qsl(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True):
+            args.setdefault(key, value)
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        return cls(scope["method"], path, headers, args, body)
+
+    def json(self):
+        """Parsed JSON body, or ``None`` when Flask would not accept it either."""
+        if self.headers.get("Content-Type", "").split(";")[0].strip() != "application/json":
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+
+class FastPathRouter:
+    """Routes hot API Gateway events to the controllers without going through WSGI."""
+
+    ROUTES = (
+        ("POST", re.compile(r"^/phase1/step/([^/]+)$"), "_phase1_step"),
+        ("POST", re.compile(r"^/phase2/solve/([^/]+)$"), "_phase2_solve"),
+        ("GET", re.compile(r"^/challenges$"), "_challenges"),
+    )
+
+    def __init__(self, app):
+        self.app = app
+        self.base_path = env("API_GATEWAY_BASE_PATH")
+
+    def dispatch(self, event: dict) -> Optional[dict]:
+        """Serve ``event`` if it targets a hot route; ``None`` means "use Flask"."""
+        req = FastRequest.from_event(event, self.base_path)
+        if req is None:
+            return None
+        for method, pattern, handler in self.ROUTES:
+            match = pattern.match(req.path)
+            if match and req.method == method:
+                labels = route_labels(self.app, req.method, req.path)
+                started = registry.start(labels)
+                token = db_accounting.begin()
+                try:
+                    response = getattr(self, handler)(req, *match.groups())
+                except Exception:
+                    db_accounting.discard(token)
+                    registry.observe(labels, 500, started)
+                    raise
+                if response is None:
+                    # Flask records it instead.
+                    db_accounting.discard(token)
+                    registry.abandon(labels)
+                    return None
+                registry.observe(labels, response["statusCode"], started)
+                if logs.current_request_id():
+                    self._add_header(response, "X-Request-ID", logs.current_request_id())
+                account = db_accounting.finish(token, method=req.method, path=req.path,
+                                               status=response["statusCode"])
+                if account is not None:
+                    self._add_header(response, "Server-Timing", account.server_timing())
+                return response
+        return None
+
+    @staticmethod
+    def _add_header(response: dict, key: str, value: str) -> None:
+        if "multiValueHeaders" in response:
+            response["multiValueHeaders"][key] = [value]
+        else:
+            response["headers"][key] = value
+
+    def _respond(self, req: FastRequest, status: int, body: bytes, headers: dict) -> dict:
+        response = {"statusCode": status}
+        if req.multi_value:
+            response["multiValueHeaders"] = {key: [value] for key, value in headers.items()}
+        else:
+            response["headers"] = headers
+        if headers.get("Content-Encoding"):
+            response["body"] = base64.b64encode(body).decode("utf-8")
+            response["isBase64Encoded"] = True
+        else:
+            response["body"] = body.decode("utf-8")
+            response["isBase64Encoded"] = False
+        return response
+
+    def _json(self, req: FastRequest, status: int, payload, headers: dict = None) -> dict:
+        body = dump_json(self.app, payload)
+        return self._respond(req, status, body, {**(headers or {}), "Content-Type": "application/json"})
+
+    def _authorized(self, req: FastRequest, limits: dict):
+        """Authenticate and count the request; returns ``(user, headers, error response)``."""
+        try:
+            user = authenticate(req.headers.get("Authorization"))
+        except ValueError as e:
+            return None, None, self._json(req, 401, {"error": str(e)})
+
+        result = RateLimit(**limits).hit(user.email)
+        headers = rate_limit_headers(result)
+        if not result["allowed"]:
+            return user, headers, self._json(req, 429, {
+                "error": "Rate limit exceeded",
+                "remaining_requests": result["remaining"],
+                "reset_time": result["reset"]
+            }, headers)
+        return user, headers, None
+
+    def _phase1_step(self, req: FastRequest, challenge_id: str) -> dict:
+        user, headers, error = self._authorized(req, api_warrior.STEP_RATE_LIMIT)
+        if error:
+            return error
+        try:
+            result = api_warrior.get_controller().verify_request_header(
+                user.email, challenge_id, req.headers
+            )
+            return self._json(req, 200, result, headers)
+        except ValueError as e:
+            return self._json(req, 400, {"error": str(e)}, headers)
+        except Exception:
+            return self._json(req, 500, {"error": "Internal server error"}, headers)
+
+    def _phase2_solve(self, req: FastRequest, maze_id: str) -> Optional[dict]:
+        data = req.json()
+        if data is None:
+            return None
+        user, headers, error = self._authorized(req, crypto_maze.SOLVE_RATE_LIMIT)
+        if error:
+            return error
+        try:
+            if not isinstance(data, dict) or "decoded_message" not in data:
+                return self._json(req, 400, {"error": "Missing decoded_message in request"}, headers)
+
+            stage = data.get("stage")
+            if stage is not None and not isinstance(stage, int):
+                return self._json(req, 400, {"error": "stage must be an integer"}, headers)
+
+            result = crypto_maze.get_controller().verify_solution(
+                user.email, maze_id, data["decoded_message"], stage
+            )
+            return self._json(req, 200, result, headers)
+        except ValueError as e:
+            return self._json(req, 400, {"error": str(e)}, headers)
+        except Exception:
+            logger.exception("Unhandled error in %s", req.path)
+            return self._json(req, 500, {"error": "Internal server error"}, headers)
+
+    def _challenges(self, req: FastRequest) -> dict:
+        # The catalog cache serializes with the app's JSON provider.
+        with self.app.app_context():
+            try:
+                entry = catalog_entry(req.args)
+            except ValueError as e:
+                return self._json(req, 400, {"error": str(e)})
+        status, body, headers = catalog_cache.negotiate(
+            entry,
+            req.headers.get("If-None-Match"),
+            req.headers.get("Accept-Encoding"),
+        )
+        return self._respond(req, status, body, headers)
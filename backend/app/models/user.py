@@ -1,8 +1,10 @@
 from .base import BaseEntity
 from typing import Optional, Dict
 from datetime import datetime, timezone
-import bcrypt
 import logging
+from ..utils.hashing import password_hasher, HasherBusy
+
+logger = logging.getLogger(__name__)
 
 
 class User(BaseEntity):
@@ -33,24 +35,24 @@ class User(BaseEntity):
     def hash_password(self, password: str) -> str:
         if not password or len(password) < 6:
             raise ValueError("Password must be at least 6 characters long")
-        salt = bcrypt.gensalt(12)
-        hashed = bcrypt.hashpw(password.encode("utf-8"), salt)
-        return hashed.decode("utf-8")
+        return password_hasher.hash(password)
 
     def verify_password(self, password: str) -> bool:
         if not self.password:
             raise ValueError("Password not set for this user")
 
-        stored_hash = self.password
-        input_bytes = password.encode("utf-8")
-        hash_bytes = stored_hash.encode("utf-8")
-
         try:
-            return bcrypt.checkpw(input_bytes, hash_bytes)
+            return password_hasher.verify(password, self.password)
+        except HasherBusy:
+            raise
         except Exception as e:
-            logging.error(f"Password verification error: {str(e)}")
+            logger.error("Password verification error: %s", e)
             return False
 
+    def needs_rehash(self) -> bool:
+        """True when the stored hash was made with a different work factor."""
+        return bool(self.password) and password_hasher.needs_rehash(self.password)
+
     def to_dict(self) -> Dict[str, Optional[str]]:
         base_dict = super().to_dict()
         base_dict.update({
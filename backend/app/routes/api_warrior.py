@@ -1,28 +1,49 @@
+import logging
+import threading
+from typing import TYPE_CHECKING
 from flask import Blueprint, request, jsonify
-from ..controllers.phase_1 import Phase1Controller
 from ..utils.auth import require_auth
-from ..utils.rate_limit import rate_limit
+from ..utils.rate_limit import rate_limit, API_RATE_LIMIT
+from ..utils.startup_profile import profiler
+
+if TYPE_CHECKING:
+    from ..controllers.phase_1 import Phase1Controller
 
 bp = Blueprint('phase1', __name__, url_prefix='/phase1')
-controller = Phase1Controller()
+logger = logging.getLogger(__name__)
+_controller = None
+_controller_lock = threading.Lock()
+STEP_RATE_LIMIT = API_RATE_LIMIT
+
+
+def get_controller() -> "Phase1Controller":
+    """Build the shared controller on first use instead of at import time"""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                from ..controllers.phase_1 import Phase1Controller
+                with profiler.phase("init.Phase1Controller", once=True):
+                    _controller = Phase1Controller()
+    return _controller
 
 @bp.route('/begin', methods=['GET'])
 @require_auth
 def begin_challenge():
     try:
         user_email = request.user.email
-        result = controller.create_challenge(user_email)
+        result = get_controller().create_challenge(user_email)
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 @bp.route('/step/<challenge_id>', methods=['POST'])
 @require_auth
-@rate_limit(max_requests=5, window_seconds=60)
+@rate_limit(**STEP_RATE_LIMIT)
 def challenge_step(challenge_id):
     try:
         user_email = request.user.email
-        result = controller.verify_request_header(
+        result = get_controller().verify_request_header(
             user_email,
             challenge_id,
             request.headers
@@ -43,7 +64,7 @@ def complete_challenge(challenge_id):
         if not data or 'assembled_key' not in data:
             return jsonify({'error': 'Missing assembled_key in request'}), 400
             
-        result = controller.complete_challenge(
+        result = get_controller().complete_challenge(
             user_email,
             challenge_id,
             data['assembled_key']
@@ -51,7 +72,6 @@ def complete_challenge(challenge_id):
         return jsonify(result), 200
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
-    except Exception as e:
-        import traceback
-        print(traceback.format_exc()) 
+    except Exception:
+        logger.exception("Unhandled error in %s", request.path)
         return jsonify({'error': 'Internal server error'}), 500
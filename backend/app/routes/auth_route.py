@@ -1,5 +1,5 @@
 from flask import request, jsonify, Blueprint
-from ..controllers.auth_controller import AuthController
+from ..utils.hashing import HasherBusy
 
 AuthRoute = Blueprint("AuthRoute", __name__)
 
@@ -10,10 +10,13 @@ def register_user():
         return jsonify({"error": "Request body is missing"}), 400
     
     try:
+        from ..controllers.auth_controller import AuthController
         user = AuthController().register_user(data)
         return jsonify(user), 201
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
+    except HasherBusy as e:
+        return jsonify({"error": str(e)}), 503
     
 @AuthRoute.route("/login", methods=["POST"])
 def login_user():
@@ -22,7 +25,10 @@ def login_user():
         return jsonify({"error": "Request body is missing"}), 400
     
     try:
+        from ..controllers.auth_controller import AuthController
         user = AuthController().login_user(data)
         return jsonify(user), 200
     except ValueError as e:
-        return jsonify({"error": str(e)}), 400
\ No newline at end of file
+        return jsonify({"error": str(e)}), 400
+    except HasherBusy as e:
+        return jsonify({"error": str(e)}), 503
\ No newline at end of file
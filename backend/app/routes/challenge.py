@@ -1,16 +1,62 @@
 import flask
+from urllib.parse import urlencode
 from flask import request, jsonify, Blueprint
-from ..controllers.challenge_controller import ChallengeController
+from ..utils.catalog_cache import catalog_cache
 
 ChallengeRoute = Blueprint("ChallengeRoute", __name__)
 
+def _load_catalog_page(args, category, difficulty, tags, limit, cursor):
+    from ..controllers.challenge_controller import ChallengeController
+    challenges, next_cursor = ChallengeController().query_challenges(
+        category, difficulty, tags, limit, cursor
+    )
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'</challenges?{urlencode({**args, "cursor": next_cursor})}>; rel="next"'
+    return [challenge.to_dict() for challenge in challenges], headers
+
+def _load_catalog(category, difficulty, tags):
+    from ..controllers.challenge_controller import ChallengeController
+    pages = ChallengeController().iter_pages(category, difficulty, tags)
+    return [challenge.to_dict() for page in pages for challenge in page], {}
+
+def catalog_entry(args):
+    """Resolve the catalog for the query ``args`` through the catalog cache.
+
+    Without ``limit`` or ``cursor`` the whole (filtered) catalog is returned,
+    as clients that do not follow ``X-Next-Cursor`` expect.
+    """
+    category = args.get("category")
+    difficulty = args.get("difficulty")
+    tags = sorted(tag.strip() for tag in args.get("tags", "").split(",") if tag.strip())
+    cursor = args.get("cursor")
+    if "limit" not in args and not cursor:
+        return catalog_cache.get(
+            f"{category}|{difficulty}|{','.join(tags)}|all|None",
+            lambda: _load_catalog(category, difficulty, tags)
+        )
+    try:
+        limit = int(args.get("limit", 20))
+    except ValueError:
+        raise ValueError("limit must be an integer")
+
+    key = f"{category}|{difficulty}|{','.join(tags)}|{limit}|{cursor}"
+    return catalog_cache.get(
+        key, lambda: _load_catalog_page(args, category, difficulty, tags, limit, cursor)
+    )
+
 @ChallengeRoute.route("/challenges", methods=["GET"])
 def get_all_challenges():
-    challenges = ChallengeController().get_all_challenges()
-    return jsonify(challenges), 200
+    try:
+        entry = catalog_entry(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return catalog_cache.response(entry)
 
 @ChallengeRoute.route("/challenges/<challenge_id>", methods=["GET"])
 def get_challenge(challenge_id):
+    from ..controllers.challenge_controller import ChallengeController
     challenge = ChallengeController().get_challenge(challenge_id)
     if not challenge:
         return jsonify({"error": "Challenge not found"}), 404
@@ -23,6 +69,7 @@ def create_challenge():
         return jsonify({"error": "Request body is missing"}), 400
     
     try:
+        from ..controllers.challenge_controller import ChallengeController
         challenge = ChallengeController().create_challenge(data)
         return {
             "message": "Challenge created successfully",
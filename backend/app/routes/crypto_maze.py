@@ -1,28 +1,45 @@
+import logging
+import threading
+from typing import TYPE_CHECKING
 from flask import Blueprint, request, jsonify
-from ..controllers.phase_2 import Phase2Controller
 from ..utils.auth import require_auth
-from ..utils.rate_limit import rate_limit
+from ..utils.rate_limit import rate_limit, API_RATE_LIMIT
+from ..utils.startup_profile import profiler
+
+if TYPE_CHECKING:
+    from ..controllers.phase_2 import Phase2Controller
 
 bp = Blueprint('phase2', __name__, url_prefix='/phase2')
-controller = Phase2Controller()
+logger = logging.getLogger(__name__)
+_controller = None
+_controller_lock = threading.Lock()
+SOLVE_RATE_LIMIT = API_RATE_LIMIT
 
-# Configure Logging
-import logging
-logging.basicConfig(level=logging.INFO)
+
+def get_controller() -> "Phase2Controller":
+    """Build the shared controller on first use instead of at import time"""
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                from ..controllers.phase_2 import Phase2Controller
+                with profiler.phase("init.Phase2Controller", once=True):
+                    _controller = Phase2Controller()
+    return _controller
 
 @bp.route('/begin', methods=['GET'])
 @require_auth
 def begin_maze():
     try:
         user_email = request.user.email
-        result = controller.initialize_maze(user_email)
+        result = get_controller().initialize_maze(user_email)
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
 @bp.route('/solve/<maze_id>', methods=['POST'])
 @require_auth
-@rate_limit(max_requests=5, window_seconds=60)
+@rate_limit(**SOLVE_RATE_LIMIT)
 def solve_maze_step(maze_id):
     try:
         user_email = request.user.email
@@ -31,17 +48,21 @@ def solve_maze_step(maze_id):
         if not data or 'decoded_message' not in data:
             return jsonify({'error': 'Missing decoded_message in request'}), 400
             
-        result = controller.verify_solution(
+        stage = data.get('stage')
+        if stage is not None and not isinstance(stage, int):
+            return jsonify({'error': 'stage must be an integer'}), 400
+
+        result = get_controller().verify_solution(
             user_email,
             maze_id,
-            data['decoded_message']
+            data['decoded_message'],
+            stage
         )
         return jsonify(result), 200
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
-    except Exception as e:
-        import traceback
-        print(traceback.format_exc())
+    except Exception:
+        logger.exception("Unhandled error in %s", request.path)
         return jsonify({'error': 'Internal server error'}), 500
 
 @bp.route('/complete/<maze_id>', methods=['POST'])
@@ -54,7 +75,7 @@ def complete_maze(maze_id):
         if not data or 'collected_tokens' not in data:
             return jsonify({'error': 'Missing collected_tokens in request'}), 400
             
-        result = controller.verify_completion(
+        result = get_controller().verify_completion(
             user_email,
             maze_id,
             data['collected_tokens']
@@ -62,7 +83,6 @@ def complete_maze(maze_id):
         return jsonify(result), 200
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
-    except Exception as e:
-        import traceback
-        print(traceback.format_exc())
+    except Exception:
+        logger.exception("Unhandled error in %s", request.path)
         return jsonify({'error': 'Internal server error'}), 500
\ No newline at end of file
@@ -0,0 +1,22 @@
+from flask import request, jsonify, Blueprint
+from ..utils.auth import require_auth
+
+DashboardRoute = Blueprint("DashboardRoute", __name__)
+
+@DashboardRoute.route("/dashboard", methods=["GET"])
+@require_auth
+def get_dashboard():
+    """Profile, runs, rate-limit window and stats for the signed-in player"""
+    from ..controllers.dashboard_controller import DashboardController, DEFAULT_PAGE_SIZE
+    try:
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    try:
+        dashboard = DashboardController().get_dashboard(
+            request.user.email, limit, request.args.get("cursor")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(dashboard), 200
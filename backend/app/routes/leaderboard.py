@@ -0,0 +1,21 @@
+from flask import request, jsonify, Blueprint
+
+LeaderboardRoute = Blueprint("LeaderboardRoute", __name__)
+
+@LeaderboardRoute.route("/leaderboard/<challenge>", methods=["GET"])
+def get_leaderboard(challenge):
+    """Top players for ``phase1`` or ``phase2``, served from the materialized board"""
+    from ..controllers.leaderboard_controller import LeaderboardController, LEADERBOARD_SIZE, leaderboard_cache
+    try:
+        limit = max(1, min(int(request.args.get("limit", LEADERBOARD_SIZE)), LEADERBOARD_SIZE))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    try:
+        entry = leaderboard_cache.get(
+            f"{challenge}|{limit}",
+            lambda: (LeaderboardController().get_leaderboard(challenge, limit), {})
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+    return leaderboard_cache.response(entry)
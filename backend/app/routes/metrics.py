@@ -0,0 +1,20 @@
+import hmac
+from flask import request, jsonify, Blueprint, Response
+from ..config import env, env_flag
+from ..utils.metrics import registry
+
+MetricsRoute = Blueprint("MetricsRoute", __name__)
+
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>". Without a token the
+# endpoint does not exist unless METRICS_PUBLIC opts in (e.g. a private network).
+METRICS_TOKEN = env("METRICS_TOKEN")
+METRICS_PUBLIC = env_flag("METRICS_PUBLIC")
+
+@MetricsRoute.route("/metrics", methods=["GET"])
+def export_metrics():
+    if not METRICS_TOKEN:
+        if not METRICS_PUBLIC:
+            return jsonify({"error": "Not found"}), 404
+    elif not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    return Response(registry.prometheus(), mimetype="text/plain; version=0.0.4")
@@ -1,29 +1,63 @@
-import jwt
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from functools import wraps
 from flask import request, jsonify
 from ..models.user import User  
-from dotenv import load_dotenv
-import os
+from ..config import env
+from .metrics import registry
 
-load_dotenv()
+SECRET_KEY = env("JWT_SECRET")
+# "compact" tokens carry only the subject; "full" embeds user.to_dict() (legacy).
+TOKEN_CLAIMS_MODE = env("JWT_CLAIMS_MODE", "compact")
+# Epoch seconds after which legacy full-user tokens are rejected. The default,
+# 2026-12-01T00:00:00Z, gives sessions from before compact tokens time to end.
+# It does not apply while JWT_CLAIMS_MODE=full still issues them.
+LEGACY_TOKENS_ACCEPTED_UNTIL = float(env("JWT_LEGACY_ACCEPTED_UNTIL", "1796083200"))
 
-SECRET_KEY = os.getenv("JWT_SECRET")
+logger = logging.getLogger(__name__)
+
+def legacy_cutoff():
+    """When legacy full-user tokens stop being accepted (None while this server issues them)"""
+    return None if TOKEN_CLAIMS_MODE == "full" else LEGACY_TOKENS_ACCEPTED_UNTIL
+
+class Principal:
+    """Lightweight authenticated identity built straight from compact claims."""
+
+    __slots__ = ("email", "pk")
+
+    def __init__(self, email: str):
+        self.email = email
+        self.pk = f"USER#{email}"
+
+    def __repr__(self) -> str:
+        return f"Principal(email={self.email})"
 
 class AuthUtil:
     @staticmethod
-    def generate_token(user: User, expires_in: int = 3600) -> str:
+    def generate_token(user: User, expires_in: int = 3600, mode: str = None) -> str:
+        now = datetime.now(timezone.utc)
         payload = {
-            "exp": datetime.now(timezone.utc) + timedelta(seconds=expires_in),
-            "iat": datetime.now(timezone.utc),
-            "user": user.to_dict(),  
+            "exp": now + timedelta(seconds=expires_in),
+            "iat": now,
         }
+        if (mode or TOKEN_CLAIMS_MODE) == "full":
+            payload["user"] = user.to_dict()
+        else:
+            payload["sub"] = user.email
+        import jwt
+
         # Encode the token
         token = jwt.encode(payload, SECRET_KEY, algorithm="HS256")
         return token
 
     @staticmethod
     def decode_token(token: str) -> dict:
+        import jwt
+
         try:
             decoded_payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
             return decoded_payload
@@ -32,24 +66,118 @@ class AuthUtil:
         except jwt.InvalidTokenError:
             raise ValueError("Invalid token.")
 
+    @staticmethod
+    def principal_from_payload(payload: dict):
+        """Build the request user from either compact or legacy full-user claims."""
+        subject = payload.get("sub")
+        if subject:
+            return Principal(subject)
+
+        user_data = payload.get("user")
+        if not user_data:
+            raise ValueError("Invalid token payload.")
+        if legacy_cutoff() is not None and time.time() > legacy_cutoff():
+            raise ValueError("Token format is no longer supported. Please log in again.")
+        logger.warning("Accepted a legacy full-user token for %s", user_data.get("email"))
+        return User.from_dict(user_data)
+
+class TokenCache:
+    """Bounded LRU of already-validated tokens, keyed by token digest.
+
+    Entries hold an immutable snapshot of the identity claims (``identity``)
+    and are dropped once the token's ``exp`` has passed, so a hit never
+    outlives the token. Callers build a fresh user from the snapshot, so no
+    user object is shared between requests. Callers can cut an entry shorter
+    with ``until`` (legacy tokens stop at the cutoff).
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    @staticmethod
+    def identity(payload: dict):
+        """The claims a user is built from, as a str (compact) or a tuple of items (legacy)"""
+        if payload.get("sub"):
+            return payload["sub"]
+        return tuple(sorted(payload["user"].items()))
+
+    def put(self, key: str, payload: dict, until: float = None) -> None:
+        exp = payload.get("exp")
+        if not exp:
+            return
+        deadline = float(exp) if until is None else min(float(exp), until)
+        identity = self.identity(payload)
+        with self._lock:
+            self._entries[key] = (deadline, identity)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+token_cache = TokenCache(int(env("TOKEN_CACHE_SIZE", "1024")))
+registry.add_collector("token_cache", token_cache.stats)
+
+def authenticate(auth_header: str):
+    """Resolve a ``Bearer`` header to the request user, raising ValueError if it is invalid."""
+    if not auth_header or not auth_header.startswith("Bearer "):
+        raise ValueError("Authorization header is missing or invalid")
+
+    token = auth_header.split(" ")[1]
+    cache_key = TokenCache.digest(token)
+    identity = token_cache.get(cache_key)
+    if identity is not None:
+        return Principal(identity) if isinstance(identity, str) else User.from_dict(dict(identity))
+
+    payload = AuthUtil.decode_token(token)
+    user = AuthUtil.principal_from_payload(payload)
+    token_cache.put(cache_key, payload, until=None if payload.get("sub") else legacy_cutoff())
+    return user
+
 def require_auth(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return jsonify({"error": "Authorization header is missing or invalid"}), 401
-        
-        token = auth_header.split(" ")[1]
         try:
-            payload = AuthUtil.decode_token(token)
-            user_data = payload.get("user")
-            if not user_data:
-                raise ValueError("Invalid token payload.")
-            
-            request.user = User.from_dict(user_data)
+            request.user = authenticate(request.headers.get("Authorization"))
         except ValueError as e:
             return jsonify({"error": str(e)}), 401
-        
         return func(*args, **kwargs)
     
-    return wrapper
\ No newline at end of file
+    return wrapper
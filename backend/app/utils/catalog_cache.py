@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+from ..config import env
+from .metrics import registry
+import threading
+import time
+from typing import Callable, Tuple
+from flask import current_app, request, Response
+from werkzeug.http import parse_accept_header, parse_etags, quote_etag
+
+
+class CatalogEntry:
+    """One serialized catalog response with its gzip variant and ETag."""
+
+    __slots__ = ("body", "gzip_body", "etag", "expires_at", "headers")
+
+    def __init__(self, body: bytes, ttl: float, headers: dict = None):
+        self.body = body
+        self.headers = headers or {}
+        self.gzip_body = gzip.compress(body, compresslevel=6, mtime=0)
+        self.etag = hashlib.sha1(body).hexdigest()
+        self.expires_at = time.monotonic() + ttl
+
+
+class CatalogCache:
+    """In-process cache of pre-serialized, pre-compressed catalog bodies.
+
+    Entries are keyed by query (filters, page size and cursor) and refreshed
+    after ``ttl`` seconds or when ``invalidate`` is called after a write.
+    ``loader`` returns the payload and any extra headers for that page.
+    """
+
+    def __init__(self, ttl: float = 60, max_entries: int = 256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0}
+
+    def get(self, key: str, loader: Callable[[], Tuple[object, dict]]) -> CatalogEntry:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at > time.monotonic():
+            with self._lock:
+                self._stats["hits"] += 1
+            return entry
+
+        with self._lock:
+            self._stats["misses"] += 1
+        payload, headers = loader()
+        body = current_app.json.dumps(payload).encode("utf-8")
+        entry = CatalogEntry(body, self.ttl, headers)
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def negotiate(self, entry: CatalogEntry, if_none_match: str = None,
+                  accept_encoding: str = None, status: int = 200) -> Tuple[int, bytes, dict]:
+        """Pick status, body and headers for ``entry`` from the raw request headers."""
+        headers = dict(entry.headers)
+        headers["ETag"] = quote_etag(entry.etag)
+        headers["Cache-Control"] = "no-cache"
+        headers["Vary"] = "Accept-Encoding"
+        if if_none_match and parse_etags(if_none_match).contains(entry.etag):
+            with self._lock:
+                self._stats["not_modified"] += 1
+            return 304, b"", headers
+
+        headers["Content-Type"] = "application/json"
+        if accept_encoding and "gzip" in parse_accept_header(accept_encoding):
+            headers["Content-Encoding"] = "gzip"
+            return status, entry.gzip_body, headers
+        return status, entry.body, headers
+
+    def response(self, entry: CatalogEntry, status: int = 200) -> Response:
+        """Build a 200/304 response for ``entry`` honouring If-None-Match and gzip."""
+        status, body, headers = self.negotiate(
+            entry,
+            request.headers.get("If-None-Match"),
+            request.headers.get("Accept-Encoding"),
+            status,
+        )
+        return Response(body, status=status, headers=headers)
+
+catalog_cache = CatalogCache(float(env("CATALOG_CACHE_TTL", "60")))
+registry.add_collector("catalog_cache", catalog_cache.stats)
@@ -0,0 +1,134 @@
+from ..config import ON_LAMBDA, env, env_flag
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+
+class ChallengePool:
+    """Background-refilled pool of pre-generated challenge content.
+
+    ``claim`` pops a ready payload (riddle set, maze path, ...) so request
+    handlers only assemble and write the item. A daemon thread tops the pool
+    back up once it drops below the low-water mark. The pool is per
+    process; a cold instance starts empty and generates inline until the
+    refiller catches up.
+
+    On Lambda the process is frozen between invocations, so a refill thread
+    would mostly run during requests. There is no thread there: the pool
+    holds what ``fill`` put in at init (``APP_EAGER_INIT``) and then
+    generates inline, which costs tens of microseconds per claim.
+    ``CHALLENGE_POOL_BACKGROUND`` overrides the choice.
+    """
+
+    _registry = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, name: str, generator: Callable[[], Dict], target: int = None,
+                 low_water: int = None, background: bool = None):
+        self.name = name
+        self.generator = generator
+        self.background = env_flag("CHALLENGE_POOL_BACKGROUND", not ON_LAMBDA) if background is None else background
+        self.target = target or int(env("CHALLENGE_POOL_SIZE", "256"))
+        self.low_water = low_water or max(1, self.target // 4)
+        self._items = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stats = {
+            "claims": 0,
+            "pool_hits": 0,
+            "pool_misses": 0,
+            "generated": 0,
+            "claim_seconds_total": 0.0,
+            "claim_seconds_max": 0.0,
+        }
+
+    @classmethod
+    def get(cls, name: str, generator: Callable[[], Dict]) -> "ChallengePool":
+        """Return the process-wide pool for ``name``, creating it on first use."""
+        pool = cls._registry.get(name)
+        if pool is None:
+            with cls._registry_lock:
+                pool = cls._registry.get(name)
+                if pool is None:
+                    pool = cls._registry[name] = cls(name, generator)
+        return pool
+
+    @classmethod
+    def all_stats(cls) -> Dict[str, Dict]:
+        return {name: pool.stats() for name, pool in list(cls._registry.items())}
+
+    def claim(self) -> Dict:
+        """Take one pre-generated payload, generating inline only if the pool is empty."""
+        started = time.perf_counter()
+        if self.background:
+            self._ensure_refiller()
+        try:
+            payload = self._items.popleft()
+            hit = True
+        except IndexError:
+            payload = self.generator()
+            hit = False
+
+        if self.background and len(self._items) < self.low_water:
+            self._wake.set()
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats["claims"] += 1
+            self._stats["pool_hits" if hit else "pool_misses"] += 1
+            self._stats["claim_seconds_total"] += elapsed
+            self._stats["claim_seconds_max"] = max(self._stats["claim_seconds_max"], elapsed)
+        return payload
+
+    def fill(self, count: Optional[int] = None) -> int:
+        """Generate up to ``count`` payloads (default: back up to target)."""
+        count = self.target - len(self._items) if count is None else count
+        added = 0
+        for _ in range(max(0, count)):
+            self._items.append(self.generator())
+            added += 1
+        with self._lock:
+            self._stats["generated"] += added
+        return added
+
+    def _ensure_refiller(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._refill_loop, name=f"pool-{self.name}", daemon=True
+            )
+            self._thread.start()
+        self._wake.set()
+
+    def _refill_loop(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                self.fill()
+            except Exception:
+                logger.exception("Challenge pool refill error (%s)", self.name)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        claims = stats["claims"]
+        stats["depth"] = len(self._items)
+        stats["target"] = self.target
+        stats["background"] = self.background
+        stats["hit_rate"] = stats["pool_hits"] / claims if claims else 0.0
+        stats["claim_ms_avg"] = stats.pop("claim_seconds_total") * 1000 / claims if claims else 0.0
+        stats["claim_ms_max"] = stats.pop("claim_seconds_max") * 1000
+        return stats
+
+
+registry.add_collector("challenge_pool", ChallengePool.all_stats, label="pool")
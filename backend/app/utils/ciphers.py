@@ -0,0 +1,99 @@
+import base64
+import string
+from typing import Callable, Dict, Iterable, List, Tuple
+
+CAESAR_SHIFT = 3
+XOR_KEY = 42
+
+
+def _caesar_tables(shift: int) -> Tuple[Dict[int, int], Dict[int, int]]:
+    lower, upper, digits = string.ascii_lowercase, string.ascii_uppercase, string.digits
+    plain = lower + upper + digits
+    shifted = (
+        lower[shift % 26:] + lower[:shift % 26]
+        + upper[shift % 26:] + upper[:shift % 26]
+        + digits[shift % 10:] + digits[:shift % 10]
+    )
+    return str.maketrans(plain, shifted), str.maketrans(shifted, plain)
+
+
+_CAESAR_ENCODE, _CAESAR_DECODE = _caesar_tables(CAESAR_SHIFT)
+# XOR is its own inverse, so one byte table serves both directions.
+_XOR_TABLE = bytes(b ^ XOR_KEY for b in range(256))
+
+
+def _xor(message: str) -> str:
+    if message.isascii():
+        return message.encode("ascii").translate(_XOR_TABLE).decode("latin-1")
+    return "".join(chr(ord(c) ^ XOR_KEY) for c in message)
+
+
+def _b64encode(message: str) -> str:
+    return base64.b64encode(message.encode()).decode()
+
+
+def _b64decode(message: str) -> str:
+    return base64.b64decode(message.encode()).decode()
+
+
+class Codec:
+    """An encoder/decoder pair for one cipher type."""
+
+    __slots__ = ("name", "encode", "decode")
+
+    def __init__(self, name: str, encode: Callable[[str], str], decode: Callable[[str], str]):
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+
+    def encode_many(self, messages: Iterable[str]) -> List[str]:
+        return list(map(self.encode, messages))
+
+    def decode_many(self, messages: Iterable[str]) -> List[str]:
+        return list(map(self.decode, messages))
+
+
+CODECS = {
+    'base64': Codec('base64', _b64encode, _b64decode),
+    'caesar': Codec(
+        'caesar',
+        lambda message: message.translate(_CAESAR_ENCODE),
+        lambda message: message.translate(_CAESAR_DECODE),
+    ),
+    'xor': Codec('xor', _xor, _xor),
+    # Reversed, then Base64 encoded
+    'custom': Codec(
+        'custom',
+        lambda message: _b64encode(message[::-1]),
+        lambda message: _b64decode(message)[::-1],
+    ),
+}
+
+
+def get_codec(encoding_type: str) -> Codec:
+    try:
+        return CODECS[encoding_type]
+    except KeyError:
+        raise ValueError(f"Unknown encoding type: {encoding_type}")
+
+
+def encode(encoding_type: str, message: str) -> str:
+    return get_codec(encoding_type).encode(message)
+
+
+def decode(encoding_type: str, message: str) -> str:
+    return get_codec(encoding_type).decode(message)
+
+
+def encode_batch(items: Iterable[Tuple[str, str]]) -> List[str]:
+    """Encode ``(encoding_type, message)`` pairs, grouping work per codec."""
+    items = list(items)
+    results = [None] * len(items)
+    groups = {}
+    for i, (encoding_type, message) in enumerate(items):
+        groups.setdefault(encoding_type, []).append((i, message))
+    for encoding_type, group in groups.items():
+        encoded = get_codec(encoding_type).encode_many(message for _, message in group)
+        for (i, _), value in zip(group, encoded):
+            results[i] = value
+    return results
@@ -0,0 +1,23 @@
+import base64
+import json
+from typing import Dict, Optional
+
+
+def encode_cursor(last_key: Optional[Dict]) -> Optional[str]:
+    """Opaque, URL-safe form of a DynamoDB LastEvaluatedKey"""
+    if not last_key:
+        return None
+    raw = json.dumps(last_key, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("utf-8")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict]:
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode("utf-8")))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(key, dict):
+        raise ValueError("Invalid cursor")
+    return key
@@ -0,0 +1,268 @@
+"""Per-request DynamoDB call accounting.
+
+While a request is tracked, ``TableHandle`` sends its table and
+``meta.client`` calls through ``RequestAccount.call``. That counts and times
+them per operation and asks DynamoDB to ``ReturnConsumedCapacity``.
+``section(name)`` (or the ``timed`` decorator) attributes the calls and wall
+time of a block, e.g. the rate-limit write or ``verify_request_header``. At
+the end of the request the account becomes a ``Server-Timing`` header and one
+JSON summary line.
+
+``DB_ACCOUNTING_SAMPLE_RATE`` is the fraction of requests tracked: ``0`` (the
+default) turns accounting off and ``1`` tracks every request. Untracked
+requests only pay a context-variable lookup per table call.
+"""
+import contextvars
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, Dict, Optional
+from ..config import env
+from .logs import telemetry_logger
+
+SAMPLE_RATE = float(env("DB_ACCOUNTING_SAMPLE_RATE", "0"))
+
+# Calls that accept ReturnConsumedCapacity; reads are charged RCUs, writes WCUs.
+READ_OPERATIONS = frozenset({"get_item", "query", "scan", "batch_get_item", "transact_get_items"})
+WRITE_OPERATIONS = frozenset({"put_item", "update_item", "delete_item", "batch_write_item", "transact_write_items"})
+OPERATIONS = READ_OPERATIONS | WRITE_OPERATIONS
+
+# The summary line is telemetry: it follows TELEMETRY_LOG_LEVEL, not LOG_LEVEL.
+logger = telemetry_logger("db_accounting")
+
+_account = contextvars.ContextVar("db_account", default=None)
+_section = contextvars.ContextVar("db_section", default=None)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def _capacity_units(response: Optional[Dict]) -> float:
+    consumed = (response or {}).get("ConsumedCapacity")
+    if not consumed:
+        return 0.0
+    if isinstance(consumed, dict):
+        consumed = [consumed]
+    return float(sum(entry.get("CapacityUnits", 0) for entry in consumed))
+
+
+class RequestAccount:
+    """DynamoDB calls, time and capacity used by one request.
+
+    Calls may be recorded from several threads at once (the async mode awaits
+    independent reads together), so updates take a lock.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.ended = None
+        self.calls = Counter()
+        self.seconds = defaultdict(float)
+        self.errors = 0
+        self.read_units = 0.0
+        self.write_units = 0.0
+        # name -> [wall seconds, db calls, db seconds]
+        self.sections = {}
+        self._lock = threading.Lock()
+
+    def elapsed(self) -> float:
+        return (self.ended or time.perf_counter()) - self.started
+
+    def call(self, operation: str, method: Callable, kwargs: Dict):
+        kwargs.setdefault("ReturnConsumedCapacity", "TOTAL")
+        response, failed = None, False
+        started = time.perf_counter()
+        try:
+            response = method(**kwargs)
+            return response
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(operation, time.perf_counter() - started, response, failed)
+
+    def wrap(self, operation: str, method: Callable) -> Callable:
+        @wraps(method)
+        def accounted(**kwargs):
+            return self.call(operation, method, kwargs)
+        return accounted
+
+    def _record(self, operation: str, elapsed: float, response: Optional[Dict], failed: bool) -> None:
+        units = _capacity_units(response)
+        section = _section.get()
+        with self._lock:
+            self.calls[operation] += 1
+            self.seconds[operation] += elapsed
+            self.errors += failed
+            if operation in READ_OPERATIONS:
+                self.read_units += units
+            else:
+                self.write_units += units
+            if section is not None:
+                stats = self.sections.setdefault(section, [0.0, 0, 0.0])
+                stats[1] += 1
+                stats[2] += elapsed
+
+    def _close_section(self, name: str, elapsed: float) -> None:
+        with self._lock:
+            self.sections.setdefault(name, [0.0, 0, 0.0])[0] += elapsed
+
+    def server_timing(self) -> str:
+        """``Server-Timing`` value: database total, per operation, per section and overall."""
+        with self._lock:
+            db_seconds = sum(self.seconds.values())
+            parts = [
+                f'db;dur={_ms(db_seconds)};desc="{sum(self.calls.values())} calls, '
+                f'{self.read_units:g} RCU, {self.write_units:g} WCU"'
+            ]
+            parts.extend(
+                f'db-{operation};dur={_ms(self.seconds[operation])};desc="{count} calls"'
+                for operation, count in sorted(self.calls.items())
+            )
+            parts.extend(
+                f'{name};dur={_ms(wall)};desc="{calls} db calls, {_ms(seconds)} ms db"'
+                for name, (wall, calls, seconds) in self.sections.items()
+            )
+        parts.append(f"app;dur={_ms(self.elapsed())}")
+        return ", ".join(parts)
+
+    def summary(self, **fields) -> Dict:
+        with self._lock:
+            return {
+                **fields,
+                "duration_ms": _ms(self.elapsed()),
+                "db_ms": _ms(sum(self.seconds.values())),
+                "db_calls": sum(self.calls.values()),
+                "db_errors": self.errors,
+                "read_units": self.read_units,
+                "write_units": self.write_units,
+                "operations": {
+                    operation: {"calls": count, "ms": _ms(self.seconds[operation])}
+                    for operation, count in sorted(self.calls.items())
+                },
+                "sections": {
+                    name: {"ms": _ms(wall), "db_calls": calls, "db_ms": _ms(seconds)}
+                    for name, (wall, calls, seconds) in self.sections.items()
+                },
+            }
+
+
+class _AccountedClient:
+    def __init__(self, client, account: RequestAccount):
+        self._client = client
+        self._account = account
+
+    def __getattr__(self, attr):
+        target = getattr(self._client, attr)
+        return self._account.wrap(attr, target) if attr in OPERATIONS else target
+
+
+class _AccountedMeta:
+    def __init__(self, meta, account: RequestAccount):
+        self._meta = meta
+        self.client = _AccountedClient(meta.client, account)
+
+    def __getattr__(self, attr):
+        return getattr(self._meta, attr)
+
+
+def current() -> Optional[RequestAccount]:
+    return _account.get()
+
+
+def instrument(attr: str, target):
+    """Wrap a table attribute (an operation or ``meta``) for the tracked request, if any."""
+    account = _account.get()
+    if account is None:
+        return target
+    if attr == "meta":
+        return _AccountedMeta(target, account)
+    if attr in OPERATIONS:
+        return account.wrap(attr, target)
+    return target
+
+
+def begin(sample_rate: float = None) -> Optional[contextvars.Token]:
+    """Start tracking the current request if it is sampled; pass the token to ``finish``.
+
+    Returns ``None`` when the request is not sampled or an outer layer (e.g.
+    the async app around its Flask fallback) is already tracking it.
+    """
+    if _account.get() is not None:
+        return None
+    rate = SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return None
+    return _account.set(RequestAccount())
+
+
+def finish(token: Optional[contextvars.Token], **fields) -> Optional[RequestAccount]:
+    """Stop tracking, log the summary line and return the account."""
+    if token is None:
+        return None
+    account = _account.get()
+    _account.reset(token)
+    account.ended = time.perf_counter()
+    # Already sampled by DB_ACCOUNTING_SAMPLE_RATE.
+    logger.info("db accounting", extra={"db_accounting": account.summary(**fields), "sample": False})
+    return account
+
+
+def discard(token: Optional[contextvars.Token]) -> None:
+    """Stop tracking without reporting (the request failed before a response)."""
+    if token is not None:
+        _account.reset(token)
+
+
+@contextmanager
+def section(name: str):
+    """Attribute the DynamoDB calls and wall time of the block to ``name``."""
+    account = _account.get()
+    if account is None:
+        yield
+        return
+    token = _section.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _section.reset(token)
+        account._close_section(name, time.perf_counter() - started)
+
+
+def timed(name: str):
+    """Decorator form of ``section``."""
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _account.get() is None:
+                return fn(*args, **kwargs)
+            with section(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def init_app(app) -> None:
+    """Track sampled Flask requests and add their ``Server-Timing`` header."""
+    from flask import g, request
+
+    @app.before_request
+    def _begin_accounting():
+        g.db_account = begin()
+
+    @app.after_request
+    def _finish_accounting(response):
+        account = finish(g.pop("db_account", None), method=request.method,
+                         path=request.path, status=response.status_code)
+        if account is not None:
+            response.headers.add("Server-Timing", account.server_timing())
+        return response
+
+    @app.teardown_request
+    def _discard_accounting(exc):
+        discard(g.pop("db_account", None))
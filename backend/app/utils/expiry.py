@@ -0,0 +1,74 @@
+"""Epoch expiry for transient items.
+
+Active Phase 1 challenges and their ``ACTIVE#PHASE1`` pointer, mazes and the
+rate-limit item carry ``expires_at`` in epoch seconds. That is the
+table's TTL attribute (``terraform/dynamodb.tf``). DynamoDB deletes expired
+items only eventually, often days late, so readers treat an item past its
+``expires_at`` as gone themselves. On the hot path that is one integer
+comparison, with no datetime parsing.
+
+Completing a run makes it history: ``retain`` drops its ``expires_at``, or
+moves it ``RUN_RETENTION_DAYS`` ahead when that is set. Items written
+before TTL have no ``expires_at``; ``legacy_expires_at`` derives one from
+their old fields. It is used for checks on those items and by
+``jobs.sweep_expired``, which stamps or deletes them where native TTL is
+not available.
+"""
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from ..config import env
+from ..database.repository import Update
+
+TTL_ATTRIBUTE = "expires_at"
+MAZE_TTL_SECONDS = int(float(env("MAZE_TTL_HOURS", "24")) * 3600)
+# 0 keeps completed runs forever (the aggregation job recomputes from them).
+RUN_RETENTION_DAYS = int(env("RUN_RETENTION_DAYS", "0"))
+RATE_LIMIT_SK = "RATELIMIT#API"
+
+
+def expires_in(seconds: int, now: Optional[float] = None) -> int:
+    return int(time.time() if now is None else now) + int(seconds)
+
+
+def legacy_expires_at(item: Dict) -> Optional[int]:
+    """Expiry of an item written before ``expires_at`` existed (None: it never expires)"""
+    sk = item.get("sk", "")
+    if sk == RATE_LIMIT_SK:
+        # Over one window after it opened, or after the last request of the
+        # older timestamp-list format, which has no window_start
+        if item.get("window_start") is not None:
+            opened = int(item["window_start"])
+        elif item.get("updated_at"):
+            opened = int(datetime.fromisoformat(item["updated_at"]).timestamp())
+        else:
+            return None
+        return opened + int(item.get("window_seconds", 60))
+    if item.get("status") != "active":
+        return None
+    if item.get("expiry_time"):
+        return int(datetime.fromisoformat(item["expiry_time"]).timestamp())
+    if sk.startswith("MAZE#") and item.get("created_at"):
+        return int(datetime.fromisoformat(item["created_at"]).timestamp()) + MAZE_TTL_SECONDS
+    return None
+
+
+def is_expired(item: Dict, now: Optional[float] = None) -> bool:
+    expires_at = item.get(TTL_ATTRIBUTE)
+    if expires_at is None:
+        expires_at = legacy_expires_at(item)
+        if expires_at is None:
+            return False
+    return int(expires_at) <= (time.time() if now is None else now)
+
+
+def expect_live(update: Update, now: Optional[float] = None) -> Update:
+    """Require the item not to have expired (items without ``expires_at`` pass)"""
+    return update.expect_above(TTL_ATTRIBUTE, int(time.time() if now is None else now))
+
+
+def retain(update: Update, now: Optional[float] = None) -> Update:
+    """Keep a finished run as history instead of letting it expire"""
+    if RUN_RETENTION_DAYS:
+        return update.set(TTL_ATTRIBUTE, expires_in(RUN_RETENTION_DAYS * 86400, now))
+    return update.remove(TTL_ATTRIBUTE)
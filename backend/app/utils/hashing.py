@@ -0,0 +1,114 @@
+import os
+from ..config import env
+from .metrics import registry
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+BCRYPT_ROUNDS = int(env("BCRYPT_ROUNDS", "12"))
+
+
+class HasherBusy(Exception):
+    """The pool is full or the hash did not finish in time (a 503, not a wrong password)."""
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small, bounded worker pool.
+
+    bcrypt releases the GIL, so a few threads are enough to use the CPU while
+    capping how many request threads can be tied up hashing at once. Work
+    beyond ``max_queue`` is rejected instead of piling up behind the pool.
+    A slot is held until its hash actually finishes, so a caller that gives
+    up after ``timeout`` does not let more work in than the bound allows.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue: int = None, rounds: int = None):
+        self.max_workers = max_workers or int(env("BCRYPT_WORKERS", str(os.cpu_count() or 2)))
+        self.max_queue = max_queue or int(env("BCRYPT_MAX_QUEUE", "64"))
+        self.rounds = rounds or BCRYPT_ROUNDS
+        self.timeout = float(env("BCRYPT_TIMEOUT_SECONDS", "10"))
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._pending = 0
+        self._running = 0
+        self._stats = {"completed": 0, "rejected": 0, "timed_out": 0, "max_depth": 0}
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="bcrypt"
+                    )
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise HasherBusy("Server is busy. Please try again shortly.")
+
+        with self._lock:
+            self._pending += 1
+            self._stats["max_depth"] = max(self._stats["max_depth"], self._pending)
+
+        def task():
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._stats["completed"] += 1
+                self._slots.release()
+
+        try:
+            future = self._pool().submit(task)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            self._slots.release()
+            raise
+
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self._stats["timed_out"] += 1
+            raise HasherBusy("Server is busy. Please try again shortly.")
+
+    def hash(self, password: str, rounds: int = None) -> str:
+        import bcrypt  # deferred: only register/login pay for loading it
+
+        salt = bcrypt.gensalt(rounds or self.rounds)
+        hashed = self._run(bcrypt.hashpw, password.encode("utf-8"), salt)
+        return hashed.decode("utf-8")
+
+    def verify(self, password: str, hashed: str) -> bool:
+        import bcrypt
+
+        return self._run(bcrypt.checkpw, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError, AttributeError):
+            return True
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "in_flight": self._pending,
+                "running": self._running,
+                "queue_depth": max(0, self._pending - self._running),
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "rounds": self.rounds,
+            }
+
+
+password_hasher = PasswordHasher()
+registry.add_collector("password_hasher", password_hasher.stats)
@@ -0,0 +1,231 @@
+"""Structured JSON logging, written off the request thread.
+
+``configure_logging()`` (called once by ``create_app``) replaces the root
+handlers with a ``QueueHandler``. Request threads only copy the record,
+render its message (and traceback, if any) and enqueue it. A
+``QueueListener`` thread formats each record as one JSON object per line and
+writes it to stdout. If the queue is full, records are dropped and counted
+rather than blocking a request.
+
+Every line carries the current request ID. Use ``bind_request_id`` for the
+bound ID; the Flask hooks take it from ``X-Request-ID``, the Lambda request
+ID or a fresh UUID, and echo it back. Fields passed through ``extra`` become
+top-level JSON keys.
+
+Settings:
+
+- ``LOG_LEVEL``: root level, ``INFO`` by default.
+- ``TELEMETRY_LOG_LEVEL``: level of the ``telemetry`` logger that carries
+  EMF metrics, DB accounting and startup profiles, ``INFO`` by default. It
+  is independent of ``LOG_LEVEL``, so quieting the application logs keeps
+  the metrics.
+- ``LOG_SAMPLE_RATES``: fraction of records kept per level, e.g.
+  ``DEBUG=0.01,INFO=0.25``; levels not listed keep everything. Sampling is
+  per request ID, so a sampled request keeps all its lines at that level.
+- ``LOG_QUEUE_SIZE``: queue bound.
+
+Records logged with ``extra={"sample": False}`` (metrics, profiles) are never
+sampled out.
+
+Lambda freezes the process between invocations, so the handler calls
+``flush()`` with a short timeout before returning. Lines still queued at the
+deadline are written once the process is thawed.
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+from ..config import env
+
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through ``extra``.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sample"}
+
+TELEMETRY_LOGGER = "telemetry"
+
+_listener = None
+_queue = None
+_lock = threading.Lock()
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+def bind_request_id(request_id: Optional[str] = None) -> contextvars.Token:
+    """Make ``request_id`` (a new one if empty) current; reset with the returned token."""
+    return _request_id.set(request_id or uuid.uuid4().hex)
+
+
+def reset_request_id(token: contextvars.Token) -> None:
+    _request_id.reset(token)
+
+
+def telemetry_logger(name: str) -> logging.Logger:
+    """Logger for machine-read records, leveled by ``TELEMETRY_LOG_LEVEL``"""
+    return logging.getLogger(f"{TELEMETRY_LOGGER}.{name}")
+
+
+def parse_sample_rates(spec: Optional[str]) -> Dict[int, float]:
+    rates = {}
+    for part in (spec or "").split(","):
+        if "=" not in part:
+            continue
+        level, rate = part.split("=", 1)
+        number = logging.getLevelName(level.strip().upper())
+        if isinstance(number, int):
+            rates[number] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+class LevelSampler(logging.Filter):
+    """Keep a fraction of the records at each configured level."""
+
+    def __init__(self, rates: Dict[int, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno)
+        if rate is None or rate >= 1 or not getattr(record, "sample", True):
+            return True
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            return zlib.crc32(request_id.encode("utf-8")) / 0xFFFFFFFF < rate
+        return random.random() < rate
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and key != "request_id":
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _NonBlockingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render what depends on the caller's state now; JSON formatting
+        # happens on the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging() -> None:
+    """Install the queue-backed JSON pipeline on the root logger (once per process)."""
+    global _listener, _queue
+    with _lock:
+        if _listener is not None:
+            return
+        _queue = queue.Queue(maxsize=int(env("LOG_QUEUE_SIZE", "10000")))
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter())
+
+        handler = _NonBlockingQueueHandler(_queue)
+        handler.addFilter(RequestIdFilter())
+        handler.addFilter(LevelSampler(parse_sample_rates(env("LOG_SAMPLE_RATES"))))
+
+        root = logging.getLogger()
+        root.handlers = [handler]
+        root.setLevel(env("LOG_LEVEL", "INFO").upper())
+        # Records propagate to the root handler whatever the root level is.
+        logging.getLogger(TELEMETRY_LOGGER).setLevel(env("TELEMETRY_LOG_LEVEL", "INFO").upper())
+
+        _listener = QueueListener(_queue, output, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """Wait until every queued record has been written, at most ``timeout`` seconds.
+
+    Returns False if records were still queued when the time ran out.
+    """
+    if _queue is None:
+        return True
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _queue.all_tasks_done:
+        while _queue.unfinished_tasks:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            _queue.all_tasks_done.wait(remaining)
+    return True
+
+
+def dropped() -> int:
+    """Records dropped because the queue was full."""
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, _NonBlockingQueueHandler):
+            return handler.dropped
+    return 0
+
+
+def init_app(app) -> None:
+    """Bind a request ID for each Flask request and echo it as ``X-Request-ID``."""
+    from flask import g, request
+
+    @app.before_request
+    def _bind_request_id():
+        context = request.environ.get("serverless.context")
+        g.request_id_token = bind_request_id(
+            request.headers.get("X-Request-ID")
+            or _request_id.get()
+            or getattr(context, "aws_request_id", None)
+        )
+
+    @app.after_request
+    def _echo_request_id(response):
+        response.headers.setdefault("X-Request-ID", _request_id.get())
+        return response
+
+    @app.teardown_request
+    def _reset_request_id(exc):
+        token = g.pop("request_id_token", None)
+        if token is not None:
+            reset_request_id(token)
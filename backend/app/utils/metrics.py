@@ -0,0 +1,293 @@
+"""In-process request metrics per blueprint route.
+
+For every route (blueprint, URL rule, method) we keep a latency histogram,
+counts per status code and the number of requests in flight. They are
+exported in Prometheus text format (``GET /metrics``) and, on Lambda, as
+CloudWatch Embedded Metric Format log lines.
+
+Recording is lock-free: each thread writes only to its own shard of series,
+and the exporter merges the shards when it runs. A thread takes the registry
+lock once, when it records its first request. Reads may race with in-progress
+writes and be off by a request or two, which is fine for monitoring. Shards
+of threads that have exited are folded into one retired shard on export, so
+thread-per-request servers do not grow the shard list.
+
+Components with their own counters (caches, pools, the DynamoDB layer)
+register a collector; its numbers are exported as ``<component>_<stat>``
+gauges next to the route metrics.
+"""
+import bisect
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from ..config import env, env_flag
+from .logs import telemetry_logger
+
+logger = logging.getLogger(__name__)
+emf_logger = telemetry_logger("metrics")
+
+# Prometheus-style upper bounds, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+EMF_ENABLED = env_flag("METRICS_EMF")
+EMF_NAMESPACE = env("METRICS_EMF_NAMESPACE", "BinaryTrail")
+EMF_INTERVAL_SECONDS = float(env("METRICS_EMF_INTERVAL_SECONDS", "60"))
+
+# (blueprint, route rule, method)
+Labels = Tuple[str, str, str]
+UNMATCHED = "unmatched"
+
+
+class _Series:
+    __slots__ = ("buckets", "total", "count", "max", "statuses", "in_flight")
+
+    def __init__(self, size: int):
+        self.buckets = [0] * size
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+        self.statuses = {}
+        self.in_flight = 0
+
+    def merge(self, other: "_Series") -> None:
+        for index, count in enumerate(other.buckets):
+            self.buckets[index] += count
+        self.total += other.total
+        self.count += other.count
+        self.max = max(self.max, other.max)
+        for status, count in list(other.statuses.items()):
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.in_flight += other.in_flight
+
+
+class Metrics:
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._emitted = {}
+        self._last_emit = time.monotonic()
+
+    def _series(self, labels: Labels) -> _Series:
+        shard = self._local.__dict__.get("shard")
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append((threading.current_thread(), shard))
+        series = shard.get(labels)
+        if series is None:
+            series = shard[labels] = _Series(len(self.buckets) + 1)
+        return series
+
+    def start(self, labels: Labels) -> float:
+        """Mark a request in flight; pass the returned start time to ``observe``."""
+        self._series(labels).in_flight += 1
+        return time.perf_counter()
+
+    def observe(self, labels: Labels, status: int, started: float) -> None:
+        seconds = time.perf_counter() - started
+        series = self._series(labels)
+        series.in_flight -= 1
+        series.buckets[bisect.bisect_left(self.buckets, seconds)] += 1
+        series.total += seconds
+        series.count += 1
+        if seconds > series.max:
+            series.max = seconds
+        series.statuses[status] = series.statuses.get(status, 0) + 1
+
+    def abandon(self, labels: Labels) -> None:
+        """Undo ``start`` for a request handed to another layer that records it itself."""
+        self._series(labels).in_flight -= 1
+
+    def _fold(self, into: Dict[Labels, _Series], shard: Dict[Labels, _Series]) -> None:
+        for labels, series in list(shard.items()):
+            if labels not in into:
+                into[labels] = _Series(len(self.buckets) + 1)
+            into[labels].merge(series)
+
+    def snapshot(self) -> Dict[Labels, _Series]:
+        merged = {}
+        with self._lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    self._fold(self._retired, shard)
+            self._shards = live
+            self._fold(merged, self._retired)
+        for _, shard in live:
+            self._fold(merged, shard)
+        return merged
+
+    def add_collector(self, component: str, collect: Callable[[], Dict], label: Optional[str] = None) -> None:
+        """Export the numbers in ``collect()`` as ``<component>_<stat>`` gauges.
+
+        With ``label``, ``collect`` returns one stats dict per label value
+        (e.g. per challenge pool) and each becomes its own series.
+        """
+        with self._lock:
+            self._collectors.append((component, collect, label))
+
+    def _collector_lines(self) -> List[str]:
+        with self._lock:
+            collectors = list(self._collectors)
+        lines = []
+        for component, collect, label in collectors:
+            try:
+                stats = collect()
+            except Exception:
+                logger.exception("Metrics collector %s failed", component)
+                continue
+            groups = stats.items() if label else [(None, stats)]
+            samples = {}
+            for label_value, group in groups:
+                labels = f'{{{label}="{_escape(str(label_value))}"}}' if label else ""
+                for stat, value in group.items():
+                    if isinstance(value, (int, float)):
+                        samples.setdefault(stat, []).append(f"{labels} {float(value)!r}")
+            for stat, values in sorted(samples.items()):
+                name = f"{component}_{stat}"
+                lines.append(f"# TYPE {name} gauge")
+                lines += [name + value for value in values]
+        return lines
+
+    def prometheus(self) -> str:
+        """The registry in Prometheus text exposition format (0.0.4)."""
+        snapshot = sorted(self.snapshot().items())
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for labels, series in snapshot:
+            base = _label_text(labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series.buckets):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'http_request_duration_seconds_bucket{{{base},le="{le}"}} {cumulative}')
+            lines.append(f"http_request_duration_seconds_sum{{{base}}} {series.total!r}")
+            lines.append(f"http_request_duration_seconds_count{{{base}}} {series.count}")
+
+        lines += ["# HELP http_requests_total Responses by route and status code.",
+                  "# TYPE http_requests_total counter"]
+        for labels, series in snapshot:
+            base = _label_text(labels)
+            for status, count in sorted(series.statuses.items()):
+                lines.append(f'http_requests_total{{{base},status="{status}"}} {count}')
+
+        lines += ["# HELP http_requests_in_flight Requests currently being handled.",
+                  "# TYPE http_requests_in_flight gauge"]
+        for labels, series in snapshot:
+            lines.append(f"http_requests_in_flight{{{_label_text(labels)}}} {series.in_flight}")
+        lines += self._collector_lines()
+        return "\n".join(lines) + "\n"
+
+    def emf_documents(self) -> List[Dict]:
+        """EMF documents for the traffic since the previous call, one per route."""
+        snapshot = self.snapshot()
+        previous, self._emitted = self._emitted, snapshot
+        timestamp = int(time.time() * 1000)
+        bounds_ms = [bound * 1000 for bound in self.buckets]
+
+        documents = []
+        for (blueprint, route, method), series in sorted(snapshot.items()):
+            before = previous.get((blueprint, route, method))
+            counts = [now - (before.buckets[i] if before else 0) for i, now in enumerate(series.buckets)]
+            requests = sum(counts)
+            if not requests:
+                continue
+            statuses = {
+                status: count - (before.statuses.get(status, 0) if before else 0)
+                for status, count in series.statuses.items()
+            }
+            values = bounds_ms + [max(series.max * 1000, bounds_ms[-1])]
+            documents.append({
+                "_aws": {
+                    "Timestamp": timestamp,
+                    "CloudWatchMetrics": [{
+                        "Namespace": EMF_NAMESPACE,
+                        "Dimensions": [["Blueprint", "Route"]],
+                        "Metrics": [
+                            {"Name": "Latency", "Unit": "Milliseconds"},
+                            {"Name": "Requests", "Unit": "Count"},
+                            {"Name": "ClientErrors", "Unit": "Count"},
+                            {"Name": "ServerErrors", "Unit": "Count"},
+                            {"Name": "InFlight", "Unit": "Count"},
+                        ],
+                    }],
+                },
+                "Blueprint": blueprint or UNMATCHED,
+                "Route": f"{method} {route}",
+                "Latency": {
+                    "Values": [value for value, count in zip(values, counts) if count],
+                    "Counts": [count for count in counts if count],
+                },
+                "Requests": requests,
+                "ClientErrors": sum(count for status, count in statuses.items() if 400 <= status < 500),
+                "ServerErrors": sum(count for status, count in statuses.items() if status >= 500),
+                "InFlight": series.in_flight,
+            })
+        return documents
+
+    def maybe_emit_emf(self) -> None:
+        """Log EMF lines if enabled and ``METRICS_EMF_INTERVAL_SECONDS`` have passed."""
+        if not EMF_ENABLED or time.monotonic() - self._last_emit < EMF_INTERVAL_SECONDS:
+            return
+        self._last_emit = time.monotonic()
+        for document in self.emf_documents():
+            # The EMF keys (``_aws`` and the metric values) must be top-level.
+            emf_logger.info("route metrics", extra={**document, "sample": False})
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels: Labels) -> str:
+    blueprint, route, method = labels
+    return f'blueprint="{_escape(blueprint)}",route="{_escape(route)}",method="{_escape(method)}"'
+
+
+def route_labels(app, method: str, path: str) -> Labels:
+    """Labels for a request the app did not route itself (fast path, async mode)."""
+    from werkzeug.exceptions import HTTPException
+
+    try:
+        rule, _ = app.url_map.bind("localhost").match(path, method, return_rule=True)
+    except HTTPException:
+        return "", UNMATCHED, method
+    blueprint = rule.endpoint.rpartition(".")[0]
+    return blueprint, rule.rule, method
+
+
+def init_app(app) -> None:
+    """Record every Flask request under its blueprint and URL rule."""
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_metrics():
+        rule = request.url_rule.rule if request.url_rule is not None else UNMATCHED
+        g.metrics_labels = (request.blueprint or "", rule, request.method)
+        g.metrics_started = registry.start(g.metrics_labels)
+
+    @app.after_request
+    def _observe_request_metrics(response):
+        labels = g.pop("metrics_labels", None)
+        if labels is not None:
+            registry.observe(labels, response.status_code, g.metrics_started)
+        return response
+
+    @app.teardown_request
+    def _close_request_metrics(exc):
+        # Unhandled exceptions skip after_request.
+        labels = g.pop("metrics_labels", None)
+        if labels is not None:
+            registry.observe(labels, 500, g.metrics_started)
+
+
+registry = Metrics()
@@ -1,112 +1,121 @@
 from functools import wraps
-from flask import request, jsonify
-from datetime import datetime, timezone, timedelta
-import os
-from ..database.db_config import Database
+from flask import request, jsonify, make_response
+from datetime import datetime, timezone
+from ..config import env
+from ..database.db_config import Database, client_error
+from ..database.repository import ConditionFailed, Repository, Update
+from .db_accounting import timed
+from .expiry import RATE_LIMIT_SK, TTL_ATTRIBUTE
+import logging
 import time
 from typing import Optional
 
-class RateLimitExceeded(Exception):
-    pass
+logger = logging.getLogger(__name__)
+
+# Per-user budget for the throttled game endpoints (Phase 1 steps, Phase 2 solves).
+API_RATE_LIMIT = {
+    'max_requests': int(env("API_RATE_LIMIT_MAX_REQUESTS", "5")),
+    'window_seconds': int(env("API_RATE_LIMIT_WINDOW_SECONDS", "60"))
+}
 
 class RateLimit:
+    """Fixed-window request counter decided and recorded in one conditional write.
+
+    Each user has one ``RATELIMIT#API`` item holding the current window's
+    ``window_start`` and ``request_count``. Within a window the update either
+    increments the counter below ``max_requests`` or fails its condition, so
+    concurrent requests from one user can never overshoot. The first request
+    of a new window resets the counter, conditional on the stored window
+    being older.
+    """
+
     def __init__(self, max_requests: int = 5, window_seconds: int = 60):
         self.db = Database()
-        self.table = self.db.connect().Table(os.getenv("DYNAMODB_TABLE_NAME"))
+        self.table = self.db.get_table(env("DYNAMODB_TABLE_NAME"))
+        self.repo = Repository(self.table)
         self.max_requests = max_requests
         self.window_seconds = window_seconds
 
+    def _window_start(self, now: Optional[float] = None) -> int:
+        now = time.time() if now is None else now
+        return int(now) - int(now) % self.window_seconds
+
     def _get_rate_limit_key(self, user_email: str) -> dict:
         return {
             "pk": f"USER#{user_email}",
-            "sk": f"RATELIMIT#API"
+            "sk": RATE_LIMIT_SK
         }
 
-    def _clean_old_requests(self, requests: list) -> list:
-        cutoff_time = datetime.now(timezone.utc) - timedelta(seconds=self.window_seconds)
-        return [req for req in requests if datetime.fromisoformat(req) > cutoff_time]
+    def _result(self, allowed: bool, count: int, window_start: int) -> dict:
+        reset = datetime.fromtimestamp(window_start + self.window_seconds, timezone.utc)
+        return {
+            'allowed': allowed,
+            'limit': self.max_requests,
+            'remaining': max(0, self.max_requests - count),
+            'reset': reset.isoformat()
+        }
 
-    def check_rate_limit(self, user_email: str) -> bool:
+    @timed("rate_limit")
+    def hit(self, user_email: str) -> dict:
+        """Record one request and return whether it is allowed plus remaining/reset."""
+        now = time.time()
+        window_start = self._window_start(now)
+        key = self._get_rate_limit_key(user_email)
+        stamp = datetime.fromtimestamp(now, timezone.utc).isoformat()
         try:
-            # Get current rate limit record
-            response = self.table.get_item(
-                Key=self._get_rate_limit_key(user_email)
-            )
-
-            current_time = datetime.now(timezone.utc)
-            
-            if 'Item' in response:
-                # Clean and check existing requests
-                requests = self._clean_old_requests(response['Item'].get('requests', []))
-                
-                if len(requests) >= self.max_requests:
-                    return False
-                
-                # Add new request timestamp
-                requests.append(current_time.isoformat())
-                
-                # Update rate limit record
-                self.table.update_item(
-                    Key=self._get_rate_limit_key(user_email),
-                    UpdateExpression="SET requests = :r, updated_at = :u",
-                    ExpressionAttributeValues={
-                        ':r': requests,
-                        ':u': current_time.isoformat()
-                    }
-                )
-            else:
-                # Create new rate limit record
-                self.table.put_item(
-                    Item={
-                        **self._get_rate_limit_key(user_email),
-                        'requests': [current_time.isoformat()],
-                        'created_at': current_time.isoformat(),
-                        'updated_at': current_time.isoformat()
-                    }
-                )
-            
-            return True
-
-        except Exception as e:
-            # Log the error in production
-            print(f"Rate limit check error: {str(e)}")
-            # On error, allow the request to proceed
-            return True
-
-    def get_remaining_requests(self, user_email: str) -> dict:
-        """Get remaining requests and reset time for the user"""
-        try:
-            response = self.table.get_item(
-                Key=self._get_rate_limit_key(user_email)
-            )
-            
-            if 'Item' in response:
-                requests = self._clean_old_requests(response['Item'].get('requests', []))
-                remaining = max(0, self.max_requests - len(requests))
-                
-                if requests:
-                    oldest_request = datetime.fromisoformat(requests[0])
-                    reset_time = oldest_request + timedelta(seconds=self.window_seconds)
-                else:
-                    reset_time = datetime.now(timezone.utc)
-                
-                return {
-                    'remaining': remaining,
-                    'reset': reset_time.isoformat()
-                }
-            
-            return {
-                'remaining': self.max_requests,
-                'reset': datetime.now(timezone.utc).isoformat()
-            }
-
-        except Exception as e:
-            # Log the error in production
-            print(f"Get remaining requests error: {str(e)}")
-            return {
-                'remaining': self.max_requests,
-                'reset': datetime.now(timezone.utc).isoformat()
-            }
+            # Two rounds cover a concurrent request opening the window first.
+            for _ in range(2):
+                try:
+                    attributes = self.repo.update(
+                        key,
+                        Update().add('request_count', 1).set('updated_at', stamp)
+                            .expect('window_start', window_start)
+                            .expect_below('request_count', self.max_requests),
+                        return_values="UPDATED_NEW",
+                        return_old_on_failure=True
+                    )
+                    return self._result(True, int(attributes['request_count']), window_start)
+                except ConditionFailed as e:
+                    if e.item and int(e.item.get('window_start', 0)) >= window_start:
+                        return self._result(False, self.max_requests, window_start)
+
+                # No item yet, or it holds an earlier window: start this one.
+                # expires_at (epoch) lets TTL delete the item once it is over;
+                # 'requests' is the timestamp list of the old per-user format.
+                try:
+                    self.repo.update(
+                        key,
+                        Update().set('request_count', 1).set('window_start', window_start)
+                            .set('window_seconds', self.window_seconds).set('updated_at', stamp)
+                            .set(TTL_ATTRIBUTE, window_start + self.window_seconds)
+                            .remove('requests')
+                            .expect_below('window_start', window_start),
+                        return_values="NONE"
+                    )
+                    return self._result(True, 1, window_start)
+                except ConditionFailed:
+                    continue
+            logger.warning("Rate limit window for %s kept changing", user_email)
+        except client_error() as e:
+            logger.warning("Rate limit check error: %s", e)
+        except Exception:
+            logger.exception("Rate limit check error")
+
+        # On error, allow the request to proceed
+        return self._result(True, 0, window_start)
+
+
+def rate_limit_headers(result: dict) -> dict:
+    return {
+        'X-RateLimit-Limit': str(result['limit']),
+        'X-RateLimit-Remaining': str(result['remaining']),
+        'X-RateLimit-Reset': result['reset']
+    }
+
+
+def _apply_headers(response, result: dict):
+    response.headers.update(rate_limit_headers(result))
+    return response
 
 
 def rate_limit(max_requests: int = 5, window_seconds: int = 60):
@@ -115,23 +124,18 @@ def rate_limit(max_requests: int = 5, window_seconds: int = 60):
         def decorated_function(*args, **kwargs):
             if not request.user or not hasattr(request.user, 'email'):
                 return jsonify({'error': 'Unauthorized'}), 401
-                
+
             rate_limiter = RateLimit(max_requests, window_seconds)
-            user_email = request.user.email
-            
-            if not rate_limiter.check_rate_limit(user_email):
-                remaining = rate_limiter.get_remaining_requests(user_email)
-                
+            result = rate_limiter.hit(request.user.email)
+
+            if not result['allowed']:
                 response = jsonify({
                     'error': 'Rate limit exceeded',
-                    'remaining_requests': remaining['remaining'],
-                    'reset_time': remaining['reset']
+                    'remaining_requests': result['remaining'],
+                    'reset_time': result['reset']
                 })
-                
-                response.headers['X-RateLimit-Remaining'] = str(remaining['remaining'])
-                response.headers['X-RateLimit-Reset'] = remaining['reset']
-                return response, 429
-            
-            return f(*args, **kwargs)
+                return _apply_headers(response, result), 429
+
+            return _apply_headers(make_response(f(*args, **kwargs)), result)
         return decorated_function
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,52 @@
+"""Cold-start profiling of init phases.
+
+``profiler.phase(name)`` times a block of startup or first-use work (app
+creation, first DynamoDB connection, controller construction). For the
+import-time side see ``benchmarks/cold_start.py``.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# Taken as early as the app package can observe; imports before this are
+# covered by the import-time report instead.
+PROCESS_START = time.perf_counter()
+
+
+class StartupProfiler:
+    def __init__(self):
+        self._phases = []
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str, once: bool = False):
+        """Time the enclosed block; with ``once`` only the first run is kept."""
+        if once and name in self._seen:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                if not (once and name in self._seen):
+                    self._seen.add(name)
+                    self._phases.append({
+                        "phase": name,
+                        "ms": round(elapsed * 1000, 3),
+                        "at_ms": round((started - PROCESS_START) * 1000, 3),
+                    })
+
+    def report(self) -> Dict:
+        with self._lock:
+            phases = list(self._phases)
+        return {
+            "since_start_ms": round((time.perf_counter() - PROCESS_START) * 1000, 3),
+            "phases": phases,
+        }
+
+
+profiler = StartupProfiler()
@@ -0,0 +1,7 @@
+from app import create_app
+from app.asgi import AsyncApp
+
+# Async serving mode, e.g. `uvicorn asgi:app`. Routes without an async
+# handler are served by the Flask app underneath.
+app = AsyncApp(create_app())
+application = app
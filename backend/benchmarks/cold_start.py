@@ -0,0 +1,56 @@
+"""Import-time report for the Lambda entry point.
+
+Imports the module in a fresh interpreter with ``-X importtime`` and lists
+the heaviest imports, so cold-start regressions show up in review:
+
+    python -m benchmarks.cold_start [--module lambda_function] [--top 20] [--json]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List
+
+
+def import_time_report(module: str = "lambda_function", top: int = 20) -> List[Dict]:
+    """Import ``module`` in a fresh interpreter with -X importtime; heaviest first."""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [os.getcwd(), os.getenv("PYTHONPATH")])))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "import failed")
+
+    rows = []
+    pattern = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+    for line in result.stderr.splitlines():
+        match = pattern.match(line)
+        if match:
+            rows.append({
+                "module": match.group(4),
+                "self_ms": int(match.group(1)) / 1000,
+                "cumulative_ms": int(match.group(2)) / 1000,
+                "depth": len(match.group(3)) // 2,
+            })
+    total = sum(row["cumulative_ms"] for row in rows if row["depth"] == 0)
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return [{"total_ms": round(total, 3)}] + rows[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report import-time cost of the app entry point")
+    parser.add_argument("--module", default="lambda_function")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    summary, *rows = import_time_report(args.module, args.top)
+    if args.json:
+        print(json.dumps({"module": args.module, **summary, "imports": rows}, indent=2))
+    else:
+        print(f"import {args.module}: {summary['total_ms']:.1f} ms total")
+        for row in rows:
+            print(f"{row['cumulative_ms']:>9.1f} ms {row['self_ms']:>8.1f} ms  {'  ' * row['depth']}{row['module']}")
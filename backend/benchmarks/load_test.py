@@ -0,0 +1,323 @@
+"""Load test: full player journeys through the Flask app.
+
+Each virtual player registers, logs in, plays Phase 1 (begin, the three
+header steps, complete) and then Phase 2 (begin, solve every stage) through
+the Flask test client. Routing, auth, rate limiting and the controllers all
+run exactly as they do when deployed. By default the app runs on the
+in-process DynamoDB stand-in (``DYNAMODB_BACKEND=memory``); ``--endpoint``
+points it at a DynamoDB Local instead:
+
+    python -m benchmarks.load_test --players 200 --concurrency 8 \\
+        [--endpoint http://localhost:8000] --output results/run.json \\
+        [--compare results/previous.json]
+
+The report covers throughput, p50/p95/p99 latency per endpoint and DynamoDB
+calls per request. Written as JSON, it lets runs be diffed with ``--compare``.
+The Phase 1 step cooldown and the per-user API budget are lifted, and bcrypt
+uses cheap rounds, so the numbers reflect request handling, not sleeping.
+"""
+import argparse
+import base64
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+def configure(args) -> None:
+    """Environment for the app under test; must run before ``app`` is imported."""
+    if args.endpoint:
+        os.environ["DYNAMODB_BACKEND"] = "dynamodb"
+        os.environ["DYNAMODB_ENDPOINT"] = args.endpoint
+    else:
+        os.environ["DYNAMODB_BACKEND"] = "memory"
+    os.environ["DYNAMODB_TABLE_NAME"] = args.table
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    os.environ["PHASE1_STEP_COOLDOWN_SECONDS"] = "0"
+    os.environ["API_RATE_LIMIT_MAX_REQUESTS"] = str(10 ** 9)
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+    os.environ.setdefault("JWT_SECRET", "load-test")
+
+
+class CallCounter:
+    """Counts DynamoDB API calls made by the current thread, by operation."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def install(self) -> None:
+        from app.database.db_config import Database
+
+        if Database().backend == "memory":
+            from app.database.memory import shared
+            shared().add_listener(self._count)
+            return
+
+        import boto3
+        # Handlers registered on the shared session are copied into every
+        # client the app creates from it.
+        if Database._session is None:
+            Database._session = boto3.session.Session()
+        Database._session.events.register("before-call.dynamodb", self._count_call)
+
+    def _count_call(self, model, **kwargs) -> None:
+        self._count(model.name)
+
+    def _count(self, operation: str) -> None:
+        calls = getattr(self._local, "calls", None)
+        if calls is not None:
+            calls[operation] += 1
+
+    def start(self) -> None:
+        self._local.calls = Counter()
+
+    def stop(self) -> Counter:
+        calls, self._local.calls = self._local.calls, None
+        return calls
+
+
+def ensure_table(name: str) -> None:
+    """Create the single table (same keys, indexes and TTL as terraform) if it is missing."""
+    from app.database.db_config import Database
+
+    client = Database().connect().meta.client
+    if name in client.list_tables()["TableNames"]:
+        return
+
+    def index(index_name: str, key: str) -> Dict:
+        return {
+            "IndexName": index_name,
+            "KeySchema": [{"AttributeName": key, "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+            "Projection": {"ProjectionType": "ALL"},
+        }
+
+    client.create_table(
+        TableName=name,
+        BillingMode="PAY_PER_REQUEST",
+        AttributeDefinitions=[
+            {"AttributeName": attr, "AttributeType": "S"}
+            for attr in ("pk", "sk", "category_key", "difficulty_key")
+        ],
+        KeySchema=[{"AttributeName": "pk", "KeyType": "HASH"}, {"AttributeName": "sk", "KeyType": "RANGE"}],
+        GlobalSecondaryIndexes=[index("category-index", "category_key"), index("difficulty-index", "difficulty_key")],
+    )
+    client.get_waiter("table_exists").wait(TableName=name)
+    client.update_time_to_live(
+        TableName=name, TimeToLiveSpecification={"Enabled": True, "AttributeName": "expires_at"}
+    )
+
+
+class JourneyFailed(Exception):
+    pass
+
+
+class Player:
+    """One virtual player walking register -> login -> Phase 1 -> Phase 2."""
+
+    def __init__(self, client, counter: CallCounter, email: str):
+        self.client = client
+        self.counter = counter
+        self.email = email
+        self.samples = []
+
+    def request(self, endpoint: str, method: str, path: str, token: str = None,
+                json_body: dict = None, headers: dict = None) -> dict:
+        headers = dict(headers or {})
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        self.counter.start()
+        started = time.perf_counter()
+        response = self.client.open(path, method=method, json=json_body, headers=headers)
+        elapsed = time.perf_counter() - started
+        calls = self.counter.stop()
+        self.samples.append({
+            "endpoint": endpoint,
+            "status": response.status_code,
+            "seconds": elapsed,
+            "db_calls": dict(calls),
+        })
+        if response.status_code >= 400:
+            raise JourneyFailed(f"{endpoint} -> {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response.get_json()
+
+    def play(self) -> None:
+        from app.utils import ciphers
+
+        password = "load-test-password"
+        self.request("POST /register", "POST", "/register",
+                     json_body={"email": self.email, "password": password})
+        token = self.request("POST /login", "POST", "/login",
+                             json_body={"email": self.email, "password": password})["token"]
+
+        challenge = self.request("GET /phase1/begin", "GET", "/phase1/begin", token)
+        challenge_id = challenge["challenge_id"]
+        riddle = challenge["current_riddle"]
+        values = []
+        for header in ("X-Quest-Key", "X-Quest-Sequence", "X-Quest-Token"):
+            value = re.search(r": '([^']+)'$", riddle).group(1)
+            if header == "X-Quest-Sequence":
+                value = base64.b64decode(value).decode("utf-8")
+            values.append(value)
+            step = self.request("POST /phase1/step", "POST", f"/phase1/step/{challenge_id}", token,
+                                headers={header: value})
+            riddle = step.get("next_riddle", "")
+        completed = self.request("POST /phase1/complete", "POST", f"/phase1/complete/{challenge_id}", token,
+                                 json_body={"assembled_key": "".join(values)})
+
+        token = completed["phase2_token"]["token"]
+        maze = self.request("GET /phase2/begin", "GET", "/phase2/begin", token)
+        message, encoding, stage = maze["first_message"], maze["encoding_type"], maze["current_stage"]
+        while True:
+            result = self.request("POST /phase2/solve", "POST", f"/phase2/solve/{maze['maze_id']}", token,
+                                  json_body={"decoded_message": ciphers.decode(encoding, message), "stage": stage})
+            if "final_tokens" in result:
+                return
+            message, encoding, stage = result["next_message"], result["encoding_type"], result["current_stage"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(samples: List[Dict], wall_seconds: float) -> Dict:
+    by_endpoint = defaultdict(list)
+    for sample in samples:
+        by_endpoint[sample["endpoint"]].append(sample)
+
+    endpoints = {}
+    for endpoint, rows in by_endpoint.items():
+        latencies = sorted(row["seconds"] * 1000 for row in rows)
+        operations = Counter()
+        for row in rows:
+            operations.update(row["db_calls"])
+        endpoints[endpoint] = {
+            "requests": len(rows),
+            "errors": sum(1 for row in rows if row["status"] >= 400),
+            "throughput_rps": round(len(rows) / wall_seconds, 2) if wall_seconds else 0.0,
+            "mean_ms": round(sum(latencies) / len(latencies), 3),
+            "p50_ms": round(percentile(latencies, 50), 3),
+            "p95_ms": round(percentile(latencies, 95), 3),
+            "p99_ms": round(percentile(latencies, 99), 3),
+            "max_ms": round(latencies[-1], 3),
+            "db_calls_per_request": round(sum(operations.values()) / len(rows), 3),
+            "db_calls_by_operation": {op: round(count / len(rows), 3) for op, count in sorted(operations.items())},
+        }
+
+    total_calls = sum(sum(sample["db_calls"].values()) for sample in samples)
+    return {
+        "requests": len(samples),
+        "errors": sum(1 for sample in samples if sample["status"] >= 400),
+        "throughput_rps": round(len(samples) / wall_seconds, 2) if wall_seconds else 0.0,
+        "db_calls_per_request": round(total_calls / len(samples), 3) if samples else 0.0,
+        "endpoints": dict(sorted(endpoints.items())),
+    }
+
+
+def run(args) -> Dict:
+    configure(args)
+    from app import create_app
+
+    counter = CallCounter()
+    counter.install()
+    ensure_table(args.table)
+    app = create_app()
+    run_id = uuid.uuid4().hex[:8]
+
+    def journey(index: int, warmup: bool = False) -> Optional[Dict]:
+        player = Player(app.test_client(), counter, f"load-{run_id}-{'w' if warmup else ''}{index}@example.com")
+        try:
+            player.play()
+            error = None
+        except JourneyFailed as e:
+            error = str(e)
+        return {"samples": player.samples, "error": error}
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(lambda i: journey(i, warmup=True), range(args.warmup)))
+
+        started = time.perf_counter()
+        results = list(pool.map(journey, range(args.players)))
+        wall_seconds = time.perf_counter() - started
+
+    samples = [sample for result in results for sample in result["samples"]]
+    failures = [result["error"] for result in results if result["error"]]
+    return {
+        "run_id": run_id,
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "players": args.players,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "backend": f"dynamodb ({args.endpoint})" if args.endpoint else "memory",
+            "bcrypt_rounds": args.bcrypt_rounds,
+            "python": sys.version.split()[0],
+        },
+        "wall_seconds": round(wall_seconds, 3),
+        "journeys": {
+            "completed": args.players - len(failures),
+            "failed": len(failures),
+            "per_second": round((args.players - len(failures)) / wall_seconds, 2) if wall_seconds else 0.0,
+            "first_errors": failures[:5],
+        },
+        **summarize(samples, wall_seconds),
+    }
+
+
+def print_report(report: Dict, baseline: Dict = None) -> None:
+    journeys = report["journeys"]
+    print(f"{journeys['completed']} journeys ok, {journeys['failed']} failed in {report['wall_seconds']:.1f} s "
+          f"({report['throughput_rps']:.1f} req/s, {report['db_calls_per_request']:.2f} DynamoDB calls/req)")
+    print(f"{'endpoint':<22}{'req':>7}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'db/req':>8}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:<22}{stats['requests']:>7}{stats['errors']:>5}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['db_calls_per_request']:>8.2f}")
+        previous = (baseline or {}).get("endpoints", {}).get(endpoint)
+        if previous:
+            deltas = "  ".join(
+                f"{key[:-3]} {stats[key] - previous[key]:+.2f}" for key in ("p50_ms", "p95_ms", "p99_ms")
+            )
+            print(f"{'':<22}vs baseline: {deltas} ms, db/req {stats['db_calls_per_request'] - previous['db_calls_per_request']:+.2f}")
+    for error in journeys["first_errors"]:
+        print(f"  failed: {error}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Drive player journeys through the app and report latency")
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--endpoint", help="DynamoDB Local endpoint (default: in-process stand-in)")
+    parser.add_argument("--table", default="binary-trail-loadtest")
+    parser.add_argument("--bcrypt-rounds", type=int, default=4)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to diff against")
+    parser.add_argument("--json", action="store_true", help="print the JSON report instead of a table")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        baseline = None
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+        print_report(report, baseline)
@@ -0,0 +1,519 @@
+"""Recompute challenge statistics and leaderboards from the run items.
+
+Every Phase 1 challenge (``USER#<email>`` / ``CHALLENGE#PHASE1#<id>``) and
+maze (``USER#<email>`` / ``MAZE#<id>``) is one run. The job scans the table
+in parallel segments, on a thread pool or, with ``--processes``, a process
+pool. Each segment streams its pages through a generator pipeline:
+
+    pages -> runs -> per-player groups -> segment totals
+
+A player's items share a partition, and a scan returns a partition's items
+together, so a group is complete once the next partition starts. Memory per
+segment is therefore one page, one player and fixed-size totals. Time to
+solve goes into a log-scale histogram, so percentiles come within 5% of the
+exact value without keeping every time. Boards keep at most
+``LEADERBOARD_SIZE`` entries.
+
+Player stats are written in batches after each page. The segment then saves
+a checkpoint: its cursor, its totals and the open player. A stopped or
+failed run resumes from there when started again with the same
+``--checkpoint-dir`` and ``--segments``. Checkpoints record the table they
+were made against (its ARN and creation time) and are refused for any other
+table, including one deleted and recreated under the same name. When every
+segment is done, the merged totals replace the challenge stats and the
+boards read by ``GET /leaderboard/<challenge>``. Runs started is the
+exception: TTL and ``jobs.sweep_expired`` delete abandoned runs, so the
+scan undercounts it, and the stream's count is kept where there is one.
+
+By default the job runs on the in-process DynamoDB stand-in, which
+``--seed-players`` fills with synthetic runs:
+
+    python -m jobs.aggregate_stats --seed-players 5000 --segments 8 [--max-pages 2] [--dry-run]
+
+``--endpoint`` points it at DynamoDB Local, and ``--table`` alone at the
+deployed table. Checkpoints need one of those, since the stand-in starts
+empty in every process:
+
+    python -m jobs.aggregate_stats --table NAME --checkpoint-dir .checkpoints/stats
+
+Delete the checkpoint directory to start a fresh pass. The live counters
+keep moving while the job runs, so run it when completions are quiet;
+anything recorded mid-scan may be lost or counted twice.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Histogram buckets grow by 5%, the error bound on reported percentiles.
+TIME_BUCKET_GROWTH = 1.05
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p99": 0.99}
+RUN_PREFIXES = {"CHALLENGE#PHASE1#": "phase1", "MAZE#": "phase2"}
+RUN_ATTRIBUTES = ("pk", "sk", "status", "attempts", "created_at", "completed_at", "updated_at")
+
+
+def configure(args, local_table: str = "binary-trail-stats") -> None:
+    """Environment for the app modules; must run before ``app`` is imported."""
+    if args.endpoint:
+        os.environ["DYNAMODB_BACKEND"] = "dynamodb"
+        os.environ["DYNAMODB_ENDPOINT"] = args.endpoint
+    elif args.table is None:
+        os.environ["DYNAMODB_BACKEND"] = "memory"
+    os.environ["DYNAMODB_TABLE_NAME"] = args.table or os.environ.get("DYNAMODB_TABLE_NAME") or local_table
+    os.environ.setdefault("AWS_REGION", "us-east-1")
+    if args.endpoint:
+        os.environ.setdefault("AWS_ACCESS_KEY_ID", "local")
+        os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "local")
+
+
+# --- pipeline stages -------------------------------------------------------
+
+def scan_pages(table, segment: int, total_segments: int, cursor: Optional[Dict],
+               page_size: int) -> Iterator[Tuple[List[Dict], Optional[Dict]]]:
+    """Yield (items, cursor after them) for one segment, run items only"""
+    names = {f"#{attr}": attr for attr in RUN_ATTRIBUTES}
+    params = {
+        "Segment": segment,
+        "TotalSegments": total_segments,
+        "Limit": page_size,
+        "ProjectionExpression": ", ".join(names),
+        "FilterExpression": " OR ".join(f"begins_with(#sk, :p{i})" for i in range(len(RUN_PREFIXES))),
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": {f":p{i}": prefix for i, prefix in enumerate(RUN_PREFIXES)},
+    }
+    while True:
+        if cursor:
+            params["ExclusiveStartKey"] = cursor
+        response = table.scan(**params)
+        cursor = response.get("LastEvaluatedKey")
+        yield response.get("Items", []), cursor
+        if not cursor:
+            return
+
+
+def parse_runs(items: List[Dict]) -> Iterator[Dict]:
+    for item in items:
+        challenge = next((name for prefix, name in RUN_PREFIXES.items() if item["sk"].startswith(prefix)), None)
+        if challenge is None:
+            continue
+        run = {
+            "pk": item["pk"],
+            "challenge": challenge,
+            "status": item.get("status", "unknown"),
+            "attempts": int(item.get("attempts", 0)),
+            "completed_at": None,
+            "time_ms": None,
+        }
+        # Mazes completed before completed_at was stored only have updated_at.
+        completed_at = item.get("completed_at") or item.get("updated_at")
+        if run["status"] == "completed" and completed_at and item.get("created_at"):
+            elapsed = datetime.fromisoformat(completed_at) - datetime.fromisoformat(item["created_at"])
+            run["completed_at"] = completed_at
+            run["time_ms"] = max(0, int(elapsed.total_seconds() * 1000))
+        yield run
+
+
+def _time_bucket(time_ms: int) -> int:
+    return int(math.log(max(time_ms, 1)) / math.log(TIME_BUCKET_GROWTH))
+
+
+def _bucket_upper_ms(bucket: int) -> int:
+    return int(math.ceil(TIME_BUCKET_GROWTH ** (bucket + 1)))
+
+
+def _empty_totals() -> Dict:
+    return {
+        "started": 0, "completions": 0, "attempts": 0, "total_ms": 0, "best_ms": None,
+        "last_completed_at": None, "statuses": {}, "attempt_counts": {}, "time_buckets": {}, "board": [],
+    }
+
+
+def _empty_player(pk: str) -> Dict:
+    return {"pk": pk, "challenges": {}}
+
+
+def _count(counts: Dict, key, amount: int = 1) -> None:
+    key = str(key)
+    counts[key] = counts.get(key, 0) + amount
+
+
+def _later(a: Optional[str], b: Optional[str]) -> Optional[str]:
+    return max(filter(None, (a, b)), default=None)
+
+
+def _min_time(a: Optional[int], b: Optional[int]) -> Optional[int]:
+    return min((t for t in (a, b) if t is not None), default=None)
+
+
+def _trim_board(board: List[Dict], size: int) -> List[Dict]:
+    board.sort(key=lambda e: (e["time_ms"], e["completed_at"]))
+    return board[:size]
+
+
+class SegmentAggregator:
+    """Folds runs into one segment's totals; the state is plain JSON for checkpoints."""
+
+    def __init__(self, controller, state: Dict, board_size: int):
+        self.controller = controller
+        self.state = state
+        self.board_size = board_size
+
+    @staticmethod
+    def new_state(table: Optional[Dict] = None) -> Dict:
+        return {"table": table, "cursor": None, "done": False, "pages": 0, "runs": 0, "challenges": {},
+                "player": None}
+
+    def add(self, run: Dict, flushed: List[Dict]) -> None:
+        """Fold one run; stats items of players left behind are appended to ``flushed``"""
+        player = self.state["player"]
+        if player is None or player["pk"] != run["pk"]:
+            if player is not None:
+                flushed.extend(self.close_player())
+            player = self.state["player"] = _empty_player(run["pk"])
+
+        self.state["runs"] += 1
+        totals = self.state["challenges"].setdefault(run["challenge"], _empty_totals())
+        totals["started"] += 1
+        _count(totals["statuses"], run["status"])
+        if run["time_ms"] is None:
+            return
+
+        totals["completions"] += 1
+        totals["attempts"] += run["attempts"]
+        totals["total_ms"] += run["time_ms"]
+        totals["best_ms"] = _min_time(totals["best_ms"], run["time_ms"])
+        totals["last_completed_at"] = _later(totals["last_completed_at"], run["completed_at"])
+        _count(totals["attempt_counts"], run["attempts"])
+        _count(totals["time_buckets"], _time_bucket(run["time_ms"]))
+
+        mine = player["challenges"].setdefault(run["challenge"], {
+            "completions": 0, "attempts": 0, "total_ms": 0, "best_ms": None,
+            "best_attempts": 0, "best_completed_at": None, "last_completed_at": None,
+        })
+        mine["completions"] += 1
+        mine["attempts"] += run["attempts"]
+        mine["total_ms"] += run["time_ms"]
+        mine["last_completed_at"] = _later(mine["last_completed_at"], run["completed_at"])
+        if mine["best_ms"] is None or run["time_ms"] < mine["best_ms"]:
+            mine["best_ms"] = run["time_ms"]
+            mine["best_attempts"] = run["attempts"]
+            mine["best_completed_at"] = run["completed_at"]
+
+    def close_player(self) -> List[Dict]:
+        """Stats items for the current player; their best runs are offered to the boards"""
+        player, self.state["player"] = self.state["player"], None
+        if player is None:
+            return []
+        email = player["pk"][len("USER#"):]
+        items = []
+        for challenge, mine in player["challenges"].items():
+            items.append(self.controller.player_stats_item(email, challenge, {
+                "completions": mine["completions"],
+                "attempts": mine["attempts"],
+                "total_ms": mine["total_ms"],
+                "best_ms": mine["best_ms"],
+                "last_completed_at": mine["last_completed_at"],
+            }))
+            board = self.state["challenges"][challenge]["board"]
+            board.append(self.controller.board_entry(
+                email, mine["best_ms"], mine["best_attempts"], mine["best_completed_at"]
+            ))
+            if len(board) > 2 * self.board_size:
+                self.state["challenges"][challenge]["board"] = _trim_board(board, self.board_size)
+        return items
+
+
+def _checkpoint_path(directory: str, segment: int, total_segments: int) -> str:
+    return os.path.join(directory, f"segment-{segment}-of-{total_segments}.json")
+
+
+def _load_checkpoint(directory: Optional[str], segment: int, total_segments: int) -> Optional[Dict]:
+    if not directory:
+        return None
+    path = _checkpoint_path(directory, segment, total_segments)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def table_fingerprint(table) -> Dict:
+    """What identifies the scanned table across runs: a recreated table gets a new creation time"""
+    description = table.meta.client.describe_table(TableName=table.name)["Table"]
+    return {"arn": description["TableArn"], "created": str(description["CreationDateTime"])}
+
+
+def check_checkpoints(directory: str, total_segments: int, fingerprint: Dict) -> None:
+    """Refuse to resume from checkpoints made against another table"""
+    for segment in range(total_segments):
+        state = _load_checkpoint(directory, segment, total_segments)
+        if state is not None and state.get("table") != fingerprint:
+            raise SystemExit(
+                f"{_checkpoint_path(directory, segment, total_segments)} was made against "
+                f"{state.get('table')}, not {fingerprint}; delete the checkpoint directory to start a fresh pass"
+            )
+
+
+def _save_checkpoint(directory: Optional[str], segment: int, total_segments: int, state: Dict) -> None:
+    if not directory:
+        return
+    path = _checkpoint_path(directory, segment, total_segments)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def _write_batch(table, items: List[Dict]) -> None:
+    if not items:
+        return
+    with table.batch_writer() as batch:
+        for item in items:
+            batch.put_item(Item=item)
+
+
+def aggregate_segment(segment: int, total_segments: int, options: Dict) -> Dict:
+    """Scan one segment to the end (or ``max_pages``) and return its state.
+
+    Top-level so process pools can run it; each worker opens its own table.
+    """
+    from app.controllers.leaderboard_controller import LeaderboardController, LEADERBOARD_SIZE
+
+    state = (_load_checkpoint(options["checkpoint_dir"], segment, total_segments)
+             or SegmentAggregator.new_state(options["table"]))
+    if state["done"]:
+        return state
+    controller = LeaderboardController()
+    aggregator = SegmentAggregator(controller, state, LEADERBOARD_SIZE)
+
+    pages = 0
+    for items, cursor in scan_pages(controller.table, segment, total_segments,
+                                    state["cursor"], options["page_size"]):
+        flushed = []
+        for run in parse_runs(items):
+            aggregator.add(run, flushed)
+        if cursor is None:
+            flushed.extend(aggregator.close_player())
+        if not options["dry_run"]:
+            _write_batch(controller.table, flushed)
+
+        state["cursor"] = cursor
+        state["done"] = cursor is None
+        state["pages"] += 1
+        _save_checkpoint(options["checkpoint_dir"], segment, total_segments, state)
+        pages += 1
+        if options["max_pages"] and pages >= options["max_pages"]:
+            break
+    for totals in state["challenges"].values():
+        totals["board"] = _trim_board(totals["board"], LEADERBOARD_SIZE)
+    return state
+
+
+# --- merge and write-back --------------------------------------------------
+
+def merge_segments(states: List[Dict], board_size: int) -> Dict[str, Dict]:
+    merged = {}
+    for state in states:
+        for challenge, totals in state["challenges"].items():
+            into = merged.setdefault(challenge, _empty_totals())
+            for key in ("started", "completions", "attempts", "total_ms"):
+                into[key] += totals[key]
+            into["best_ms"] = _min_time(into["best_ms"], totals["best_ms"])
+            into["last_completed_at"] = _later(into["last_completed_at"], totals["last_completed_at"])
+            for field in ("statuses", "attempt_counts", "time_buckets"):
+                for key, count in totals[field].items():
+                    _count(into[field], key, count)
+            into["board"] = _trim_board(into["board"] + totals["board"], board_size)
+    return merged
+
+
+def percentiles(time_buckets: Dict[str, int]) -> Dict[str, int]:
+    """Percentiles from the histogram, as the upper bound of the bucket they fall in"""
+    counts = sorted((int(bucket), count) for bucket, count in time_buckets.items())
+    total = sum(count for _, count in counts)
+    result = {}
+    for name, fraction in PERCENTILES.items():
+        rank, seen = max(1, math.ceil(total * fraction)), 0
+        for bucket, count in counts:
+            seen += count
+            if seen >= rank:
+                result[name] = _bucket_upper_ms(bucket)
+                break
+    return result
+
+
+def challenge_stats(totals: Dict) -> Dict:
+    """The stats item attributes the live counters use, plus the distributions"""
+    stats = {key: totals[key] for key in ("started", "completions", "attempts", "total_ms")}
+    if totals["best_ms"] is not None:
+        stats["best_ms"] = totals["best_ms"]
+    if totals["last_completed_at"]:
+        stats["last_completed_at"] = totals["last_completed_at"]
+    stats["status_counts"] = dict(totals["statuses"])
+    stats["attempt_distribution"] = dict(sorted(totals["attempt_counts"].items(), key=lambda kv: int(kv[0])))
+    stats["time_percentiles_ms"] = percentiles(totals["time_buckets"])
+    stats["recomputed_at"] = datetime.now(timezone.utc).isoformat()
+    return stats
+
+
+def run(args) -> Dict:
+    configure(args)
+    from app.controllers.leaderboard_controller import LeaderboardController, LEADERBOARD_SIZE
+    from app.database.db_config import Database
+
+    backend = Database().backend
+    if args.processes and backend == "memory":
+        raise SystemExit("--processes needs a shared table (--endpoint or --table); "
+                         "the in-process stand-in is private to each process")
+    if args.seed_players:
+        if backend != "memory" and not args.endpoint:
+            raise SystemExit("--seed-players only writes to the stand-in or DynamoDB Local")
+        seed(LeaderboardController().table, args.seed_players, args.seed)
+    fingerprint = None
+    if args.checkpoint_dir:
+        if backend == "memory":
+            raise SystemExit("--checkpoint-dir needs a persistent table (--endpoint or --table); "
+                             "the in-process stand-in starts empty on every run")
+        fingerprint = table_fingerprint(LeaderboardController().table)
+        os.makedirs(args.checkpoint_dir, exist_ok=True)
+        check_checkpoints(args.checkpoint_dir, args.segments, fingerprint)
+
+    options = {
+        "table": fingerprint,
+        "checkpoint_dir": args.checkpoint_dir,
+        "page_size": args.page_size,
+        "max_pages": args.max_pages,
+        "dry_run": args.dry_run,
+    }
+    pool_type = ProcessPoolExecutor if args.processes else ThreadPoolExecutor
+    started = time.perf_counter()
+    with pool_type(max_workers=args.workers or args.segments) as pool:
+        states = list(pool.map(
+            aggregate_segment, range(args.segments), [args.segments] * args.segments, [options] * args.segments
+        ))
+    elapsed = time.perf_counter() - started
+
+    done = all(state["done"] for state in states)
+    merged = merge_segments(states, LEADERBOARD_SIZE)
+    report = {
+        "backend": backend,
+        "segments": args.segments,
+        "segments_done": sum(state["done"] for state in states),
+        "runs": sum(state["runs"] for state in states),
+        "seconds": round(elapsed, 3),
+        "written": done and not args.dry_run,
+        "challenges": {},
+    }
+    # Partial totals would undercount; they are only written once every segment is done.
+    report["challenges"] = write_stats(LeaderboardController(), merged, report["written"])
+    return report
+
+
+def write_stats(controller, merged: Dict[str, Dict], write: bool) -> Dict[str, Dict]:
+    """Write the merged totals (when ``write``) and return the per-challenge report.
+
+    ``started`` is only filled in where the stream has not counted it yet:
+    TTL and ``jobs.sweep_expired`` delete expired active runs, so the scan
+    sees fewer runs than were ever started.
+    """
+    from app.database.repository import Repository, Update
+
+    repo = Repository(controller.table)
+    report = {}
+    boards = []
+    for challenge, totals in sorted(merged.items()):
+        stats = challenge_stats(totals)
+        key = controller.challenge_stats_item(challenge, {})
+        if write:
+            update = Update().set_if_not_exists("started", stats["started"])
+            for name, value in stats.items():
+                if name != "started":
+                    update.set(name, value)
+            stats["started"] = repo.update(key, update)["started"]
+            boards.append(controller.board_item(challenge, totals["board"]))
+        else:
+            stats["started"] = (repo.get(key, ["started"]) or {}).get("started", stats["started"])
+        report[challenge] = {
+            **controller.summarize(stats),
+            "status_counts": stats["status_counts"],
+            "board_size": len(totals["board"]),
+        }
+    _write_batch(controller.table, boards)
+    return report
+
+
+# --- local data ------------------------------------------------------------
+
+def seed(table, players: int, seed_value: int) -> None:
+    """Synthetic run items (same shape as the controllers write) for local runs"""
+    rng = random.Random(seed_value)
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    def run_item(pk: str, sk: str, status: str, created: datetime, extra: Dict) -> Dict:
+        item = {"pk": pk, "sk": sk, "status": status, "attempts": int(rng.expovariate(0.7)),
+                "created_at": created.isoformat(), **extra}
+        if status == "completed":
+            finished = created + timedelta(seconds=rng.lognormvariate(5.5, 0.8))
+            item["completed_at"] = item["updated_at"] = finished.isoformat()
+        return item
+
+    with table.batch_writer() as batch:
+        for n in range(players):
+            pk = f"USER#player{n}@example.com"
+            batch.put_item(Item={"pk": pk, "sk": "PROFILE", "email": f"player{n}@example.com"})
+            for _ in range(rng.randint(1, 3)):
+                created = start + timedelta(minutes=rng.randint(0, 60 * 24 * 90))
+                status = rng.choices(["completed", "active"], weights=[7, 3])[0]
+                run_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                batch.put_item(Item=run_item(pk, f"CHALLENGE#PHASE1#{run_id}", status, created,
+                                             {"challenge_id": run_id, "phase": 1}))
+                if status == "completed" and rng.random() < 0.8:
+                    maze_status = rng.choices(["completed", "active"], weights=[6, 4])[0]
+                    maze_id = str(uuid.UUID(int=rng.getrandbits(128)))
+                    batch.put_item(Item=run_item(pk, f"MAZE#{maze_id}", maze_status,
+                                                 created + timedelta(hours=1), {"maze_id": maze_id}))
+
+
+def print_report(report: Dict) -> None:
+    state = "written" if report["written"] else "not written (dry run or unfinished segments)"
+    print(f"{report['runs']} runs in {report['segments_done']}/{report['segments']} segments, "
+          f"{report['seconds']:.2f} s on {report['backend']}; stats {state}")
+    for challenge, stats in report["challenges"].items():
+        rate = stats.get("completion_rate") or 0.0
+        print(f"{challenge}: {stats['completions']}/{stats.get('started', 0)} completed ({rate:.1%}), "
+              f"best {stats['best_seconds']} s, board {stats['board_size']}")
+        percentiles_text = ", ".join(f"{name} {value:.1f} s"
+                                     for name, value in stats.get("time_percentiles_seconds", {}).items())
+        print(f"  time to solve: {percentiles_text or 'n/a'}")
+        print(f"  attempts: {stats.get('attempt_distribution', {})}")
+        print(f"  statuses: {stats['status_counts']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute challenge statistics and leaderboards")
+    parser.add_argument("--segments", type=int, default=8, help="parallel scan segments")
+    parser.add_argument("--workers", type=int, help="pool size (default: one per segment)")
+    parser.add_argument("--processes", action="store_true", help="use a process pool instead of threads")
+    parser.add_argument("--page-size", type=int, default=500, help="items evaluated per scan page")
+    parser.add_argument("--checkpoint-dir", help="save and resume per-segment progress here")
+    parser.add_argument("--max-pages", type=int, help="stop each segment after this many pages")
+    parser.add_argument("--dry-run", action="store_true", help="compute and report without writing")
+    parser.add_argument("--endpoint", help="DynamoDB Local endpoint")
+    parser.add_argument("--table", help="deployed table to aggregate (default: the in-process stand-in)")
+    parser.add_argument("--seed-players", type=int, default=0, help="write synthetic runs first (local only)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for --seed-players")
+    parser.add_argument("--json", action="store_true", help="print the JSON report instead of a summary")
+    args = parser.parse_args()
+
+    report = run(args)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        print_report(report)
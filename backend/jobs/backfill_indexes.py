@@ -0,0 +1,44 @@
+"""Make existing catalog entries reachable through the catalog filters.
+
+``GET /challenges?category=&difficulty=&tags=`` reads the category and
+difficulty GSIs and the ``CHALLENGE#TAG#<tag>`` items. Entries created
+before those existed have neither the sparse GSI keys nor tag items, so
+the filters do not find them. This job rewrites every catalog entry
+through ``ChallengeController.backfill_indexes``, which adds both (and
+slims tag items written as full copies). It is idempotent; run it once
+after deploying the indexes, and again after importing catalog entries
+outside the API:
+
+    python -m jobs.backfill_indexes --table NAME
+    python -m jobs.backfill_indexes --endpoint http://localhost:8000
+"""
+import argparse
+import json
+import sys
+import time
+
+from jobs.aggregate_stats import configure
+
+
+def run(args) -> dict:
+    configure(args, local_table="binary-trail-catalog")
+    from app.controllers.challenge_controller import ChallengeController
+    from app.database.db_config import Database
+
+    backend = Database().backend
+    if backend == "memory":
+        raise SystemExit("backfill needs a persistent table (--endpoint or --table); "
+                         "the in-process stand-in starts empty on every run")
+    started = time.perf_counter()
+    count = ChallengeController().backfill_indexes()
+    return {"backend": backend, "challenges": count, "seconds": round(time.perf_counter() - started, 3)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Add GSI keys and tag items to existing catalog entries")
+    parser.add_argument("--endpoint", help="DynamoDB Local endpoint")
+    parser.add_argument("--table", help="deployed table to backfill")
+    args = parser.parse_args()
+
+    json.dump(run(args), sys.stdout, indent=2)
+    print()
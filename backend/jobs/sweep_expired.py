@@ -0,0 +1,178 @@
+"""Delete expired transient items and bring older ones under TTL.
+
+Native TTL (``terraform/dynamodb.tf``) deletes items past ``expires_at``
+eventually. This job does the same at once, for tables without TTL (the
+in-process stand-in, DynamoDB Local) or to compact a table now. It also
+handles items written before ``expires_at`` existed: ``legacy_expires_at``
+gives their deadline, so expired ones are deleted and live ones are stamped
+for TTL to pick up. Completed runs have no deadline and are kept.
+
+Segments are scanned in parallel on a thread pool. Every write is
+conditional on what the scan saw: a delete still requires the item to be
+expired, and a stamp still requires ``expires_at`` to be missing. A run
+completed or extended mid-sweep therefore survives.
+
+    python -m jobs.sweep_expired [--segments 8] [--dry-run] \\
+        [--endpoint http://localhost:8000 | --table NAME] [--seed-users 1000]
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List
+
+from jobs.aggregate_stats import configure
+
+LEGACY_PREFIXES = ("CHALLENGE#PHASE1#", "MAZE#")
+SWEEP_ATTRIBUTES = ("pk", "sk", "expires_at", "status", "expiry_time", "created_at", "updated_at",
+                    "window_start", "window_seconds")
+
+
+def candidates(table, segment: int, total_segments: int, now: int, page_size: int) -> Iterator[List[Dict]]:
+    """Pages of items that are expired or could be (transient items without ``expires_at``)"""
+    from app.utils.expiry import RATE_LIMIT_SK
+
+    names = {f"#{attr}": attr for attr in SWEEP_ATTRIBUTES}
+    legacy = " OR ".join(["#sk = :ratelimit"] + [f"begins_with(#sk, :p{i})" for i in range(len(LEGACY_PREFIXES))])
+    params = {
+        "Segment": segment,
+        "TotalSegments": total_segments,
+        "Limit": page_size,
+        "ProjectionExpression": ", ".join(names),
+        "FilterExpression": f"#expires_at <= :now OR (attribute_not_exists(#expires_at) AND ({legacy}))",
+        "ExpressionAttributeNames": names,
+        "ExpressionAttributeValues": {
+            ":now": now, ":ratelimit": RATE_LIMIT_SK, **{f":p{i}": prefix for i, prefix in enumerate(LEGACY_PREFIXES)}
+        },
+    }
+    while True:
+        response = table.scan(**params)
+        yield response.get("Items", [])
+        if not response.get("LastEvaluatedKey"):
+            return
+        params["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _table():
+    from app.config import env
+    from app.database.db_config import Database
+
+    return Database().get_table(env("DYNAMODB_TABLE_NAME"))
+
+
+def sweep_segment(segment: int, total_segments: int, options: Dict) -> Counter:
+    from app.database.db_config import client_error
+    from app.utils.expiry import TTL_ATTRIBUTE, legacy_expires_at
+
+    table = _table()
+    now = options["now"]
+    counts = Counter()
+    names = {"#ttl": TTL_ATTRIBUTE}
+    for page in candidates(table, segment, total_segments, now, options["page_size"]):
+        for item in page:
+            counts["candidates"] += 1
+            key = {"pk": item["pk"], "sk": item["sk"]}
+            if TTL_ATTRIBUTE in item:
+                action, deadline = "deleted", int(item[TTL_ATTRIBUTE])
+                params = {"ConditionExpression": "#ttl <= :now", "ExpressionAttributeValues": {":now": now}}
+            else:
+                deadline = legacy_expires_at(item)
+                if deadline is None:
+                    counts["kept"] += 1
+                    continue
+                action = "deleted" if deadline <= now else "stamped"
+                params = {"ConditionExpression": "attribute_not_exists(#ttl)"}
+            if options["dry_run"]:
+                counts[action] += 1
+                continue
+            try:
+                if action == "deleted":
+                    table.delete_item(Key=key, ExpressionAttributeNames=names, **params)
+                else:
+                    table.update_item(
+                        Key=key, UpdateExpression="SET #ttl = :deadline", ExpressionAttributeNames=names,
+                        ExpressionAttributeValues={":deadline": deadline}, **params
+                    )
+                counts[action] += 1
+            except client_error() as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                counts["changed_meanwhile"] += 1
+    return counts
+
+
+def run(args) -> Dict:
+    configure(args, local_table="binary-trail-sweep")
+    from app.database.db_config import Database
+
+    backend = Database().backend
+    if args.seed_users:
+        if backend != "memory" and not args.endpoint:
+            raise SystemExit("--seed-users only writes to the stand-in or DynamoDB Local")
+        seed(_table(), args.seed_users)
+
+    options = {"now": int(time.time()), "page_size": args.page_size, "dry_run": args.dry_run}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers or args.segments) as pool:
+        results = list(pool.map(
+            sweep_segment, range(args.segments), [args.segments] * args.segments, [options] * args.segments
+        ))
+    counts = sum(results, Counter())
+    return {
+        "backend": backend,
+        "segments": args.segments,
+        "dry_run": args.dry_run,
+        "seconds": round(time.perf_counter() - started, 3),
+        **{key: counts[key] for key in ("candidates", "deleted", "stamped", "kept", "changed_meanwhile")},
+    }
+
+
+def seed(table, users: int) -> None:
+    """Per user: live and expired items of each transient kind, legacy ones and kept history"""
+    now = datetime.now(timezone.utc)
+    epoch = int(now.timestamp())
+    window = epoch - epoch % 60
+    old = (now - timedelta(days=3)).isoformat()
+    with table.batch_writer() as batch:
+        for n in range(users):
+            pk = f"USER#sweep{n}@example.com"
+            rate_limit = (
+                {"sk": "RATELIMIT#API", "request_count": 4, "window_start": window - 3600, "window_seconds": 60,
+                 "expires_at": window - 3540}
+                if n % 2 else
+                # legacy timestamp-list item, written before window_start and expires_at
+                {"sk": "RATELIMIT#API", "requests": [old], "created_at": old, "updated_at": old}
+            )
+            items = [
+                {"sk": "PROFILE", "email": f"sweep{n}@example.com"},
+                rate_limit,
+                {"sk": "CHALLENGE#PHASE1#live", "status": "active", "expires_at": epoch + 3600},
+                {"sk": "CHALLENGE#PHASE1#expired", "status": "active", "expires_at": epoch - 3600},
+                {"sk": "CHALLENGE#PHASE1#done", "status": "completed", "created_at": old},
+                # legacy challenge still within its 24 hours: gets stamped
+                {"sk": "CHALLENGE#PHASE1#legacy", "status": "active", "created_at": now.isoformat(),
+                 "expiry_time": (now + timedelta(hours=12)).isoformat()},
+                # legacy maze abandoned days ago: deleted
+                {"sk": "MAZE#legacy", "status": "active", "created_at": old},
+                {"sk": "ACTIVE#PHASE1", "challenge_id": "expired", "expires_at": epoch - 3600},
+            ]
+            for item in items:
+                batch.put_item(Item={"pk": pk, **item})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete expired items and stamp expires_at on older ones")
+    parser.add_argument("--segments", type=int, default=8, help="parallel scan segments")
+    parser.add_argument("--workers", type=int, help="thread pool size (default: one per segment)")
+    parser.add_argument("--page-size", type=int, default=500, help="items evaluated per scan page")
+    parser.add_argument("--dry-run", action="store_true", help="count what would change without writing")
+    parser.add_argument("--endpoint", help="DynamoDB Local endpoint")
+    parser.add_argument("--table", help="deployed table to sweep (default: the in-process stand-in)")
+    parser.add_argument("--seed-users", type=int, default=0, help="write synthetic items first (local only)")
+    args = parser.parse_args()
+
+    json.dump(run(args), sys.stdout, indent=2)
+    print()
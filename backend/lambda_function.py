@@ -1,8 +1,50 @@
+import logging
 from app import create_app
+from app.config import env, env_flag
+from app.fast_path import FastPathRouter, is_warmup_event
+from app.utils import logs
+from app.utils.metrics import registry
+from app.utils.startup_profile import profiler
 from serverless_wsgi import handle_request
 
 # Create the Flask app
 app = create_app()
+logger = logging.getLogger(__name__)
+profile_logger = logs.telemetry_logger("startup")
+# Hot routes answered straight from the event; everything else goes through WSGI.
+router = FastPathRouter(app) if env_flag("LAMBDA_FAST_PATH") else None
+_cold_start = True
+# Seconds an invocation waits for queued log lines before returning.
+LOG_FLUSH_TIMEOUT = float(env("LOG_FLUSH_TIMEOUT", "0.1"))
 
-def lambda_handler(event, context):
+def _dispatch(event, context):
+    if router is not None:
+        response = router.dispatch(event)
+        if response is not None:
+            return response
     return handle_request(app, event, context)
+
+def _handle(event, context):
+    global _cold_start
+    if is_warmup_event(event):
+        return {"warm": True}
+    if _cold_start:
+        _cold_start = False
+        if env_flag("STARTUP_PROFILE"):
+            with profiler.phase("first_invocation"):
+                response = _dispatch(event, context)
+            profile_logger.info("startup profile", extra={"startup_profile": profiler.report(), "sample": False})
+            return response
+    return _dispatch(event, context)
+
+def lambda_handler(event, context):
+    token = logs.bind_request_id(getattr(context, "aws_request_id", None))
+    try:
+        response = _handle(event, context)
+        # METRICS_EMF: flush route metrics as EMF log lines once per interval.
+        registry.maybe_emit_emf()
+        return response
+    finally:
+        logs.reset_request_id(token)
+        # The process may be frozen after we return; write what we can in time.
+        logs.flush(LOG_FLUSH_TIMEOUT)
@@ -0,0 +1,24 @@
+"""Lambda entry point for the table stream: challenge statistics and leaderboards.
+
+The event source mapping (``terraform/main.tf``) only passes run items
+(``CHALLENGE#PHASE1#`` and ``MAZE#`` sort keys). A failed record is
+reported with ``ReportBatchItemFailures``, so Lambda retries the batch from
+it instead of dropping the run.
+"""
+from app.config import env
+from app.controllers.leaderboard_controller import LeaderboardController
+from app.utils import logs
+
+logs.configure_logging()
+controller = LeaderboardController()
+# Seconds an invocation waits for queued log lines before returning.
+LOG_FLUSH_TIMEOUT = float(env("LOG_FLUSH_TIMEOUT", "0.1"))
+
+def lambda_handler(event, context):
+    token = logs.bind_request_id(getattr(context, "aws_request_id", None))
+    try:
+        failed = controller.apply_stream(event.get("Records", []))
+        return {"batchItemFailures": [{"itemIdentifier": failed}] if failed else []}
+    finally:
+        logs.reset_request_id(token)
+        logs.flush(LOG_FLUSH_TIMEOUT)
@@ -0,0 +1,50 @@
+import os
+import sys
+
+# The app reads its settings at import time.
+os.environ.setdefault("DYNAMODB_BACKEND", "memory")
+os.environ.setdefault("JWT_SECRET", "test-secret")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uuid
+
+import pytest
+
+from app.database.db_config import Database
+from app.database.memory import MemoryDynamoDB
+
+
+@pytest.fixture
+def backend():
+    """A private stand-in, for tests of the stand-in itself."""
+    return MemoryDynamoDB()
+
+
+@pytest.fixture
+def table(monkeypatch):
+    """A fresh app table on the shared stand-in; controllers built in the test use it."""
+    name = f"binary-trail-test-{uuid.uuid4().hex[:8]}"
+    monkeypatch.setenv("DYNAMODB_TABLE_NAME", name)
+    return Database().get_table(name)
+
+
+@pytest.fixture
+def flask_app(table, monkeypatch):
+    """The app on a fresh table; the shared controllers are rebuilt for it."""
+    from app import create_app
+    from app.routes import api_warrior, crypto_maze
+    from app.utils.catalog_cache import catalog_cache
+
+    monkeypatch.setattr(api_warrior, "_controller", None)
+    monkeypatch.setattr(crypto_maze, "_controller", None)
+    catalog_cache.invalidate()
+    return create_app()
+
+
+@pytest.fixture
+def auth_header():
+    """``Authorization`` header for a compact token issued to ``email``"""
+    from app.utils.auth import AuthUtil, Principal
+
+    return lambda email: {"Authorization": f"Bearer {AuthUtil.generate_token(Principal(email))}"}
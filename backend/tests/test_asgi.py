@@ -0,0 +1,78 @@
+import asyncio
+import json
+
+import pytest
+
+from app.asgi import AsyncApp
+from app.utils.rate_limit import RateLimit
+
+EMAIL = "async@example.com"
+
+
+def call(asgi, method, path, headers=None, payload=None):
+    """(status, headers, decoded body) for one request through the ASGI app"""
+    headers = dict(headers or {})
+    body = b""
+    if payload is not None:
+        body = json.dumps(payload).encode()
+        headers["Content-Type"] = "application/json"
+    scope = {
+        "type": "http", "method": method, "path": path, "query_string": b"", "root_path": "",
+        "headers": [(key.lower().encode("latin-1"), value.encode("latin-1")) for key, value in headers.items()],
+    }
+    messages = [{"type": "http.request", "body": body}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi(scope, receive, send))
+    start, response = sent
+    response_headers = {key.decode("latin-1"): value.decode("latin-1") for key, value in start["headers"]}
+    return start["status"], response_headers, json.loads(response["body"]) if response["body"] else None
+
+
+@pytest.fixture
+def asgi(flask_app):
+    return AsyncApp(flask_app)
+
+
+def test_maze_is_solved_through_the_async_routes(asgi, auth_header, table):
+    headers = auth_header(EMAIL)
+    status, _, maze = call(asgi, "GET", "/phase2/begin", headers)
+    assert status == 200
+    answers = table.get_item(Key={"pk": f"USER#{EMAIL}", "sk": f"MAZE#{maze['maze_id']}"})["Item"]["answers"]
+
+    status, response_headers, result = call(asgi, "POST", f"/phase2/solve/{maze['maze_id']}", headers,
+                                            {"decoded_message": answers[0]})
+    assert (status, result["current_stage"]) == (200, 2)
+    assert response_headers["X-RateLimit-Remaining"] == "4"
+    assert "X-Request-ID" in response_headers
+
+
+def test_missing_token_is_rejected(asgi):
+    status, _, body = call(asgi, "GET", "/phase1/begin")
+    assert status == 401 and body["error"]
+
+
+def test_unknown_challenge_is_a_bad_request(asgi, auth_header):
+    status, _, body = call(asgi, "POST", "/phase1/step/missing", auth_header(EMAIL))
+    assert (status, body["error"]) == (400, "Challenge not found")
+
+
+def test_rate_limit_failure_surfaces_as_itself(asgi, auth_header, monkeypatch):
+    def broken(self, user_email):
+        raise RuntimeError("rate limit store down")
+
+    monkeypatch.setattr(RateLimit, "hit", broken)
+    with pytest.raises(RuntimeError, match="rate limit store down"):
+        call(asgi, "POST", "/phase1/step/missing", auth_header(EMAIL))
+
+
+def test_routes_without_an_async_handler_fall_through_to_flask(asgi, auth_header):
+    status, _, body = call(asgi, "GET", "/dashboard", auth_header(EMAIL))
+    assert status == 200
+    assert body["profile"] is None and body["next_cursor"] is None
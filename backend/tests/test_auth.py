@@ -0,0 +1,72 @@
+import logging
+import time
+
+import pytest
+
+from app.controllers.auth_controller import AuthController
+from app.models.user import User
+from app.utils import auth
+from app.utils.auth import AuthUtil, Principal, authenticate, token_cache
+from app.utils.hashing import password_hasher
+
+EMAIL = "new@example.com"
+
+
+def test_duplicate_registration_does_not_hash(table):
+    controller = AuthController()
+    assert controller.register_user({"email": EMAIL, "password": "secret-1"})["email"] == EMAIL
+    completed = password_hasher.stats()["completed"]
+
+    assert controller.register_user({"email": EMAIL, "password": "secret-2"}) == {"message": "User already exists."}
+    assert password_hasher.stats()["completed"] == completed
+    assert controller.login_user({"email": EMAIL, "password": "secret-1"})["token"]
+
+
+@pytest.fixture
+def fresh_cache():
+    token_cache.clear()
+    yield token_cache
+    token_cache.clear()
+
+
+def legacy_token(email=EMAIL):
+    user = User(pk=f"USER#{email}", sk="PROFILE", email=email)
+    return AuthUtil.generate_token(user, mode="full")
+
+
+def test_legacy_tokens_are_accepted_until_the_cutoff_and_logged(fresh_cache, monkeypatch, caplog):
+    monkeypatch.setattr(auth, "LEGACY_TOKENS_ACCEPTED_UNTIL", time.time() + 60)
+    with caplog.at_level(logging.WARNING, logger="app.utils.auth"):
+        assert authenticate(f"Bearer {legacy_token()}").email == EMAIL
+    assert "legacy full-user token" in caplog.text
+
+
+def test_legacy_tokens_are_rejected_after_the_cutoff(fresh_cache, monkeypatch):
+    monkeypatch.setattr(auth, "LEGACY_TOKENS_ACCEPTED_UNTIL", time.time() - 1)
+    with pytest.raises(ValueError, match="no longer supported"):
+        authenticate(f"Bearer {legacy_token()}")
+    assert authenticate(f"Bearer {AuthUtil.generate_token(Principal(EMAIL))}").email == EMAIL
+
+
+def test_the_cutoff_waits_while_the_server_issues_legacy_tokens(fresh_cache, monkeypatch):
+    monkeypatch.setattr(auth, "LEGACY_TOKENS_ACCEPTED_UNTIL", time.time() - 1)
+    monkeypatch.setattr(auth, "TOKEN_CLAIMS_MODE", "full")
+    assert authenticate(f"Bearer {legacy_token()}").email == EMAIL
+
+
+def test_cached_tokens_give_each_request_its_own_user(fresh_cache, monkeypatch):
+    monkeypatch.setattr(auth, "LEGACY_TOKENS_ACCEPTED_UNTIL", time.time() + 60)
+    for header in (f"Bearer {AuthUtil.generate_token(Principal(EMAIL))}", f"Bearer {legacy_token()}"):
+        first = authenticate(header)
+        first.email = "someone-else@example.com"
+        second = authenticate(header)
+        assert second is not first and second.email == EMAIL
+    assert (fresh_cache.stats()["hits"], fresh_cache.stats()["misses"]) == (2, 2)
+
+
+def test_cache_entries_end_with_the_token(fresh_cache):
+    payload = {"sub": EMAIL, "exp": time.time() - 1}
+    fresh_cache.put("expired", payload)
+    assert fresh_cache.get("expired") is None
+    fresh_cache.put("short", {**payload, "exp": time.time() + 60}, until=time.time() - 1)
+    assert fresh_cache.get("short") is None
@@ -0,0 +1,62 @@
+from app.controllers.challenge_controller import ChallengeController
+
+
+def legacy_entry(n):
+    """A catalog item as written before the filter indexes existed"""
+    return {"pk": "CHALLENGE", "sk": f"c{n:02d}", "id": f"c{n:02d}", "title": f"Challenge {n}",
+            "category": "web" if n % 2 else "crypto", "difficulty": "easy", "tags": ["intro"], "points": 10}
+
+
+def test_backfill_makes_older_entries_filterable(table):
+    for n in range(25):
+        table.put_item(Item=legacy_entry(n))
+    controller = ChallengeController()
+    assert controller.query_challenges(category="web")[0] == []
+
+    assert controller.backfill_indexes() == 25
+    web, _ = controller.query_challenges(category="web", limit=100)
+    assert len(web) == 12
+    tagged, _ = controller.query_challenges(tags=["intro"], limit=100)
+    assert len(tagged) == 25
+
+
+def test_challenges_without_limit_returns_the_whole_catalog(flask_app, table):
+    for n in range(25):
+        table.put_item(Item=legacy_entry(n))
+    client = flask_app.test_client()
+
+    response = client.get("/challenges")
+    assert response.status_code == 200
+    assert len(response.get_json()) == 25
+    assert "X-Next-Cursor" not in response.headers
+
+    page = client.get("/challenges?limit=10")
+    assert len(page.get_json()) == 10
+    assert page.headers["X-Next-Cursor"]
+
+
+def test_etag_revalidation_and_gzip(flask_app, table):
+    import gzip
+    import json
+
+    table.put_item(Item=legacy_entry(1))
+    client = flask_app.test_client()
+    plain = client.get("/challenges")
+    etag = plain.headers["ETag"]
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+    compressed = client.get("/challenges", headers={"Accept-Encoding": "gzip, deflate"})
+    assert compressed.headers["Content-Encoding"] == "gzip" and compressed.headers["ETag"] == etag
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+
+    revalidated = client.get("/challenges", headers={"If-None-Match": etag})
+    assert (revalidated.status_code, revalidated.data) == (304, b"")
+    assert client.get("/challenges", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+
+def test_creating_a_challenge_invalidates_the_cached_body(flask_app, table):
+    client = flask_app.test_client()
+    etag = client.get("/challenges").headers["ETag"]
+    ChallengeController().create_challenge(legacy_entry(2))
+    response = client.get("/challenges", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and len(response.get_json()) == 1
@@ -0,0 +1,37 @@
+import itertools
+import time
+
+from app.utils.challenge_pool import ChallengePool
+
+
+def counter_pool(**kwargs):
+    numbers = itertools.count()
+    return ChallengePool("test", lambda: {"n": next(numbers)}, target=8, **kwargs)
+
+
+def test_without_background_refill_claims_use_the_fill_then_generate_inline():
+    pool = counter_pool(background=False)
+    pool.fill(2)
+    assert [pool.claim()["n"] for _ in range(3)] == [0, 1, 2]
+    assert pool._thread is None
+    stats = pool.stats()
+    assert (stats["pool_hits"], stats["pool_misses"], stats["depth"]) == (2, 1, 0)
+
+
+def test_background_refill_tops_the_pool_up():
+    pool = counter_pool(background=True)
+    pool.claim()
+    deadline = time.monotonic() + 5
+    while pool.stats()["depth"] < pool.target and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.stats()["depth"] == pool.target
+
+
+def test_lambda_defaults_to_no_refill_thread(monkeypatch):
+    from app.utils import challenge_pool
+
+    monkeypatch.setattr(challenge_pool, "ON_LAMBDA", True)
+    monkeypatch.delenv("CHALLENGE_POOL_BACKGROUND", raising=False)
+    assert counter_pool().background is False
+    monkeypatch.setenv("CHALLENGE_POOL_BACKGROUND", "1")
+    assert counter_pool().background is True
@@ -0,0 +1,85 @@
+import time
+
+import pytest
+
+from app.controllers.dashboard_controller import MAX_PAGE_QUERIES, DashboardController
+
+EMAIL = "player@example.com"
+PK = f"USER#{EMAIL}"
+
+
+@pytest.fixture
+def seeded(table):
+    now = int(time.time())
+    table.put_item(Item={"pk": PK, "sk": "PROFILE", "email": EMAIL})
+    table.put_item(Item={"pk": PK, "sk": "STATS#phase1", "completions": 1, "total_ms": 5000, "best_ms": 5000})
+    # A rate-limit window that ended long ago, and a pile of expired mazes
+    table.put_item(Item={"pk": PK, "sk": "RATELIMIT#API", "request_count": 3, "window_seconds": 60,
+                         "window_start": now - 600, "expires_at": now - 540})
+    for i in range(30):
+        table.put_item(Item={"pk": PK, "sk": f"MAZE#z{i:02d}", "status": "active", "expires_at": now - 10})
+    for i in range(3):
+        table.put_item(Item={"pk": PK, "sk": f"MAZE#a{i}", "status": "active", "expires_at": now + 600,
+                             "created_at": f"2026-01-0{i + 1}T00:00:00+00:00"})
+    return table
+
+
+def test_first_page_keeps_the_summary_despite_expired_items(seeded):
+    page = DashboardController().get_dashboard(EMAIL, limit=4)
+    assert page["profile"] == {"email": EMAIL}
+    assert page["stats"]["phase1"]["completions"] == 1
+    assert page["rate_limit"] is None
+    assert len(page["phase2"]["mazes"]) == 2
+    assert page["next_cursor"]
+
+
+def test_pages_fill_past_expired_items_and_end(seeded):
+    controller = DashboardController()
+    first = controller.get_dashboard(EMAIL, limit=4)
+    second = controller.get_dashboard(EMAIL, limit=4, cursor=first["next_cursor"])
+    assert second["profile"] is None
+    assert len(second["phase2"]["mazes"]) == 1
+    assert second["next_cursor"] is None
+
+
+def test_expired_items_cost_a_bounded_number_of_queries(seeded, monkeypatch):
+    now = int(time.time())
+    for i in range(500):
+        seeded.put_item(Item={"pk": PK, "sk": f"MAZE#y{i:03d}", "status": "active", "expires_at": now - 10})
+    controller = DashboardController()
+    query = controller.table.query
+    calls = []
+    monkeypatch.setattr(controller.table, "query", lambda **params: calls.append(params) or query(**params))
+
+    first = controller.get_dashboard(EMAIL, limit=2)
+    assert first["profile"] == {"email": EMAIL}
+    assert [call["Limit"] for call in calls] == [2, 2]
+
+    calls.clear()
+    page = controller.get_dashboard(EMAIL, limit=1, cursor=first["next_cursor"])
+    assert len(calls) == MAX_PAGE_QUERIES
+    assert page["phase2"]["mazes"] == [] and page["next_cursor"]
+
+    mazes = []
+    cursor = page["next_cursor"]
+    while cursor:
+        page = controller.get_dashboard(EMAIL, limit=50, cursor=cursor)
+        mazes += page["phase2"]["mazes"]
+        cursor = page["next_cursor"]
+    assert len(mazes) == 3
+
+
+def test_a_full_page_ends_at_its_last_item(seeded):
+    controller = DashboardController()
+    first = controller.get_dashboard(EMAIL, limit=3)
+    assert first["profile"] and first["stats"] and first["phase2"]["mazes"] == []
+    second = controller.get_dashboard(EMAIL, limit=50, cursor=first["next_cursor"])
+    assert second["profile"] is None
+    assert len(second["phase2"]["mazes"]) == 3
+
+
+def test_cursor_from_another_partition_is_rejected(seeded):
+    from app.utils.cursors import encode_cursor
+
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        DashboardController().get_dashboard(EMAIL, cursor=encode_cursor({"pk": "USER#other", "sk": "PROFILE"}))
@@ -0,0 +1,74 @@
+import base64
+import gzip
+import json
+
+import pytest
+
+from app.controllers.phase_2 import Phase2Controller
+from app.fast_path import FastPathRouter, is_warmup_event
+
+EMAIL = "fast@example.com"
+
+
+@pytest.fixture
+def router(flask_app):
+    return FastPathRouter(flask_app)
+
+
+def v1_event(method, path, headers=None, body=None, multi_value=False):
+    event = {"httpMethod": method, "path": path, "body": body, "isBase64Encoded": False,
+             "queryStringParameters": None}
+    if multi_value:
+        event["multiValueHeaders"] = {key: [value] for key, value in (headers or {}).items()}
+    else:
+        event["headers"] = headers or {}
+    return event
+
+
+def v2_event(method, path, headers=None, body=None, query=""):
+    return {"version": "2.0", "rawPath": path, "rawQueryString": query, "headers": headers or {},
+            "body": body, "isBase64Encoded": False, "requestContext": {"http": {"method": method}}}
+
+
+def test_maze_solve_is_served_from_the_event(router, table, auth_header):
+    controller = Phase2Controller()
+    maze_id = controller.initialize_maze(EMAIL)["maze_id"]
+    answer = table.get_item(Key={"pk": f"USER#{EMAIL}", "sk": f"MAZE#{maze_id}"})["Item"]["answers"][0]
+    headers = {**auth_header(EMAIL), "Content-Type": "application/json"}
+
+    response = router.dispatch(v2_event("POST", f"/phase2/solve/{maze_id}", headers,
+                                        json.dumps({"decoded_message": answer})))
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"])["current_stage"] == 2
+    assert response["headers"]["X-RateLimit-Remaining"] == "4"
+
+
+def test_errors_keep_the_flask_shape(router, auth_header):
+    response = router.dispatch(v1_event("POST", "/phase1/step/missing", auth_header(EMAIL), multi_value=True))
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"]) == {"error": "Challenge not found"}
+    assert response["multiValueHeaders"]["Content-Type"] == ["application/json"]
+
+    assert router.dispatch(v1_event("POST", "/phase1/step/missing"))["statusCode"] == 401
+
+
+def test_other_events_are_left_to_flask(router, auth_header):
+    assert router.dispatch(v1_event("GET", "/dashboard", auth_header(EMAIL))) is None
+    assert router.dispatch(v1_event("POST", "/phase2/solve/m", auth_header(EMAIL), "not json")) is None
+    assert router.dispatch({"Records": []}) is None
+
+
+def test_catalog_matches_flask_and_is_base64_when_gzipped(router, flask_app, table):
+    table.put_item(Item={"pk": "CHALLENGE", "sk": "c1", "id": "c1", "title": "One"})
+    expected = flask_app.test_client().get("/challenges").data
+
+    plain = router.dispatch(v2_event("GET", "/challenges"))
+    assert plain["body"].encode() == expected and not plain["isBase64Encoded"]
+    compressed = router.dispatch(v2_event("GET", "/challenges", {"Accept-Encoding": "gzip"}))
+    assert compressed["isBase64Encoded"]
+    assert gzip.decompress(base64.b64decode(compressed["body"])) == expected
+
+
+def test_warmup_events():
+    assert is_warmup_event({"source": "aws.events"}) and is_warmup_event({"warmer": True})
+    assert not is_warmup_event(v1_event("GET", "/challenges"))
@@ -0,0 +1,41 @@
+import threading
+import time
+
+import pytest
+
+from app.utils.hashing import HasherBusy, PasswordHasher
+
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(max_workers=1, max_queue=1, rounds=4)
+    hasher.timeout = 5
+    return hasher
+
+
+def test_hash_verify_and_rehash(hasher):
+    hashed = hasher.hash("correct horse")
+    assert hasher.verify("correct horse", hashed)
+    assert not hasher.verify("wrong horse", hashed)
+    assert not hasher.needs_rehash(hashed)
+    assert PasswordHasher(max_workers=1, rounds=5).needs_rehash(hashed)
+
+
+def test_timed_out_hashes_keep_their_slots_until_they_finish(hasher):
+    release = threading.Event()
+    hasher.timeout = 0.05
+    for _ in range(2):  # one on the worker, one queued
+        with pytest.raises(HasherBusy):
+            hasher._run(release.wait, 5)
+    assert hasher.stats()["in_flight"] == 2
+    with pytest.raises(HasherBusy):
+        hasher._run(lambda: "no slot")
+
+    release.set()
+    deadline = time.monotonic() + 5
+    while hasher.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    hasher.timeout = 5
+    assert hasher._run(lambda: "free again") == "free again"
+    stats = hasher.stats()
+    assert (stats["rejected"], stats["timed_out"], stats["completed"]) == (1, 2, 3)
@@ -0,0 +1,70 @@
+from datetime import datetime, timedelta, timezone
+
+from app.controllers import leaderboard_controller
+from app.controllers.leaderboard_controller import BoardConflict, LeaderboardController
+
+STARTED = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def stream_records(table, writes):
+    """The stream records ``writes`` produce on ``table``"""
+    records = []
+    table.attach_stream(lambda batch: records.extend(batch), key_prefixes=("MAZE#", "CHALLENGE#PHASE1#"))
+    writes()
+    assert table.drain_stream(5)
+    table.attach_stream(lambda batch: None)
+    return records
+
+
+def finish_mazes(table, players):
+    for n in range(players):
+        key = {"pk": f"USER#p{n}@example.com", "sk": f"MAZE#{n}"}
+        table.put_item(Item={**key, "status": "active", "attempts": n, "created_at": STARTED.isoformat()})
+        table.update_item(
+            Key=key, UpdateExpression="SET #status = :done, completed_at = :at",
+            ExpressionAttributeNames={"#status": "status"},
+            ExpressionAttributeValues={":done": "completed",
+                                       ":at": (STARTED + timedelta(seconds=10 + n)).isoformat()},
+        )
+
+
+def test_stream_counts_starts_and_completions(table):
+    records = stream_records(table, lambda: finish_mazes(table, 3))
+    controller = LeaderboardController()
+    assert controller.apply_stream(records) is None
+
+    board = controller.get_leaderboard("phase2")
+    assert board["stats"]["started"] == 3
+    assert board["stats"]["completions"] == 3
+    assert board["stats"]["best_seconds"] == 10.0
+    assert [entry["time_seconds"] for entry in board["entries"]] == [10.0, 11.0, 12.0]
+
+
+def test_failed_offer_is_retried_without_double_counting(table, monkeypatch):
+    records = stream_records(table, lambda: finish_mazes(table, 2))
+    controller = LeaderboardController()
+    offer = LeaderboardController._offer
+    calls = []
+
+    def conflicted_once(self, *args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise BoardConflict("lost every race")
+        return offer(self, *args)
+
+    monkeypatch.setattr(LeaderboardController, "_offer", conflicted_once)
+    leaderboard_controller._thresholds.clear()
+    retry_from = controller.apply_stream(records)
+    assert retry_from == records[3]["dynamodb"]["SequenceNumber"]
+
+    assert controller.apply_stream([r for r in records if r["dynamodb"]["SequenceNumber"] >= retry_from]) is None
+    stats = controller.get_leaderboard("phase2")["stats"]
+    assert (stats["started"], stats["completions"]) == (2, 2)
+    assert len(controller.get_leaderboard("phase2")["entries"]) == 2
+
+
+def test_records_about_other_items_are_skipped(table):
+    assert LeaderboardController().apply_stream([
+        {"eventName": "INSERT", "dynamodb": {"Keys": {"pk": {"S": "USER#x"}, "sk": {"S": "PROFILE"}},
+                                             "SequenceNumber": "1"}},
+    ]) is None
@@ -0,0 +1,82 @@
+import json
+import logging
+import queue
+import sys
+
+from app.utils import logs
+
+
+def make_record(level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_json_lines_carry_request_id_extras_and_tracebacks():
+    token = logs.bind_request_id("req-1")
+    try:
+        record = make_record(route="/challenges")
+        logs.RequestIdFilter().filter(record)
+    finally:
+        logs.reset_request_id(token)
+    entry = json.loads(logs.JsonFormatter().format(record))
+    assert (entry["message"], entry["request_id"], entry["route"]) == ("hello world", "req-1", "/challenges")
+    assert entry["level"] == "INFO" and "sample" not in entry
+
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        failed = make_record(logging.ERROR, "boom", None)
+        failed.exc_info = sys.exc_info()
+    prepared = logs._NonBlockingQueueHandler(queue.Queue()).prepare(failed)
+    assert prepared.exc_info is None
+    assert "ZeroDivisionError" in json.loads(logs.JsonFormatter().format(prepared))["exception"]
+
+
+def test_sampling_is_per_request_and_spares_unsampled_records():
+    rates = logs.parse_sample_rates("debug=0, INFO=0.5, bogus=1")
+    assert rates == {logging.DEBUG: 0.0, logging.INFO: 0.5}
+    sampler = logs.LevelSampler(rates)
+
+    assert not sampler.filter(make_record(logging.DEBUG, request_id="r"))
+    assert sampler.filter(make_record(logging.DEBUG, request_id="r", sample=False))
+    assert sampler.filter(make_record(logging.WARNING, request_id="r"))
+    kept = [sampler.filter(make_record(request_id=f"r{n}")) for n in range(200)]
+    assert kept == [sampler.filter(make_record(request_id=f"r{n}")) for n in range(200)]
+    assert 0 < sum(kept) < 200
+
+
+def test_full_queue_drops_instead_of_blocking():
+    handler = logs._NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.emit(make_record())
+    handler.emit(make_record())
+    assert handler.dropped == 1
+
+
+def test_flush_gives_up_at_the_timeout(monkeypatch):
+    pending = queue.Queue()
+    monkeypatch.setattr(logs, "_queue", pending)
+    assert logs.flush(0)
+    pending.put(make_record())
+    assert logs.flush(0.01) is False
+    pending.get()
+    pending.task_done()
+    assert logs.flush(0.01)
+
+
+def test_telemetry_survives_a_quiet_root_level(flask_app):
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.ERROR)
+    try:
+        assert logs.telemetry_logger("metrics").isEnabledFor(logging.INFO)
+        assert not logging.getLogger("app.test").isEnabledFor(logging.INFO)
+    finally:
+        root.setLevel(level)
+
+
+def test_request_id_is_echoed(flask_app):
+    client = flask_app.test_client()
+    assert client.get("/challenges", headers={"X-Request-ID": "abc"}).headers["X-Request-ID"] == "abc"
+    assert client.get("/challenges").headers["X-Request-ID"]
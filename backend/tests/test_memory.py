@@ -0,0 +1,157 @@
+import pytest
+from botocore.exceptions import ClientError
+
+from app.database.repository import ConditionFailed, Repository, Update
+
+
+def error(call, **kwargs):
+    with pytest.raises(ClientError) as raised:
+        call(**kwargs)
+    return raised.value.response
+
+
+def test_update_expression_clauses(backend):
+    table = backend.Table("t")
+    table.put_item(Item={"pk": "p", "sk": "a", "n": 1, "tags": ["x"], "m": {"k": 2}})
+    item = table.update_item(
+        Key={"pk": "p", "sk": "a"},
+        UpdateExpression="SET n = n + :one, tags = list_append(tags, :more), c = if_not_exists(c, :zero) "
+                         "REMOVE m.k ADD hits :one",
+        ExpressionAttributeValues={":one": 1, ":more": ["y"], ":zero": 0},
+        ReturnValues="ALL_NEW",
+    )["Attributes"]
+    assert item == {"pk": "p", "sk": "a", "n": 2, "tags": ["x", "y"], "m": {}, "c": 0, "hits": 1}
+
+
+@pytest.mark.parametrize("condition, values, holds", [
+    ("n = :v", {":v": 1}, True),
+    ("n <> :v", {":v": 1}, False),
+    ("n BETWEEN :lo AND :hi", {":lo": 0, ":hi": 5}, True),
+    ("n IN (:a, :b)", {":a": 3, ":b": 4}, False),
+    ("attribute_exists(n) AND NOT attribute_exists(missing)", {}, True),
+    ("begins_with(s, :p) OR n > :v", {":p": "zz", ":v": 0}, True),
+    ("size(tags) = :two AND contains(tags, :x)", {":two": 2, ":x": "x"}, True),
+])
+def test_condition_expressions(backend, condition, values, holds):
+    table = backend.Table("t")
+    table.put_item(Item={"pk": "p", "sk": "a", "n": 1, "s": "abc", "tags": ["x", "y"]})
+    params = {"Item": {"pk": "p", "sk": "a", "n": 9}, "ConditionExpression": condition}
+    if values:
+        params["ExpressionAttributeValues"] = values
+    if holds:
+        table.put_item(**params)
+        assert table.get_item(Key={"pk": "p", "sk": "a"})["Item"]["n"] == 9
+    else:
+        assert error(table.put_item, **params)["Error"]["Code"] == "ConditionalCheckFailedException"
+
+
+def test_expression_errors_are_validation_errors(backend):
+    table = backend.Table("t")
+    syntax = error(table.put_item, Item={"pk": "p", "sk": "a"}, ConditionExpression="n = = :v",
+                   ExpressionAttributeValues={":v": 1})
+    unused = error(table.put_item, Item={"pk": "p", "sk": "a"}, ConditionExpression="n = :v",
+                   ExpressionAttributeValues={":v": 1, ":unused": 2})
+    assert syntax["Error"]["Code"] == unused["Error"]["Code"] == "ValidationException"
+    assert ":unused" in unused["Error"]["Message"]
+
+
+def test_condition_failure_returns_the_item_in_wire_format(backend):
+    table = backend.Table("t")
+    table.put_item(Item={"pk": "p", "sk": "a", "n": 2, "tags": ["x"]})
+    response = error(
+        table.update_item, Key={"pk": "p", "sk": "a"}, UpdateExpression="SET n = :v",
+        ConditionExpression="n = :old", ExpressionAttributeValues={":v": 3, ":old": 1},
+        ReturnValuesOnConditionCheckFailure="ALL_OLD",
+    )
+    assert response["Error"]["Code"] == "ConditionalCheckFailedException"
+    assert response["Item"] == {"pk": {"S": "p"}, "sk": {"S": "a"}, "n": {"N": "2"}, "tags": {"L": [{"S": "x"}]}}
+
+
+def test_repository_decodes_the_failed_item(backend):
+    repo = Repository(backend.Table("t"))
+    repo.create({"pk": "p", "sk": "a", "n": 2})
+    with pytest.raises(ConditionFailed) as raised:
+        repo.update({"pk": "p", "sk": "a"}, Update().set("n", 3).expect("n", 1), return_old_on_failure=True)
+    assert raised.value.item == {"pk": "p", "sk": "a", "n": 2}
+
+
+def test_transaction_is_all_or_nothing(backend):
+    table = backend.Table("t")
+    table.put_item(Item={"pk": "p", "sk": "a", "n": 1})
+    response = error(backend.meta.client.transact_write_items, TransactItems=[
+        {"Put": {"TableName": "t", "Item": {"pk": "p", "sk": "new"}}},
+        {"Update": {"TableName": "t", "Key": {"pk": "p", "sk": "a"}, "UpdateExpression": "SET n = :v",
+                    "ConditionExpression": "n = :w", "ExpressionAttributeValues": {":v": 5, ":w": 9}}},
+    ])
+    assert response["Error"]["Code"] == "TransactionCanceledException"
+    assert [reason["Code"] for reason in response["CancellationReasons"]] == ["None", "ConditionalCheckFailed"]
+    assert "Item" not in table.get_item(Key={"pk": "p", "sk": "new"})
+    assert table.get_item(Key={"pk": "p", "sk": "a"})["Item"]["n"] == 1
+
+
+def test_repository_transact_raises_condition_failed(backend):
+    repo = Repository(backend.Table("t"))
+    repo.create({"pk": "p", "sk": "a", "n": 1})
+    with pytest.raises(ConditionFailed):
+        repo.transact([
+            repo.update_op({"pk": "p", "sk": "a"}, Update().add("n", 1)),
+            repo.put_op({"pk": "p", "sk": "b"}, Update().expect("n", 2)),
+        ])
+    assert repo.get({"pk": "p", "sk": "a"})["n"] == 1
+
+
+def test_gsi_query(backend):
+    table = backend.Table("t")
+    for i in range(6):
+        table.put_item(Item={"pk": "CHALLENGE", "sk": f"c{i}", "category_key": "api" if i < 4 else "web"})
+    table.put_item(Item={"pk": "CHALLENGE", "sk": "unindexed"})
+    response = table.query(
+        IndexName="category-index", KeyConditionExpression="category_key = :c AND begins_with(sk, :s)",
+        ExpressionAttributeValues={":c": "api", ":s": "c"}, ScanIndexForward=False,
+    )
+    assert [item["sk"] for item in response["Items"]] == ["c3", "c2", "c1", "c0"]
+
+
+def test_limit_applies_before_the_filter(backend):
+    table = backend.Table("t")
+    for i in range(6):
+        table.put_item(Item={"pk": "p", "sk": f"s{i}", "odd": i % 2})
+    response = table.query(KeyConditionExpression="pk = :p", FilterExpression="odd = :o",
+                           ExpressionAttributeValues={":p": "p", ":o": 1}, Limit=2)
+    assert [item["sk"] for item in response["Items"]] == ["s1"]
+    assert (response["Count"], response["ScannedCount"]) == (1, 2)
+    assert response["LastEvaluatedKey"] == {"pk": "p", "sk": "s1"}
+
+
+def test_ttl_setting_is_kept_and_expired_items_stay(backend):
+    client = backend.meta.client
+    table = backend.Table("t")
+    table.put_item(Item={"pk": "p", "sk": "a", "expires_at": 1})
+    assert client.describe_time_to_live(TableName="t")["TimeToLiveDescription"]["TimeToLiveStatus"] == "DISABLED"
+    client.update_time_to_live(TableName="t", TimeToLiveSpecification={"Enabled": True, "AttributeName": "expires_at"})
+    assert client.describe_time_to_live(TableName="t")["TimeToLiveDescription"] == {
+        "TimeToLiveStatus": "ENABLED", "AttributeName": "expires_at"
+    }
+    assert "Item" in table.get_item(Key={"pk": "p", "sk": "a"})
+
+
+def test_stream_delivers_changes_in_order_and_retries(backend):
+    table = backend.Table("t")
+    seen, failures = [], ["once"]
+
+    def consumer(records):
+        if failures:
+            failures.pop()
+            return records[0]["dynamodb"]["SequenceNumber"]
+        seen.extend((r["eventName"], r["dynamodb"]["Keys"]["sk"]["S"]) for r in records)
+        return None
+
+    stream = table.attach_stream(consumer, key_prefixes=("RUN#",))
+    stream.RETRY_DELAY = 0
+    table.put_item(Item={"pk": "p", "sk": "RUN#1", "status": "active"})
+    table.put_item(Item={"pk": "p", "sk": "OTHER"})
+    table.update_item(Key={"pk": "p", "sk": "RUN#1"}, UpdateExpression="SET #s = :c",
+                      ExpressionAttributeNames={"#s": "status"}, ExpressionAttributeValues={":c": "done"})
+    table.delete_item(Key={"pk": "p", "sk": "RUN#1"})
+    assert table.drain_stream(5)
+    assert seen == [("INSERT", "RUN#1"), ("MODIFY", "RUN#1"), ("REMOVE", "RUN#1")]
@@ -0,0 +1,67 @@
+import threading
+
+from app.routes import metrics as metrics_route
+from app.utils.metrics import Metrics, route_labels
+
+LABELS = ("ChallengeRoute", "/challenges", "GET")
+
+
+def test_shards_from_every_thread_are_merged():
+    registry = Metrics(buckets=(0.1, 1.0))
+
+    def record(status):
+        registry.observe(LABELS, status, registry.start(LABELS))
+
+    threads = [threading.Thread(target=record, args=(200 if n % 2 else 404,)) for n in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    registry.start(LABELS)
+
+    series = registry.snapshot()[LABELS]
+    assert (series.count, series.in_flight, series.statuses) == (6, 1, {200: 3, 404: 3})
+    text = registry.prometheus()
+    assert 'http_request_duration_seconds_bucket{blueprint="ChallengeRoute",route="/challenges",method="GET",le="+Inf"} 6' in text
+    assert 'http_requests_total{blueprint="ChallengeRoute",route="/challenges",method="GET",status="404"} 3' in text
+
+
+def test_collectors_are_exported_as_gauges_and_failures_skipped():
+    registry = Metrics()
+    registry.add_collector("cache", lambda: {"hits": 3, "name": "ignored"})
+    registry.add_collector("pool", lambda: {"a": {"size": 2}, "b": {"size": 5}}, label="pool")
+    registry.add_collector("broken", lambda: 1 / 0)
+
+    text = registry.prometheus()
+    assert "cache_hits 3.0" in text and "ignored" not in text
+    assert 'pool_size{pool="a"} 2.0' in text and 'pool_size{pool="b"} 5.0' in text
+    assert "broken" not in text
+
+
+def test_emf_documents_report_traffic_since_the_last_call():
+    registry = Metrics()
+    for status in (200, 500):
+        registry.observe(LABELS, status, registry.start(LABELS))
+
+    (document,) = registry.emf_documents()
+    assert (document["Requests"], document["ServerErrors"], document["Route"]) == (2, 1, "GET /challenges")
+    assert registry.emf_documents() == []
+
+
+def test_flask_requests_are_labelled_by_rule(flask_app, monkeypatch):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", "s3cret")
+    client = flask_app.test_client()
+    client.get("/challenges")
+
+    assert client.get("/metrics").status_code == 401
+    response = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert 'route="/challenges",method="GET",status="200"' in response.get_data(as_text=True)
+    assert route_labels(flask_app, "POST", "/phase2/solve/m1") == ("phase2", "/phase2/solve/<maze_id>", "POST")
+    assert route_labels(flask_app, "GET", "/nowhere")[1] == "unmatched"
+
+
+def test_metrics_are_hidden_without_a_token(flask_app, monkeypatch):
+    monkeypatch.setattr(metrics_route, "METRICS_TOKEN", None)
+    monkeypatch.setattr(metrics_route, "METRICS_PUBLIC", False)
+    assert flask_app.test_client().get("/metrics").status_code == 404
@@ -0,0 +1,77 @@
+import time
+
+import pytest
+
+from app.controllers import phase_1
+from app.controllers.phase_1 import Phase1Controller
+
+EMAIL = "quester@example.com"
+POINTER = {"pk": f"USER#{EMAIL}", "sk": "ACTIVE#PHASE1"}
+
+
+@pytest.fixture
+def controller(table, monkeypatch):
+    monkeypatch.setattr(phase_1, "STEP_COOLDOWN_SECONDS", 0)
+    return Phase1Controller()
+
+
+def test_one_active_challenge_per_player(controller, table):
+    challenge_id = controller.create_challenge(EMAIL)["challenge_id"]
+    assert table.get_item(Key=POINTER)["Item"]["challenge_id"] == challenge_id
+
+    with pytest.raises(ValueError, match="already have an active Phase 1 challenge"):
+        controller.create_challenge(EMAIL)
+    runs = table.query(KeyConditionExpression="pk = :pk AND begins_with(sk, :run)",
+                       ExpressionAttributeValues={":pk": POINTER["pk"], ":run": "CHALLENGE#PHASE1#"})["Items"]
+    assert [run["challenge_id"] for run in runs] == [challenge_id]
+
+
+def test_an_expired_pointer_does_not_block_a_new_challenge(controller, table):
+    first = controller.create_challenge(EMAIL)["challenge_id"]
+    table.update_item(Key=POINTER, UpdateExpression="SET expires_at = :past",
+                      ExpressionAttributeValues={":past": int(time.time()) - 1})
+
+    second = controller.create_challenge(EMAIL)["challenge_id"]
+    assert second != first
+    assert table.get_item(Key=POINTER)["Item"]["challenge_id"] == second
+
+
+def solve_headers(controller, table, challenge_id):
+    item = table.get_item(Key={"pk": POINTER["pk"], "sk": f"CHALLENGE#PHASE1#{challenge_id}"})["Item"]
+    required = item["required_headers"]
+    for header in controller.header_sequence:
+        controller.verify_request_header(EMAIL, challenge_id, {header: required[header]})
+    return required["X-Quest-Key"] + required["X-Quest-Sequence"] + required["X-Quest-Token"]
+
+
+def test_completion_finishes_the_run_and_releases_the_pointer_together(controller, table):
+    challenge_id = controller.create_challenge(EMAIL)["challenge_id"]
+    key = solve_headers(controller, table, challenge_id)
+
+    result = controller.complete_challenge(EMAIL, challenge_id, key)
+    assert result["success"] and result["phase2_token"]["token"]
+    item = controller.get_challenge_item(EMAIL, challenge_id)
+    assert item["status"] == "completed" and "expires_at" not in item
+    assert "Item" not in table.get_item(Key=POINTER)
+    with pytest.raises(ValueError, match="Challenge is not active"):
+        controller.complete_challenge(EMAIL, challenge_id, key)
+
+
+def test_completion_is_all_or_nothing(controller, table):
+    challenge_id = controller.create_challenge(EMAIL)["challenge_id"]
+    key = solve_headers(controller, table, challenge_id)
+    table.update_item(Key=POINTER, UpdateExpression="SET challenge_id = :other",
+                      ExpressionAttributeValues={":other": "another-run"})
+
+    with pytest.raises(ValueError, match="updated by another request"):
+        controller.complete_challenge(EMAIL, challenge_id, key)
+    assert controller.get_challenge_item(EMAIL, challenge_id)["status"] == "active"
+    assert table.get_item(Key=POINTER)["Item"]["challenge_id"] == "another-run"
+
+
+def test_wrong_completion_key_counts_an_attempt(controller, table):
+    challenge_id = controller.create_challenge(EMAIL)["challenge_id"]
+    solve_headers(controller, table, challenge_id)
+    with pytest.raises(ValueError, match="Attempt 1"):
+        controller.complete_challenge(EMAIL, challenge_id, "wrong")
+    assert controller.get_challenge_item(EMAIL, challenge_id)["status"] == "active"
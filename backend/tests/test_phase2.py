@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+from app.controllers.phase_2 import MAZE_EXPIRED, MAZE_STAGES, Phase2Controller
+
+EMAIL = "runner@example.com"
+
+
+@pytest.fixture
+def controller(table):
+    return Phase2Controller()
+
+
+def maze_item(table, maze_id):
+    return table.get_item(Key={"pk": f"USER#{EMAIL}", "sk": f"MAZE#{maze_id}"})["Item"]
+
+
+def test_staged_answers_complete_the_maze_in_the_last_write(controller, table):
+    maze_id = controller.initialize_maze(EMAIL)["maze_id"]
+    answers = maze_item(table, maze_id)["answers"]
+    for stage, answer in enumerate(answers[:-1], start=1):
+        result = controller.verify_solution(EMAIL, maze_id, answer, stage)
+        assert result["current_stage"] == stage + 1
+    result = controller.verify_solution(EMAIL, maze_id, answers[-1], len(answers))
+
+    assert result["message"] == "Congratulations! You've completed the maze!"
+    assert len(result["final_tokens"]) == MAZE_STAGES
+    item = maze_item(table, maze_id)
+    assert item["status"] == "completed" and item["completed_at"]
+    with pytest.raises(ValueError, match="Maze is not active"):
+        controller.verify_solution(EMAIL, maze_id, answers[-1], len(answers))
+
+
+def test_staged_wrong_answer_counts_an_attempt(controller, table):
+    maze_id = controller.initialize_maze(EMAIL)["maze_id"]
+    with pytest.raises(ValueError, match=r"Attempt 1\)"):
+        controller.verify_solution(EMAIL, maze_id, "Navigate to (99, 99)", 1)
+    assert maze_item(table, maze_id)["current_position"] == 0
+
+
+def test_wrong_stage_falls_back_to_the_current_one(controller, table):
+    maze_id = controller.initialize_maze(EMAIL)["maze_id"]
+    answers = maze_item(table, maze_id)["answers"]
+    result = controller.verify_solution(EMAIL, maze_id, answers[0], 3)
+    assert result["current_stage"] == 2
+
+
+def test_longer_maze_is_not_finished_early(controller, table):
+    maze_id = controller.initialize_maze(EMAIL)["maze_id"]
+    key = {"pk": f"USER#{EMAIL}", "sk": f"MAZE#{maze_id}"}
+    coordinates = [{"x": i, "y": -i} for i in range(MAZE_STAGES + 1)]
+    table.update_item(
+        Key=key, UpdateExpression="SET coordinates = :c, answers = :a, total_stages = :n REMOVE encoded_messages",
+        ExpressionAttributeValues={
+            ":c": coordinates,
+            ":a": [f"Navigate to ({c['x']}, {c['y']})" for c in coordinates],
+            ":n": len(coordinates),
+        },
+    )
+    answers = maze_item(table, maze_id)["answers"]
+    for stage, answer in enumerate(answers, start=1):
+        result = controller.verify_solution(EMAIL, maze_id, answer, stage)
+        assert maze_item(table, maze_id)["status"] == ("completed" if stage == len(answers) else "active")
+    assert result["current_stage"] == len(answers)
+
+
+def test_expiry_during_an_unstaged_answer_is_reported_as_expiry(controller, table):
+    maze_id = controller.initialize_maze(EMAIL)["maze_id"]
+    stale = maze_item(table, maze_id)
+    table.update_item(Key={"pk": f"USER#{EMAIL}", "sk": f"MAZE#{maze_id}"},
+                      UpdateExpression="SET expires_at = :past", ExpressionAttributeValues={":past": int(time.time()) - 1})
+    with pytest.raises(ValueError, match=MAZE_EXPIRED):
+        controller.verify_solution(EMAIL, maze_id, stale["answers"][0], maze=stale)
@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.utils.rate_limit import RateLimit
+
+EMAIL = "limited@example.com"
+KEY = {"pk": f"USER#{EMAIL}", "sk": "RATELIMIT#API"}
+
+
+def test_concurrent_hits_never_overshoot(table):
+    limiter = RateLimit(max_requests=5, window_seconds=3600)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: limiter.hit(EMAIL), range(20)))
+
+    assert sum(result["allowed"] for result in results) == 5
+    assert sorted(result["remaining"] for result in results if result["allowed"]) == [0, 1, 2, 3, 4]
+    assert table.get_item(Key=KEY)["Item"]["request_count"] == 5
+
+
+def test_a_new_window_resets_the_count(table):
+    limiter = RateLimit(max_requests=2, window_seconds=3600)
+    assert [limiter.hit(EMAIL)["allowed"] for _ in range(3)] == [True, True, False]
+    table.update_item(Key=KEY, UpdateExpression="SET window_start = window_start - :hour, requests = :old",
+                      ExpressionAttributeValues={":hour": 3600, ":old": ["2026-01-01T00:00:00+00:00"]})
+
+    result = limiter.hit(EMAIL)
+    assert (result["allowed"], result["remaining"]) == (True, 1)
+    item = table.get_item(Key=KEY)["Item"]
+    assert item["request_count"] == 1 and "requests" not in item
+    assert item["expires_at"] == item["window_start"] + 3600
+
+
+def test_first_request_from_the_older_format_opens_a_window(table):
+    table.put_item(Item={**KEY, "requests": ["2026-01-01T00:00:00+00:00"] * 9})
+    assert RateLimit(max_requests=2, window_seconds=60).hit(EMAIL)["remaining"] == 1
@@ -0,0 +1,61 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from jobs.sweep_expired import sweep_segment
+
+PK = "USER#sweeper@example.com"
+
+
+def sweep():
+    return sweep_segment(0, 1, {"now": int(time.time()), "page_size": 100, "dry_run": False})
+
+
+def test_rate_limit_items_are_swept_by_their_window(table):
+    now = int(time.time())
+    table.put_item(Item={"pk": PK, "sk": "RATELIMIT#API", "request_count": 1, "window_start": now - 600,
+                         "window_seconds": 60})
+    long_ago = (datetime.now(timezone.utc) - timedelta(hours=2)).isoformat()
+    table.put_item(Item={"pk": "USER#old@example.com", "sk": "RATELIMIT#API", "requests": [long_ago],
+                         "updated_at": long_ago})
+    table.put_item(Item={"pk": "USER#live@example.com", "sk": "RATELIMIT#API", "request_count": 1,
+                         "window_start": now, "window_seconds": 60})
+
+    counts = sweep()
+    assert (counts["deleted"], counts["stamped"]) == (2, 1)
+    assert [item["pk"] for item in table.scan()["Items"]] == ["USER#live@example.com"]
+    assert table.scan()["Items"][0]["expires_at"] == now + 60
+
+
+def test_stream_and_recomputed_totals_agree_after_a_sweep(table):
+    from app.controllers.leaderboard_controller import LEADERBOARD_SIZE, LeaderboardController
+    from jobs.aggregate_stats import aggregate_segment, merge_segments, write_stats
+
+    now = int(time.time())
+    started = datetime.now(timezone.utc) - timedelta(hours=1)
+    records = []
+    table.attach_stream(lambda batch: records.extend(batch), key_prefixes=("MAZE#",))
+    for n in range(4):
+        key = {"pk": f"USER#p{n}@example.com", "sk": f"MAZE#{n}"}
+        table.put_item(Item={**key, "status": "active", "attempts": 0, "created_at": started.isoformat(),
+                             "expires_at": now - 10})
+        if n < 2:
+            table.update_item(
+                Key=key, UpdateExpression="SET #status = :done, completed_at = :at REMOVE expires_at",
+                ExpressionAttributeNames={"#status": "status"},
+                ExpressionAttributeValues={":done": "completed",
+                                           ":at": (started + timedelta(seconds=30 + n)).isoformat()},
+            )
+    assert table.drain_stream(5)
+    table.attach_stream(lambda batch: None)
+    controller = LeaderboardController()
+    assert controller.apply_stream(records) is None
+
+    assert sweep()["deleted"] == 2
+    state = aggregate_segment(0, 1, {"table": None, "checkpoint_dir": None, "page_size": 100,
+                                     "max_pages": None, "dry_run": False})
+    report = write_stats(controller, merge_segments([state], LEADERBOARD_SIZE), True)
+
+    live = controller.get_leaderboard("phase2")["stats"]
+    assert (live["started"], live["completions"], live["completion_rate"]) == (4, 2, 0.5)
+    assert report["phase2"]["completion_rate"] == live["completion_rate"]
+    assert live["time_percentiles_seconds"]
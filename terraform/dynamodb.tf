@@ -0,0 +1,60 @@
+# Single-table design: users, challenge state and the challenge catalog
+#
+# The table predates this resource. Adopt it into state before the first
+# apply, or terraform will try to create a table that already exists:
+#
+#   terraform import aws_dynamodb_table.binary_trail <dynamodb_table_name>
+#
+# Then review `terraform plan`: the indexes, stream and TTL below are added in place.
+resource "aws_dynamodb_table" "binary_trail" {
+  name         = var.dynamodb_table_name
+  billing_mode = "PAY_PER_REQUEST"
+  hash_key     = "pk"
+  range_key    = "sk"
+
+  attribute {
+    name = "pk"
+    type = "S"
+  }
+
+  attribute {
+    name = "sk"
+    type = "S"
+  }
+
+  attribute {
+    name = "category_key"
+    type = "S"
+  }
+
+  attribute {
+    name = "difficulty_key"
+    type = "S"
+  }
+
+  # Sparse indexes: only primary CHALLENGE items carry these keys
+  global_secondary_index {
+    name            = "category-index"
+    hash_key        = "category_key"
+    range_key       = "sk"
+    projection_type = "ALL"
+  }
+
+  global_secondary_index {
+    name            = "difficulty-index"
+    hash_key        = "difficulty_key"
+    range_key       = "sk"
+    projection_type = "ALL"
+  }
+
+  # Run changes feed the statistics consumer (stats_stream.py)
+  stream_enabled   = true
+  stream_view_type = "NEW_AND_OLD_IMAGES"
+
+  # Transient items (active challenges, mazes, rate-limit windows) carry an
+  # epoch expiry; the app treats them as gone as soon as it passes
+  ttl {
+    attribute_name = "expires_at"
+    enabled        = true
+  }
+}
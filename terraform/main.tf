@@ -55,6 +55,53 @@ resource "aws_lambda_function" "flask_app" {
   }
 }
 
+# Stream consumer: challenge statistics and leaderboards, off the request path
+resource "aws_lambda_function" "stats_stream" {
+  function_name = "binary_trail_stats_stream"
+  runtime       = "python3.8"
+  role          = aws_iam_role.lambda_exec.arn
+  handler       = "stats_stream.lambda_handler"
+  filename      = "../backend/lambda_function.zip"
+  source_code_hash = filebase64sha256("../backend/lambda_function.zip")
+
+  environment {
+    variables = {
+      DYNAMODB_TABLE_NAME   = var.dynamodb_table_name
+      DYNAMODB_ENDPOINT     = var.dynamodb_endpoint
+    }
+  }
+}
+
+# Only run items reach the consumer. Failed records are reported back and
+# retried from there, so a completion is never dropped.
+resource "aws_lambda_event_source_mapping" "stats_stream" {
+  event_source_arn                   = aws_dynamodb_table.binary_trail.stream_arn
+  function_name                      = aws_lambda_function.stats_stream.arn
+  starting_position                  = "LATEST"
+  batch_size                         = 100
+  maximum_batching_window_in_seconds = 1
+  function_response_types            = ["ReportBatchItemFailures"]
+
+  filter_criteria {
+    filter {
+      pattern = jsonencode({
+        dynamodb = {
+          Keys = {
+            sk = {
+              S = [{ prefix = "CHALLENGE#PHASE1#" }, { prefix = "MAZE#" }]
+            }
+          }
+        }
+      })
+    }
+  }
+}
+
+resource "aws_iam_role_policy_attachment" "lambda_stream" {
+  role       = aws_iam_role.lambda_exec.name
+  policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaDynamoDBExecutionRole"
+}
+
 resource "aws_iam_policy_attachment" "lambda_logs" {
   name       = "lambda_logs"
   roles      = [aws_iam_role.lambda_exec.name]